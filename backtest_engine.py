@@ -0,0 +1,340 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 آزمون الگوهای جدید روی متن صفحات ذخیره شده (کش OCR یا نتایج قبلی)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Callable, Tuple
+
+from extractor_engine import DocumentExtractor
+from ocr_cache import PAGE_TEXT
+from pattern_scanner import FieldScanner
+
+# تعداد نمونه اختلاف نگهداری شده برای هر فیلد
+MAX_EXAMPLES = 5
+
+# شمارندههای هر فیلد
+BACKTEST_COUNTERS = (
+    'pages', 'hits', 'agree', 'disagree', 'new', 'missed',
+    'correction_pages', 'correction_fixed', 'correction_repeated'
+)
+
+# موتور استخراج هر پردازشگر
+_backtest_extractor = None
+
+class TextOnlyExtractor(DocumentExtractor):
+    def setup_ocr(self):
+        """آزمون فقط روی متن است - بدون بارگذاری مدل OCR"""
+        
+        self.ocr_reader = None
+
+def normalize_field_key(field_name: str) -> str:
+    """تبدیل برچسب فیلد (مثلا «جمع حقوق و عوارض») به کلید موتور استخراج"""
+    
+    key = field_name.strip().replace(' ', '_')
+    return key.replace('_و_', '_')
+
+def iter_cache_texts(cache_path: str) -> Iterator[str]:
+    """متن نهایی صفحات ذخیره شده در کش (یک متن برای هر صفحه - پاسهای OCR میانی خوانده نمیشوند)"""
+    
+    path = Path(cache_path)
+    if not path.exists():
+        return
+        
+    connection = sqlite3.connect(str(path), timeout=5)
+    try:
+        try:
+            rows = connection.execute("SELECT value FROM page_data WHERE kind = ?", (PAGE_TEXT,)).fetchall()
+        except sqlite3.OperationalError:
+            # کش قدیمی بدون جدول page_data
+            return
+            
+        for (value,) in rows:
+            try:
+                text = json.loads(value)
+            except ValueError:
+                continue
+                
+            if isinstance(text, str) and text:
+                yield text
+    finally:
+        connection.close()
+
+def iter_results_texts(results_path: str) -> Iterator[str]:
+    """متن صفحات از نتایج ذخیره شده (خروجی JSON Lines خط فرمان یا JSON نتایج)"""
+    
+    def page_texts(result: Dict[str, Any]) -> Iterator[str]:
+        pages = result.get('pages') if isinstance(result.get('pages'), list) else [result]
+        for page in pages:
+            if isinstance(page, dict) and page.get('full_text'):
+                yield page['full_text']
+                
+    with open(results_path, 'r', encoding='utf-8') as f:
+        if results_path.endswith('.jsonl'):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield from page_texts(json.loads(line))
+        else:
+            data = json.load(f)
+            records = data.values() if isinstance(data, dict) else data
+            for result in records:
+                if isinstance(result, dict):
+                    yield from page_texts(result)
+
+def load_corpus(cache_path: Optional[str] = None, results_path: Optional[str] = None,
+                max_pages: Optional[int] = None) -> List[str]:
+    """جمعآوری متنهای یکتای مجموعه آزمون"""
+    
+    sources = []
+    if results_path:
+        sources.append(iter_results_texts(results_path))
+    if cache_path:
+        sources.append(iter_cache_texts(cache_path))
+        
+    texts = []
+    seen = set()
+    
+    for source in sources:
+        for text in source:
+            digest = hashlib.md5(text.encode('utf-8')).digest()
+            if digest in seen:
+                continue
+                
+            seen.add(digest)
+            texts.append(text)
+            
+            if max_pages and len(texts) >= max_pages:
+                return texts
+                
+    return texts
+
+def _init_backtest_worker(config: Dict[str, Any], baseline_patterns: Dict[str, List[Dict]]):
+    """راهاندازی پردازشگر آزمون - موتور بدون OCR با الگوهای فعلی"""
+    
+    global _backtest_extractor
+    
+    from learning_system import LearningSystem
+    
+    learning_system = LearningSystem()
+    learning_system.learned_patterns = baseline_patterns
+    
+    # الگوها در طول آزمون ثابت میمانند
+    worker_config = dict(config)
+    worker_config.update({
+        'ocr_cache_enabled': False,
+        'pattern_stats_enabled': False,
+        'learned_reload_interval': float('inf')
+    })
+    
+    _backtest_extractor = TextOnlyExtractor(worker_config, learning_system=learning_system)
+    
+    learned_tier = _backtest_extractor.get_learned_tier()
+    if learned_tier is not None:
+        learned_tier.refresh(force=True)
+
+def _backtest_chunk(task: Tuple[List[str], Dict[str, List[str]], List[Tuple[str, str, str]]]) -> Dict[str, Any]:
+    """آزمون الگوهای پیشنهادی روی یک دسته از صفحات"""
+    
+    texts, candidate, corrections = task
+    extractor = _backtest_extractor
+    
+    scanner = FieldScanner({field: {'patterns': patterns} for field, patterns in candidate.items()},
+                           guard=extractor.regex_guard)
+    fields = list(candidate)
+    
+    # تصحیحات کاربر: (فیلد، مقدار اشتباه) -> مقدار درست
+    corrected_values = {(field, original): corrected for field, original, corrected in corrections}
+    
+    counters = {field: dict.fromkeys(BACKTEST_COUNTERS, 0) for field in fields}
+    times = dict.fromkeys(fields, 0.0)
+    examples = {field: [] for field in fields}
+    
+    def record_time(field_name: str, pattern: str, elapsed: float):
+        times[field_name] += elapsed * 1000
+        
+    for raw_text in texts:
+        text = extractor.clean_text(extractor.normalize_digits(raw_text))
+        if not text:
+            continue
+            
+        doc_type = extractor.detect_document_type(text)
+        patterns_dict = extractor.import_patterns if doc_type.startswith('import') else extractor.export_patterns
+        
+        # مقدار برنده فعلی (الگوهای پایه + الگوهای یاد گرفته شده فعلی)
+        baseline = extractor.extract_fields_advanced(text, fields, doc_type)
+        hits = scanner.scan(text, [field for field in fields if field in patterns_dict], record_time)
+        
+        for field_name in fields:
+            if field_name not in patterns_dict:
+                continue
+                
+            field_counters = counters[field_name]
+            field_counters['pages'] += 1
+            
+            current = baseline[field_name]['value']
+            value = None
+            if hits.get(field_name):
+                value = extractor.select_field_candidate(
+                    text, field_name, patterns_dict[field_name], hits[field_name], method='learned'
+                )['value']
+                
+            if value:
+                field_counters['hits'] += 1
+                if not current:
+                    field_counters['new'] += 1
+                elif value == current:
+                    field_counters['agree'] += 1
+                else:
+                    field_counters['disagree'] += 1
+                    if len(examples[field_name]) < MAX_EXAMPLES:
+                        examples[field_name].append({'current': current, 'candidate': value})
+            elif current:
+                field_counters['missed'] += 1
+                
+            # صفحاتی که مقدار فعلی آنها قبلا توسط کاربر اصلاح شده است
+            corrected = corrected_values.get((field_name, current)) if current else None
+            if corrected is not None:
+                field_counters['correction_pages'] += 1
+                if value == corrected:
+                    field_counters['correction_fixed'] += 1
+                elif value == current:
+                    field_counters['correction_repeated'] += 1
+                    
+    return {'pages': len(texts), 'counters': counters, 'times': times, 'examples': examples}
+
+class BacktestEngine:
+    def __init__(self, config: Optional[Dict[str, Any]] = None, workers: Optional[int] = None,
+                 chunk_size: int = 500):
+        """اجرای موازی آزمون الگوها روی مجموعه متن صفحات"""
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.config = dict(config or {})
+        self.chunk_size = max(1, chunk_size)
+        
+        if not workers or workers <= 0:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        
+    def run(self, candidate: Dict[str, List[str]], texts: List[str],
+            baseline_patterns: Dict[str, List[Dict]], corrections: List[Tuple[str, str, str]],
+            progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """آزمون الگوهای پیشنهادی (فیلد -> لیست الگو) و گزارش نتایج هر فیلد"""
+        
+        start_time = time.time()
+        
+        candidate = {normalize_field_key(field): list(patterns) for field, patterns in candidate.items() if patterns}
+        
+        chunks = [
+            (texts[i:i + self.chunk_size], candidate, corrections)
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+        
+        totals = {
+            'pages': 0,
+            'counters': {field: dict.fromkeys(BACKTEST_COUNTERS, 0) for field in candidate},
+            'times': dict.fromkeys(candidate, 0.0),
+            'examples': {field: [] for field in candidate}
+        }
+        
+        workers = min(self.workers, len(chunks))
+        self.logger.info(f"🧪 آزمون {len(candidate)} فیلد روی {len(texts)} صفحه با {max(1, workers)} پردازشگر")
+        
+        if workers <= 1:
+            # اجرا در همین پردازه (مجموعههای کوچک)
+            _init_backtest_worker(self.config, baseline_patterns)
+            for chunk in chunks:
+                self._merge(totals, _backtest_chunk(chunk))
+                if progress_callback:
+                    progress_callback(totals['pages'], len(texts))
+        else:
+            context = multiprocessing.get_context('spawn')
+            
+            with context.Pool(
+                processes=workers,
+                initializer=_init_backtest_worker,
+                initargs=(self.config, baseline_patterns)
+            ) as pool:
+                for chunk_result in pool.imap_unordered(_backtest_chunk, chunks):
+                    self._merge(totals, chunk_result)
+                    if progress_callback:
+                        progress_callback(totals['pages'], len(texts))
+                        
+        return self.build_report(totals, time.time() - start_time)
+        
+    def _merge(self, totals: Dict[str, Any], chunk_result: Dict[str, Any]):
+        """ادغام نتیجه یک دسته"""
+        
+        totals['pages'] += chunk_result['pages']
+        
+        for field_name, counters in chunk_result['counters'].items():
+            for name, count in counters.items():
+                totals['counters'][field_name][name] += count
+                
+        for field_name, elapsed in chunk_result['times'].items():
+            totals['times'][field_name] += elapsed
+            
+        for field_name, examples in chunk_result['examples'].items():
+            room = MAX_EXAMPLES - len(totals['examples'][field_name])
+            totals['examples'][field_name].extend(examples[:max(0, room)])
+            
+    def build_report(self, totals: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        """گزارش نهایی هر فیلد"""
+        
+        fields = {}
+        
+        for field_name, counters in totals['counters'].items():
+            pages = counters['pages']
+            fields[field_name] = dict(counters)
+            fields[field_name].update({
+                'hit_rate': round(counters['hits'] / pages * 100, 1) if pages else 0.0,
+                'disagreement_rate': round(counters['disagree'] / counters['hits'] * 100, 1) if counters['hits'] else 0.0,
+                'correction_agreement': round(
+                    counters['correction_fixed'] / counters['correction_pages'] * 100, 1
+                ) if counters['correction_pages'] else None,
+                'regex_time_ms': round(totals['times'][field_name], 2),
+                'regex_ms_per_page': round(totals['times'][field_name] / pages, 4) if pages else 0.0,
+                'examples': totals['examples'][field_name]
+            })
+            
+        return {
+            'pages': totals['pages'],
+            'elapsed': round(elapsed, 2),
+            'fields': fields
+        }
+        
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        """متن خلاصه گزارش آزمون"""
+        
+        lines = [f"📄 {report['pages']} صفحه در {report['elapsed']:.1f} ثانیه"]
+        
+        for field_name, field in report['fields'].items():
+            lines.append(f"\n🔹 {field_name}")
+            lines.append(f"   یافتن: {field['hits']}/{field['pages']} ({field['hit_rate']:.1f}%)")
+            lines.append(
+                f"   موافق: {field['agree']}  مخالف: {field['disagree']} ({field['disagreement_rate']:.1f}%)  "
+                f"جدید: {field['new']}  پیدا نشده: {field['missed']}"
+            )
+            if field['correction_agreement'] is not None:
+                lines.append(
+                    f"   تصحیحات کاربر: {field['correction_fixed']}/{field['correction_pages']} درست "
+                    f"({field['correction_agreement']:.1f}%)، {field['correction_repeated']} تکرار اشتباه"
+                )
+            lines.append(f"   زمان regex: {field['regex_ms_per_page']:.3f} ms/صفحه")
+            
+            for example in field['examples'][:3]:
+                lines.append(f"   ≠ {example['current']} ← {example['candidate']}")
+                
+        return "\n".join(lines)
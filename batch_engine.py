@@ -0,0 +1,310 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⚙️ موتور پردازش دستهای موازی اسناد گمرکی
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import os
+import logging
+import multiprocessing
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Callable
+
+from pattern_stats import PatternStats
+
+# موتور استخراج هر پردازشگر (یک بار در شروع پردازشگر ساخته میشود)
+_worker_extractor = None
+_worker_error = None
+
+# اسناد PDF باز در هر پردازشگر (برای وظایف صفحهای پشت سر هم)
+_worker_documents = {}
+_MAX_OPEN_DOCUMENTS = 2
+
+def _init_worker(config: Dict[str, Any], threads_per_worker: int):
+    """راهاندازی پردازشگر - محدودسازی نخها و ساخت easyocr.Reader"""
+    
+    global _worker_extractor, _worker_error
+    
+    # محدود کردن نخهای OpenCV و torch در هر پردازشگر
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+    
+    import cv2
+    cv2.setNumThreads(threads_per_worker)
+    
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+        
+    from extractor_engine import DocumentExtractor
+    
+    # پردازشگرها خودشان دوباره موازیسازی نمیکنند
+    worker_config = dict(config)
+    worker_config['workers'] = 1
+    
+    # آمار الگوها به پردازه اصلی برگردانده و آنجا ذخیره میشود
+    worker_config['pattern_stats_autoflush'] = False
+    # صفحات دیده شده هر پردازه جداست؛ تکراری بودن صفحه نباید به پردازه انجام دهنده آن بستگی داشته باشد
+    worker_config['page_dedup_enabled'] = False
+    
+    # خطای راهاندازی نباید باعث ساخت مکرر پردازشگر شود
+    try:
+        _worker_extractor = DocumentExtractor(worker_config)
+    except Exception as e:
+        _worker_error = str(e)
+
+def _process_file_task(file_path: str) -> Dict[str, Any]:
+    """پردازش یک فایل در پردازشگر"""
+    
+    try:
+        if _worker_extractor is None:
+            raise RuntimeError(f"خطا در راهاندازی پردازشگر: {_worker_error}")
+        return _worker_extractor.process_single_file(file_path)
+    except Exception as e:
+        return {
+            'type': 'unknown',
+            'pages': [],
+            'total_pages': 0,
+            'status': 'failed',
+            'error': str(e)
+        }
+
+def _get_worker_document(file_path: str):
+    """باز کردن PDF در پردازشگر با نگهداری چند سند اخیر"""
+    
+    import fitz
+    
+    document = _worker_documents.pop(file_path, None)
+    if document is None:
+        document = fitz.open(file_path)
+        
+    # قرار دادن در انتهای ترتیب استفاده و بستن قدیمیترین سند
+    _worker_documents[file_path] = document
+    while len(_worker_documents) > _MAX_OPEN_DOCUMENTS:
+        oldest_path = next(iter(_worker_documents))
+        _worker_documents.pop(oldest_path).close()
+        
+    return document
+
+def _failed_page_result(file_path: str, page_num: int, error: str) -> Dict[str, Any]:
+    """نتیجه صفحهای که پردازش آن با خطا متوقف شد (جای خالی صفحه در نتیجه فایل نمیماند)"""
+    
+    if _worker_extractor is not None:
+        result = _worker_extractor._empty_page_result(file_path, page_num)
+    else:
+        result = {
+            'file': Path(file_path).name,
+            'page': page_num,
+            'document_type': 'unknown',
+            'extracted': {},
+            'text_length': 0,
+            'full_text': '',
+            'processing_time': '0s',
+            'success_rate': '0%',
+            'status': 'failed'
+        }
+        
+    result['error'] = error
+    return result
+
+def _process_page_task(task: Tuple[int, str, Optional[int]]) -> Tuple[int, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """پردازش یک وظیفه - یک صفحه PDF یا یک فایل کامل (همراه با آمار الگوهای این وظیفه)"""
+    
+    task_id, file_path, page_num = task
+    
+    # فایل کامل (تصویر یا PDF غیرقابل تقسیم)
+    if page_num is None:
+        return task_id, _process_file_task(file_path), _drain_worker_stats()
+        
+    try:
+        if _worker_extractor is None:
+            raise RuntimeError(f"خطا در راهاندازی پردازشگر: {_worker_error}")
+            
+        document = _get_worker_document(file_path)
+        result = _worker_extractor.process_pdf_page(document, page_num, file_path)
+        
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"⚠️ خطا در پردازش صفحه {page_num} از {file_path}: {e}")
+        result = _failed_page_result(file_path, page_num, str(e))
+        
+    return task_id, result, _drain_worker_stats()
+
+def _drain_worker_stats() -> Optional[Dict[str, Any]]:
+    """برداشتن آمار الگوهای پردازشگر برای ارسال به پردازه اصلی"""
+    
+    if _worker_extractor is None:
+        return None
+    return _worker_extractor.pattern_stats.drain()
+
+class BatchEngine:
+    def __init__(self, config: Optional[Dict[str, Any]] = None, learning_system=None):
+        """موتور پردازش دستهای با چند پردازشگر"""
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.config = dict(config or {})
+        
+        # آمار الگوهای همه پردازشگرها - به صورت دستهای در سیستم یادگیری ذخیره میشود
+        self.learning_system = learning_system
+        self.pattern_stats = PatternStats()
+        self.stats_flush_pages = int(self.config.get('pattern_stats_flush_pages', 50))
+        
+        # تعداد پردازشگرها و نخهای هر پردازشگر
+        self.threads_per_worker = max(1, int(self.config.get('threads_per_worker', 1)))
+        
+        workers = int(self.config.get('workers', 0) or 0)
+        if workers <= 0:
+            workers = max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        self.workers = workers
+        
+    def process(self, files: List[str],
+                progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """پردازش فایلها - نتایج به ترتیب ارسال برگردانده میشوند"""
+        
+        files = list(files)
+        if not files:
+            return
+            
+        # تقسیم فایلها به وظایف صفحهای
+        tasks, file_tasks = self.build_tasks(files)
+        
+        workers = min(self.workers, len(tasks))
+        
+        self.logger.info(f"🚀 پردازش {len(files)} فایل ({len(tasks)} وظیفه) با {workers} پردازشگر")
+        
+        # spawn برای سازگاری با torch و رابط گرافیکی
+        context = multiprocessing.get_context('spawn')
+        
+        task_results = {}
+        next_file = 0
+        
+        try:
+            with context.Pool(
+                processes=workers,
+                initializer=_init_worker,
+                initargs=(self.config, self.threads_per_worker)
+            ) as pool:
+                # صف مشترک - هر پردازشگر آزاد وظیفه بعدی را از هر سندی برمیدارد
+                results = pool.imap_unordered(_process_page_task, tasks, chunksize=1)
+                
+                for task_id, result, stats in results:
+                    task_results[task_id] = result
+                    
+                    # ادغام آمار الگوها و ذخیره دستهای
+                    self.pattern_stats.merge(stats)
+                    if self.pattern_stats.pages >= self.stats_flush_pages:
+                        self.flush_pattern_stats()
+                        
+                    # تحویل فایلهای کامل شده به ترتیب ارسال
+                    while next_file < len(files) and all(
+                        task_id in task_results for task_id in file_tasks[next_file]
+                    ):
+                        file_path = files[next_file]
+                        file_result = self.assemble_file_result(
+                            file_path,
+                            [task_results.pop(task_id) for task_id in file_tasks[next_file]]
+                        )
+                        next_file += 1
+                        
+                        if progress_callback:
+                            progress_callback(next_file, len(files), file_path)
+                            
+                        yield file_path, file_result
+                        
+        finally:
+            self.flush_pattern_stats()
+            
+    def flush_pattern_stats(self):
+        """ذخیره آمار ادغام شده پردازشگرها در سیستم یادگیری"""
+        
+        if not self.config.get('pattern_stats_enabled', True):
+            return
+            
+        snapshot = self.pattern_stats.drain()
+        if snapshot is None:
+            return
+            
+        try:
+            if self.learning_system is None:
+                from learning_system import LearningSystem
+                self.learning_system = LearningSystem()
+            self.learning_system.record_pattern_stats(snapshot)
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در ذخیره آمار الگوها: {e}")
+            
+    def build_tasks(self, files: List[str]) -> Tuple[List[Tuple[int, str, Optional[int]]], List[List[int]]]:
+        """ساخت وظایف - هر صفحه PDF یک وظیفه، سایر فایلها یک وظیفه"""
+        
+        tasks = []
+        file_tasks = []
+        
+        for file_path in files:
+            page_count = 0
+            
+            if self.config.get('page_tasks', True) and Path(file_path).suffix.lower() == '.pdf':
+                page_count = self.count_pdf_pages(file_path)
+                
+            task_ids = []
+            
+            if page_count > 0:
+                for page_num in range(page_count):
+                    task_ids.append(len(tasks))
+                    tasks.append((len(tasks), file_path, page_num))
+            else:
+                task_ids.append(len(tasks))
+                tasks.append((len(tasks), file_path, None))
+                
+            file_tasks.append(task_ids)
+            
+        return tasks, file_tasks
+        
+    def count_pdf_pages(self, file_path: str) -> int:
+        """شمارش صفحات PDF (صفر در صورت خطا)"""
+        
+        try:
+            import fitz
+            with fitz.open(file_path) as document:
+                return len(document)
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در شمارش صفحات {file_path}: {e}")
+            return 0
+            
+    def assemble_file_result(self, file_path: str, task_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """بازسازی نتیجه فایل از نتایج وظایف صفحهای
+        
+        صفحههای با خطا به صورت نتیجه خالی در جای خود میمانند؛ فایل با بخشی از صفحات ناموفق partial است
+        """
+        
+        # وظیفه فایل کامل - نتیجه همان خروجی process_single_file است
+        if len(task_results) == 1 and 'pages' in task_results[0]:
+            return task_results[0]
+            
+        errors = sum(1 for result in task_results if 'error' in result)
+        
+        if errors == len(task_results):
+            status = 'failed'
+        elif errors:
+            status = 'partial'
+            self.logger.warning(f"⚠️ {errors} صفحه از {Path(file_path).name} با خطا پردازش نشد")
+        else:
+            status = 'success'
+            
+        return {
+            'type': 'pdf',
+            'pages': task_results,
+            'total_pages': len(task_results),
+            'status': status
+        }
+        
+    def process_files(self, files: List[str]) -> Dict[str, Any]:
+        """پردازش لیست فایلها و برگرداندن دیکشنری نتایج"""
+        
+        all_results = {}
+        
+        for file_path, result in self.process(files):
+            all_results[file_path] = result
+            
+        return all_results
@@ -0,0 +1,235 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🖥️ اجرای خط فرمان استخراج اسناد گمرکی (بدون رابط گرافیکی)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import sys
+import os
+import json
+import glob
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Tuple
+
+# کدهای خروج
+EXIT_OK = 0
+EXIT_FAILED_FILES = 1
+EXIT_ERROR = 2
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.png', '.jpg', '.jpeg']
+
+def collect_files(inputs: List[str], recursive: bool = False) -> List[str]:
+    """جمعآوری فایلها از مسیر فایل، پوشه یا الگوی glob"""
+    
+    files = []
+    seen = set()
+    
+    def add(path: Path):
+        if path.suffix.lower() in SUPPORTED_EXTENSIONS and path.is_file():
+            key = str(path.resolve())
+            if key not in seen:
+                seen.add(key)
+                files.append(str(path))
+                
+    for item in inputs:
+        path = Path(item)
+        
+        if path.is_dir():
+            candidates = path.rglob('*') if recursive else path.iterdir()
+            for candidate in sorted(candidates):
+                add(candidate)
+        elif path.exists():
+            add(path)
+        else:
+            # الگوی glob
+            for match in sorted(glob.glob(item, recursive=True)):
+                add(Path(match))
+                
+    return files
+
+def load_settings_config(settings_path: str) -> Dict[str, Any]:
+    """تبدیل settings.json برنامه به تنظیمات موتور استخراج"""
+    
+    config = {}
+    
+    if not settings_path or not os.path.exists(settings_path):
+        return config
+        
+    with open(settings_path, 'r', encoding='utf-8') as f:
+        settings = json.load(f)
+        
+    for key in ['confidence_threshold', 'dpi', 'workers', 'threads_per_worker']:
+        if key in settings:
+            config[key] = settings[key]
+            
+    languages = settings.get('languages')
+    if isinstance(languages, dict):
+        enabled = [lang for lang, active in languages.items() if active]
+        if enabled:
+            config['languages'] = enabled
+    elif isinstance(languages, list) and languages:
+        config['languages'] = languages
+        
+    return config
+
+def iter_results(files: List[str], config: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """پردازش فایلها - موازی با BatchEngine یا در همین پردازه"""
+    
+    if int(config.get('workers', 1) or 0) != 1:
+        from batch_engine import BatchEngine
+        
+        yield from BatchEngine(config).process(files)
+        return
+        
+    from extractor_engine import DocumentExtractor
+    
+    extractor = DocumentExtractor(config)
+    
+    try:
+        for file_path in files:
+            yield file_path, extractor.process_single_file(file_path)
+    finally:
+        # ذخیره آمار باقیمانده الگوها
+        extractor.flush_pattern_stats()
+
+class JsonLinesWriter:
+    def __init__(self, output_file: str):
+        """نوشتن جریانی نتایج به صورت JSON Lines (هر فایل یک خط)"""
+        
+        if output_file == '-':
+            self.stream = sys.stdout
+            self._owns_stream = False
+        else:
+            self.stream = open(output_file, 'w', encoding='utf-8')
+            self._owns_stream = True
+            
+    def write_result(self, file_path: str, result: Dict[str, Any]):
+        """افزودن نتیجه یک فایل"""
+        
+        record = {'file': file_path}
+        record.update(result)
+        
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+        
+    def close(self):
+        """بستن خروجی"""
+        
+        if self._owns_stream:
+            self.stream.close()
+
+def create_writer(output_file: str, output_format: str):
+    """ساخت نویسنده خروجی - Excel فقط در صورت درخواست بارگذاری میشود"""
+    
+    if output_format == 'excel':
+        from excel_export import ExcelStreamWriter
+        return ExcelStreamWriter(output_file)
+        
+    return JsonLinesWriter(output_file)
+
+def build_parser() -> argparse.ArgumentParser:
+    """تعریف آرگومانهای خط فرمان"""
+    
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description='استخراج فیلدهای اسناد گمرکی بدون رابط گرافیکی'
+    )
+    
+    parser.add_argument('inputs', nargs='+', help='فایل، پوشه یا الگوی glob')
+    parser.add_argument('-o', '--output', default='-',
+                        help='فایل خروجی (.jsonl یا .xlsx) - پیشفرض: stdout به صورت JSON Lines')
+    parser.add_argument('-f', '--format', choices=['jsonl', 'excel'],
+                        help='قالب خروجی (پیشفرض بر اساس پسوند فایل خروجی)')
+    parser.add_argument('-r', '--recursive', action='store_true', help='جستجوی زیرپوشهها')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='تعداد پردازشگرها (0 = خودکار، 1 = بدون موازیسازی)')
+    parser.add_argument('--threads-per-worker', type=int, help='تعداد نخهای هر پردازشگر')
+    parser.add_argument('--dpi', type=int, help='وضوح رندر PDF')
+    parser.add_argument('--confidence', type=float, help='حد آستانه اطمینان')
+    parser.add_argument('--settings', default='settings.json', help='فایل تنظیمات برنامه')
+    parser.add_argument('--no-cache', action='store_true', help='غیرفعال کردن کش پایدار OCR')
+    parser.add_argument('-q', '--quiet', action='store_true', help='بدون نمایش پیشرفت')
+    parser.add_argument('-v', '--verbose', action='store_true', help='نمایش لاگهای موتور')
+    
+    return parser
+
+def main(argv: List[str] = None) -> int:
+    """نقطه ورود خط فرمان"""
+    
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        stream=sys.stderr,
+        format='%(levelname)s:%(name)s:%(message)s'
+    )
+    
+    output_format = args.format
+    if output_format is None:
+        output_format = 'excel' if Path(args.output).suffix.lower() == '.xlsx' else 'jsonl'
+        
+    if output_format == 'excel' and args.output == '-':
+        print("❌ خروجی Excel نیاز به مسیر فایل دارد (-o output.xlsx)", file=sys.stderr)
+        return EXIT_ERROR
+        
+    files = collect_files(args.inputs, args.recursive)
+    if not files:
+        print("❌ هیچ فایل قابل پردازشی یافت نشد", file=sys.stderr)
+        return EXIT_ERROR
+        
+    # تنظیمات: settings.json و سپس آرگومانهای خط فرمان
+    try:
+        config = load_settings_config(args.settings)
+    except Exception as e:
+        print(f"❌ خطا در خواندن تنظیمات {args.settings}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+        
+    overrides = {
+        'workers': args.workers,
+        'threads_per_worker': args.threads_per_worker,
+        'dpi': args.dpi,
+        'confidence_threshold': args.confidence
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    
+    if args.no_cache:
+        config['ocr_cache_enabled'] = False
+        
+    failed = 0
+    
+    try:
+        writer = create_writer(args.output, output_format)
+        
+        try:
+            for index, (file_path, result) in enumerate(iter_results(files, config), 1):
+                writer.write_result(file_path, result)
+                
+                status = result.get('status', 'failed')
+                if status != 'success':
+                    failed += 1
+                    
+                if not args.quiet:
+                    icon = '✅' if status == 'success' else '❌'
+                    print(f"[{index}/{len(files)}] {icon} {file_path}", file=sys.stderr, flush=True)
+        finally:
+            writer.close()
+            
+    except KeyboardInterrupt:
+        print("⏹️ پردازش متوقف شد", file=sys.stderr)
+        return EXIT_ERROR
+    except Exception as e:
+        print(f"❌ خطا در پردازش: {e}", file=sys.stderr)
+        return EXIT_ERROR
+        
+    if not args.quiet:
+        print(f"📊 {len(files) - failed} موفق، {failed} ناموفق از {len(files)} فایل", file=sys.stderr)
+        
+    return EXIT_FAILED_FILES if failed else EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 خروجی Excel نتایج استخراج (بدون وابستگی به رابط گرافیکی)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Tuple
+
+# ستونهای خروجی Excel
+EXCEL_COLUMNS = [
+    'ردیف', 'نام فایل', 'وضعیت', 'زمان پردازش',
+    'شماره کوتا', 'کد کالا', 'شرح کالا', 'نوع بسته', 'تعداد بسته',
+    'وزن خالص', 'کشور طرف معامله', 'نرخ ارز', 'نوع ارز',
+    'ارزش گمرکی', 'بیمه', 'کرایه', 'حقوق ورودی', 'مالیات', 'جمع عوارض', 'توضیحات'
+]
+
+# فیلدهای استخراج شده به ترتیب ستونها
+EXCEL_FIELDS = [
+    'شماره_کوتا', 'کد_کالا', 'شرح_کالا', 'نوع_بسته', 'تعداد_بسته',
+    'وزن_خالص', 'کشور_طرف_معامله', 'نرخ_ارز', 'نوع_ارز',
+    'ارزش_گمرکی', 'بیمه', 'کرایه', 'مبلغ_حقوق_ورودی',
+    'مالیات_بر_ارزش_افزوده', 'جمع_حقوق_عوارض'
+]
+
+# عرض ستونها
+EXCEL_COLUMN_WIDTHS = {
+    'A': 8, 'B': 25, 'C': 12, 'D': 15, 'E': 15, 'F': 12,
+    'G': 30, 'H': 12, 'I': 12, 'J': 12, 'K': 20, 'L': 12,
+    'M': 10, 'N': 15, 'O': 12, 'P': 12, 'Q': 15, 'R': 12, 'S': 15, 'T': 35
+}
+
+def prepare_excel_row(row_num: int, file_path: str, result: Dict[str, Any]) -> List[Any]:
+    """تهیه ردیف برای Excel"""
+    
+    file_name = Path(file_path).name
+    status = result.get('status', 'نامشخص')
+    processing_time = result.get('processing_time', '0s')
+    
+    extracted = result.get('extracted', {})
+    
+    return [
+        row_num,
+        file_name,
+        {'success': 'موفق', 'skipped': 'رد شده', 'partial': 'ناقص'}.get(status, 'ناموفق'),
+        processing_time
+    ] + [extracted.get(field, {}).get('value', '') for field in EXCEL_FIELDS] + [page_note(result)]
+
+def page_note(result: Dict[str, Any]) -> str:
+    """توضیح صفحههای رد شده یا ناموفق (دلیل بررسی اولیه یا خطا)"""
+    
+    return result.get('skip_detail') or result.get('error') or ''
+
+def iter_result_pages(file_path: str, result: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    """صفحات نتیجه یک فایل (نتایج بدون صفحه یک ردیف هستند)"""
+    
+    if 'pages' in result:
+        return result['pages']
+        
+    return [result]
+
+class ExcelStreamWriter:
+    def __init__(self, output_file: str):
+        """نوشتن جریانی ردیفها در Excel (openpyxl در حالت write-only)"""
+        
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, Alignment, PatternFill
+        
+        self.output_file = output_file
+        self._cell_class = WriteOnlyCell
+        
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Sheet1')
+        
+        # تنظیم عرض ستونها (باید پیش از نوشتن ردیفها باشد)
+        for col, width in EXCEL_COLUMN_WIDTHS.items():
+            self.sheet.column_dimensions[col].width = width
+            
+        # سبکها: راستچین و فونت Tahoma، هدر رنگی
+        self.alignment = Alignment(horizontal='right', vertical='center')
+        self.body_font = Font(name='Tahoma', size=10)
+        self.header_font = Font(name='Tahoma', size=11, bold=True, color='FFFFFF')
+        self.header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        
+        self.row_num = 1
+        self._write_row(EXCEL_COLUMNS, header=True)
+        
+    def _write_row(self, values: List[Any], header: bool = False):
+        """نوشتن یک ردیف با سبک مناسب"""
+        
+        cells = []
+        
+        for value in values:
+            cell = self._cell_class(self.sheet, value=value)
+            cell.alignment = self.alignment
+            
+            if header:
+                cell.font = self.header_font
+                cell.fill = self.header_fill
+            else:
+                cell.font = self.body_font
+                
+            cells.append(cell)
+            
+        self.sheet.append(cells)
+        
+    def write_result(self, file_path: str, result: Dict[str, Any]):
+        """افزودن ردیفهای یک فایل"""
+        
+        for page_result in iter_result_pages(file_path, result):
+            self._write_row(prepare_excel_row(self.row_num, file_path, page_result))
+            self.row_num += 1
+            
+    def close(self):
+        """ذخیره فایل"""
+        
+        self.workbook.save(self.output_file)
+
+def write_excel(results: Iterable[Tuple[str, Dict[str, Any]]], output_file: str):
+    """تولید فایل Excel از جفتهای (مسیر فایل، نتیجه)"""
+    
+    writer = ExcelStreamWriter(output_file)
+    
+    for file_path, result in results:
+        writer.write_result(file_path, result)
+        
+    writer.close()
@@ -9,17 +9,66 @@
 import cv2
 import numpy as np
 import easyocr
+from easyocr.utils import reformat_input, group_text_box, get_paragraph, diff
 import fitz  # PyMuPDF
 import re
 import json
+import unicodedata
 from pathlib import Path
 import logging
 from PIL import Image
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
 
+from ocr_cache import OCRCache, PAGE_TEXT, ORIENTATION
+from pattern_scanner import FieldScanner
+from regex_guard import RegexGuard
+from learned_tier import LearnedPatternTier
+from pattern_stats import PatternStats
+from layout_index import PageLayout, compact_ocr_results
+from field_zones import (
+    DOCUMENT_TITLE_ZONE, TITLE_MULTI_KEYWORDS, TITLE_SINGLE_KEYWORDS,
+    merge_field_zones, zone_pixels, crop_zone, crop_box_to_page
+)
+from layout_templates import LayoutTemplateCache
+from page_probe import render_probe_gray, probe_summary, describe_probe, is_declaration_text
+from page_orientation import (
+    SKEW_WIDTH, downscale, estimate_skew, orientation_candidates,
+    densest_text_band, rotate_page, upright_score
+)
+from page_dedup import PageDeduplicator
+
+class PageRaster:
+    def __init__(self, pixmap, source_path: str, page_num: int):
+        """تصویر صفحه در حافظه - آرایه numpy مستقیم روی بافر Pixmap (بدون کپی)"""
+        
+        # نگهداری Pixmap تا زمانی که آرایه استفاده میشود
+        self.pixmap = pixmap
+        self.source_path = source_path
+        self.page_num = page_num
+        
+        # نتیجه بررسی اولیه صفحه (در صورت اجرا)
+        self.probe = None
+        
+        samples = np.frombuffer(pixmap.samples_mv, dtype=np.uint8)
+        samples = samples.reshape(pixmap.height, pixmap.stride)[:, :pixmap.width * pixmap.n]
+        
+        if pixmap.n == 1:
+            self.array = samples
+        else:
+            self.array = samples.reshape(pixmap.height, pixmap.width, pixmap.n)
+            
+    def save(self, path: str) -> str:
+        """ذخیره تصویر روی دیسک (فقط برای پیشنمایش)"""
+        self.pixmap.save(path)
+        return path
+        
 class DocumentExtractor:
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, learning_system=None):
         """موتور استخراج پیشرفته"""
         
         # تنظیم logging
@@ -32,15 +81,96 @@ class DocumentExtractor:
             'device': 'cpu',
             'languages': ['fa', 'en', 'ar'],
             'dpi': 300,
-            'enhance_image': True
+            'enhance_image': True,
+            'ocr_cascade': True,
+            'detect_once': True,
+            'use_text_layer': True,
+            'min_text_layer_chars': 50,
+            'workers': 1,
+            'threads_per_worker': 1,
+            'page_tasks': True,
+            'ocr_cache_enabled': True,
+            'ocr_cache_path': 'cache/ocr_cache.db',
+            'ocr_cache_max_mb': 512,
+            'memory_cache_pages': 32,
+            'pipeline_enabled': True,
+            'pipeline_queue_size': 2,
+            'regex_time_budget_ms': 250,
+            'regex_max_strikes': 3,
+            'learned_patterns_enabled': True,
+            'learned_min_accuracy': 70.0,
+            'learned_reload_interval': 1.0,
+            'pattern_stats_enabled': True,
+            'pattern_stats_autoflush': True,
+            'pattern_stats_flush_pages': 50,
+            'layout_extraction': True,
+            'zone_ocr_enabled': True,
+            'field_zones_path': 'patterns/field_zones.json',
+            'layout_templates_enabled': True,
+            'layout_templates_path': 'patterns/layout_templates.json',
+            'layout_templates_max': 200,
+            'layout_template_similarity': 0.9,
+            'probe_enabled': True,
+            'probe_dpi': 72,
+            'probe_blank_ink': 0.003,
+            'probe_min_form_lines': 8,
+            'probe_skip_attachments': False,
+            'auto_orient': True,
+            'orientation_ocr_check': True,
+            'deskew_max_angle': 5.0,
+            'deskew_min_angle': 0.3,
+            'page_dedup_enabled': False,
+            'dedup_max_distance': 6,
+            'dedup_blank_ink': 0.003,
+            'dedup_max_pages': 128
         }
         
+        # اعمال تنظیمات ورودی (مثلا در پردازشگرهای موازی)
+        if config:
+            self.config.update(config)
+        
+        # تنظیمات مختلف OCR (به ترتیب هزینه برای حالت آبشاری)
+        # خروجی detail=1 کادر هر متن را برای استخراج بر اساس چیدمان نگه میدارد
+        self.ocr_configs = [
+            {'detail': 1, 'paragraph': False, 'width_ths': 0.7, 'height_ths': 0.7},
+            {'detail': 1, 'paragraph': True, 'width_ths': 0.5, 'height_ths': 0.5},
+            {'detail': 1, 'paragraph': False, 'width_ths': 0.9, 'height_ths': 0.9}
+        ]
+        
+        # نام نسخههای پیشپردازش (به ترتیب خروجی iter_preprocessed_variants)
+        self.preprocess_variant_names = ['gray', 'clahe', 'contrast', 'unsharp', 'morph_close']
+        
         # راهاندازی OCR
         self.setup_ocr()
         
+        # نگهبان زمان اجرای الگوها (سقف زمانی هر الگو روی هر صفحه)
+        self.regex_guard = RegexGuard(
+            self.config['regex_time_budget_ms'],
+            self.config['regex_max_strikes']
+        )
+        
         # الگوهای فیلدها
         self.setup_field_patterns()
         
+        # ناحیه فیلدها در فرم استاندارد (OCR ناحیهای پیش از OCR کل صفحه)
+        self.field_zones = self.load_field_zones()
+        self.last_zone_info = {}
+        
+        # آخرین تخمین جهت صفحه (برای بررسی وارونگی با OCR پس از شکست استخراج)
+        self.last_orientation = {}
+        
+        # قالبهای چیدمان یاد گرفته شده (محل کادر مقدار فیلدها در چیدمانهای تکراری)
+        self.setup_layout_templates()
+        self.setup_page_dedup()
+        
+        # الگوهای یاد گرفته شده (سیستم یادگیری در اولین استفاده ساخته میشود)
+        self.learning_system = learning_system
+        self.learned_tier = None
+        self.configure_learning_analyzer()
+        
+        # آمار عملکرد الگوها (محلی - به صورت دستهای در سیستم یادگیری ذخیره میشود)
+        self.pattern_stats = PatternStats()
+        
         # نوعهای سند پشتیبانی شده
         self.document_types = {
             'import_single': 'واردات تککالایی',
@@ -49,8 +179,64 @@ class DocumentExtractor:
             'export_multi': 'صادرات چندکالایی'
         }
         
-        # کش برای نتایج OCR
-        self.ocr_cache = {}
+        # فیلدهای ضروری هر نوع سند (شرط توقف زودهنگام آبشار OCR)
+        self.required_fields = {
+            'import_single': ['شماره_کوتا', 'کد_کالا', 'وزن_خالص', 'ارزش_گمرکی'],
+            'import_multi': ['شماره_کوتا', 'کد_کالا', 'وزن_خالص'],
+            'export_single': ['کد_کالا', 'وزن_خالص', 'ارزش_گمرکی'],
+            'export_multi': ['کد_کالا', 'وزن_خالص']
+        }
+        
+        # فیلدهای کالا برای صفحات بعدی اسناد چندصفحهای
+        self.item_fields = [
+            'شرح_کالا', 'تعداد_بسته', 'نوع_بسته', 'وزن_خالص',
+            'کد_کالا', 'بیمه', 'کرایه', 'تعداد_واحد_کالا',
+            'ارزش_قلم_کالا', 'ارزش_گمرکی', 'مبلغ_حقوق_ورودی',
+            'مالیات_بر_ارزش_افزوده', 'جمع_حقوق_عوارض'
+        ]
+        
+        # برچسب چاپی هر فیلد در فرم (برای یافتن مقدار در کادر کنار برچسب)
+        self.field_labels = {
+            'شماره_کوتا': ['کوتا'],
+            'کد_کالا': ['کد کالا'],
+            'شرح_کالا': ['شرح کالا'],
+            'نوع_بسته': ['نوع بسته'],
+            'تعداد_بسته': ['تعداد بسته'],
+            'وزن_خالص': ['وزن خالص'],
+            'کشور_طرف_معامله': ['کشور طرف معامله'],
+            'نرخ_ارز': ['نرخ ارز'],
+            'نوع_ارز': ['نوع ارز'],
+            'نوع_معامله': ['نوع معامله'],
+            'بیمه': ['بیمه'],
+            'کرایه': ['کرایه'],
+            'تعداد_واحد_کالا': ['تعداد واحد کالا'],
+            'ارزش_قلم_کالا': ['ارزش قلم کالا'],
+            'ارزش_گمرکی': ['ارزش گمرکی'],
+            'مبلغ_حقوق_ورودی': ['حقوق ورودی'],
+            'مالیات_بر_ارزش_افزوده': ['مالیات بر ارزش افزوده'],
+            'جمع_حقوق_عوارض': ['جمع حقوق و عوارض']
+        }
+        
+        # فیلدهای متنی (مقدار کامل کادر)؛ بقیه فیلدها از یک کلمه کادر خوانده میشوند
+        self.text_value_fields = ['شرح_کالا', 'نوع_بسته', 'کشور_طرف_معامله', 'نوع_معامله']
+        
+        # کش برای نتایج OCR (در حافظه - کلید بر اساس محتوای تصویر، حذف LRU مثل کش دیسکی)
+        self.ocr_cache = OrderedDict()
+        
+        # کش پایدار پاسهای OCR روی دیسک
+        self.persistent_cache = None
+        if self.config.get('ocr_cache_enabled'):
+            self.persistent_cache = OCRCache(
+                self.config['ocr_cache_path'],
+                self.config['ocr_cache_max_mb']
+            )
+        
+        # اطلاعات آخرین اجرای OCR (مرحله پایان آبشار و تعداد پاسها)
+        self.last_ocr_info = {}
+        
+        # تحلیلگر هزینه الگوها (در اولین استفاده ساخته میشود)
+        self.pattern_analyzer = None
+        self.last_pattern_analysis = None
         
     def setup_ocr(self):
         """راهاندازی موتور OCR"""
@@ -70,6 +256,41 @@ class DocumentExtractor:
             self.logger.error(f"❌ خطا در راهاندازی OCR: {e}")
             raise
             
+    def setup_layout_templates(self):
+        """راهاندازی کش قالبهای چیدمان (در صورت فعال بودن)"""
+        
+        self.layout_templates = None
+        
+        if self.config['layout_templates_enabled']:
+            self.layout_templates = LayoutTemplateCache(
+                self.config['layout_templates_path'],
+                self.config['layout_templates_max'],
+                self.config['layout_template_similarity']
+            )
+            
+    def setup_page_dedup(self):
+        """راهاندازی تشخیص صفحات خالی و تکراری دسته (در صورت فعال بودن)"""
+        
+        self.page_dedup = None
+        
+        if self.config['page_dedup_enabled']:
+            self.page_dedup = PageDeduplicator(
+                self.config['dedup_max_distance'],
+                self.config['dedup_blank_ink'],
+                self.config['dedup_max_pages']
+            )
+            
+    def reset_page_dedup(self):
+        """شروع دسته جدید - صفحات دسته قبلی تکراری حساب نمیشوند"""
+        
+        if self.page_dedup is not None:
+            if self.page_dedup.blank_pages or self.page_dedup.duplicate_pages:
+                self.logger.info(
+                    f"🪞 {self.page_dedup.blank_pages} صفحه خالی و "
+                    f"{self.page_dedup.duplicate_pages} صفحه تکراری بدون OCR"
+                )
+            self.page_dedup.reset()
+            
     def setup_field_patterns(self):
         """تنظیم الگوهای استخراج فیلدها - نسخه پیشرفته"""
         
@@ -355,6 +576,20 @@ class DocumentExtractor:
         # الگوهای صادراتی (مشابه وارداتی با تنظیمات جزئی)
         self.export_patterns = self.import_patterns.copy()
         
+        # کامپایل یک باره الگوها برای اسکن همه فیلدها
+        self.build_field_scanners()
+        
+    def build_field_scanners(self):
+        """ساخت اسکنرهای کامپایل شده (پس از هر تغییر در الگوها دوباره فراخوانی شود)"""
+        
+        self.field_scanners = {
+            'import': FieldScanner(self.import_patterns, guard=self.regex_guard),
+            'export': FieldScanner(self.export_patterns, guard=self.regex_guard)
+        }
+        
+        # نسخه الگوهای هر فیلد دوباره محاسبه میشود
+        self._pattern_versions = {}
+        
     def detect_document_type(self, text: str) -> str:
         """تشخیص نوع سند - بهبود یافته"""
         
@@ -419,16 +654,8 @@ class DocumentExtractor:
             for page_num in range(len(pdf_document)):
                 try:
                     # تبدیل صفحه به تصویر
-                    page = pdf_document[page_num]
-                    
-                    # تنظیمات کیفیت بالا
-                    matrix = fitz.Matrix(self.config['dpi']/72, self.config['dpi']/72)
-                    pix = page.get_pixmap(matrix=matrix, alpha=False)
-                    
-                    # ذخیره تصویر
-                    img_path = temp_dir / f"{Path(pdf_path).stem}_page_{page_num}.png"
-                    pix.save(str(img_path))
-                    images.append(str(img_path))
+                    img_path = self.render_pdf_page(pdf_document, page_num, pdf_path)
+                    images.append(img_path)
                     
                     self.logger.info(f"✅ صفحه {page_num + 1} تبدیل شد")
                     
@@ -445,114 +672,752 @@ class DocumentExtractor:
             self.logger.error(f"❌ خطا در تبدیل PDF: {e}")
             return []
             
-    def preprocess_image_advanced(self, image_path: str) -> tuple:
-        """پیشپردازش پیشرفته تصویر"""
+    def render_pdf_page(self, pdf_document, page_num: int, pdf_path: str) -> str:
+        """تبدیل یک صفحه PDF به تصویر در پوشه temp"""
+        
+        page = pdf_document[page_num]
+        
+        # تنظیمات کیفیت بالا
+        matrix = fitz.Matrix(self.config['dpi']/72, self.config['dpi']/72)
+        pix = page.get_pixmap(matrix=matrix, alpha=False)
+        
+        # ذخیره تصویر
+        img_path = self.get_page_image_path(pdf_path, page_num)
+        pix.save(img_path)
+        
+        return img_path
+        
+    def get_page_image_path(self, pdf_path: str, page_num: int) -> str:
+        """مسیر تصویر موقت صفحه - یکتا برای PDFهای همنام در پوشههای مختلف"""
+        
+        temp_dir = Path("temp")
+        temp_dir.mkdir(exist_ok=True)
+        
+        path_hash = hashlib.md5(str(Path(pdf_path).resolve()).encode('utf-8')).hexdigest()[:8]
+        
+        return str(temp_dir / f"{Path(pdf_path).stem}_{path_hash}_page_{page_num}.png")
+        
+    def get_page_text_layer(self, page) -> str:
+        """استخراج لایه متنی صفحه PDF - رشته خالی اگر لایه متنی قابل استفاده نباشد"""
         
         try:
-            # خواندن تصویر
-            image = cv2.imread(image_path)
-            if image is None:
-                return None, None, None
+            raw_text = page.get_text("text")
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در خواندن لایه متنی صفحه {page.number}: {e}")
+            return ""
+            
+        if not raw_text or not raw_text.strip():
+            return ""
+            
+        # تبدیل حروف نمایشی (Presentation Forms) به حروف پایه
+        text = unicodedata.normalize('NFKC', raw_text)
+        
+        # یکسانسازی ی و ک عربی با فارسی
+        text = text.replace('ي', 'ی').replace('ك', 'ک')
+        
+        text = self.normalize_digits(text)
+        text = self.clean_text(text)
+        
+        # لایه متنی باید به اندازه کافی حروف فارسی/انگلیسی داشته باشد
+        letters = len(re.findall(r'[\u0600-\u06FFa-zA-Z]', text))
+        if letters < self.config['min_text_layer_chars']:
+            return ""
+            
+        return text
+        
+    def process_pdf_page(self, pdf_document, page_num: int, pdf_path: str) -> Dict[str, Any]:
+        """پردازش یک صفحه PDF - لایه متنی در صورت وجود، در غیر این صورت OCR"""
+        
+        start_time = time.time()
+        
+        page_input = self.prepare_pdf_page(pdf_document, page_num, pdf_path)
+        
+        return self.process_prepared_page(page_input, pdf_path, start_time)
+        
+    def prepare_pdf_page(self, pdf_document, page_num: int, pdf_path: str) -> tuple:
+        """مرحله رندر - بررسی اولیه، سپس لایه متنی یا تصویر صفحه در حافظه"""
+        
+        page = pdf_document[page_num]
+        text = self.get_page_text_layer(page) if self.config.get('use_text_layer') else ""
+        
+        # بررسی با وضوح پایین - صفحات خالی و پیوستها با وضوح کامل رندر نمیشوند
+        probe = None
+        if self.config['probe_enabled']:
+            probe = self.probe_pdf_page(page, page_num, text)
+            
+            if probe['kind'] == 'blank' or (probe['kind'] == 'attachment' and self.config['probe_skip_attachments']):
+                return ('skipped', page_num, probe)
                 
-            # تبدیل به grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # مسیر سریع: استفاده مستقیم از لایه متنی بدون رندر و OCR
+        if text:
+            return ('native', page_num, text)
+            
+        # صفحه تصویری - رندر در حافظه
+        raster = self.render_page_raster(pdf_document, page_num, pdf_path)
+        raster.probe = probe
+        
+        return ('raster', page_num, raster)
+        
+    def probe_pdf_page(self, page, page_num: int, text: str = "") -> Dict[str, Any]:
+        """بررسی اولیه صفحه: خالی/محتوا، جهت متن، اظهارنامه یا پیوست و وجود لایه متنی
+        
+        صفحه اول همیشه جزو اظهارنامه است؛ صفحات بعدی با کلمات فرم (لایه متنی)،
+        قالبهای چیدمان شناخته شده یا تعداد خطوط جدول فرم تشخیص داده میشوند
+        """
+        
+        if text:
+            kind = 'declaration' if page_num == 0 or is_declaration_text(text) else 'attachment'
+            return {'kind': kind, 'text_layer': True}
+            
+        gray = render_probe_gray(page, self.config['probe_dpi'])
+        probe = probe_summary(gray)
+        probe['text_layer'] = False
+        
+        if probe['ink'] < self.config['probe_blank_ink']:
+            probe['kind'] = 'blank'
+        elif page_num == 0:
+            probe['kind'] = 'declaration'
+        elif self.layout_templates is not None and self.layout_templates.find(
+            self.layout_templates.fingerprint(gray), page_num
+        ):
+            probe['kind'] = 'declaration'
+        elif probe['form_lines'] >= self.config['probe_min_form_lines']:
+            probe['kind'] = 'declaration'
+        else:
+            probe['kind'] = 'attachment'
             
-            # مجموعه تصاویر بهبود یافته
-            processed_images = [gray]
+        return probe
+        
+    def process_prepared_page(self, page_input: tuple, pdf_path: str,
+                              start_time: Optional[float] = None) -> Dict[str, Any]:
+        """مرحله OCR و استخراج برای خروجی مرحله رندر"""
+        
+        kind, page_num, payload = page_input
+        start_time = start_time or time.time()
+        
+        if kind == 'skipped':
+            self.logger.info(f"⏭️ صفحه {page_num + 1} رد شد ({payload['kind']})")
+            return self._skipped_page_result(pdf_path, page_num, payload)
+            
+        if kind == 'native':
+            self.logger.info(f"⚡ صفحه {page_num + 1} از لایه متنی خوانده شد")
+            result = self.extract_from_text(payload, pdf_path, page_num, start_time)
+            result['text_source'] = 'native'
+            return result
+            
+        result = self.extract_from_single_page_advanced(payload.array, page_num, source_path=pdf_path)
+        if payload.probe is not None:
+            result['probe'] = payload.probe
+            
+        return result
+        
+    def iter_pdf_pages_pipelined(self, pdf_document, pdf_path: str):
+        """خط لوله رندر/OCR - نخ رندر صفحات را در صف محدود قرار میدهد و OCR همزمان مصرف میکند"""
+        
+        # حداکثر تصاویر زنده: ظرفیت صف + یکی در دست رندر + یکی در دست OCR
+        page_queue = queue.Queue(maxsize=max(1, int(self.config.get('pipeline_queue_size', 2))))
+        stop_event = threading.Event()
+        done = object()
+        
+        def put(item) -> bool:
+            # قرار دادن در صف با امکان توقف (در صورت خطای مصرفکننده)
+            while not stop_event.is_set():
+                try:
+                    page_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+            
+        def producer():
+            try:
+                for page_num in range(len(pdf_document)):
+                    try:
+                        item = (self.prepare_pdf_page(pdf_document, page_num, pdf_path), None)
+                    except Exception as e:
+                        item = (('error', page_num, None), e)
+                        
+                    if not put(item):
+                        return
+                    item = None
+            finally:
+                put((done, None))
+                
+        render_thread = threading.Thread(target=producer, name="pdf-render", daemon=True)
+        render_thread.start()
+        
+        try:
+            while True:
+                page_input, error = page_queue.get()
+                if page_input is done:
+                    break
+                    
+                kind, page_num, _ = page_input
+                start_time = time.time()
+                
+                if error is not None:
+                    yield page_num, None, error
+                    continue
+                    
+                try:
+                    result = self.process_prepared_page(page_input, pdf_path, start_time)
+                    yield page_num, result, None
+                except Exception as e:
+                    yield page_num, None, e
+                    
+                # آزادسازی تصویر پیش از برداشتن صفحه بعدی
+                page_input = None
+        finally:
+            stop_event.set()
+            render_thread.join()
+            
+    def iter_pdf_pages(self, pdf_document, pdf_path: str):
+        """پیمایش صفحات PDF - با خط لوله یا به صورت ترتیبی"""
+        
+        if self.config.get('pipeline_enabled', True) and len(pdf_document) > 1:
+            yield from self.iter_pdf_pages_pipelined(pdf_document, pdf_path)
+            return
             
-            if self.config['enhance_image']:
-                # روش 1: CLAHE
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                enhanced1 = clahe.apply(gray)
-                processed_images.append(enhanced1)
+        for page_num in range(len(pdf_document)):
+            try:
+                yield page_num, self.process_pdf_page(pdf_document, page_num, pdf_path), None
+            except Exception as e:
+                yield page_num, None, e
                 
-                # روش 2: تنظیم کنتراست
-                alpha = 1.5  # کنتراست
-                beta = 30    # روشنایی
-                enhanced2 = cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
-                processed_images.append(enhanced2)
                 
-                # روش 3: فیلتر گاوسی + کاهش نویز
-                blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-                enhanced3 = cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
-                processed_images.append(enhanced3)
+    def render_page_raster(self, pdf_document, page_num: int, pdf_path: str,
+                           dpi: Optional[int] = None) -> PageRaster:
+        """رندر مستقیم صفحه PDF به تصویر خاکستری در حافظه"""
+        
+        dpi = dpi or self.config['dpi']
+        page = pdf_document[page_num]
+        
+        matrix = fitz.Matrix(dpi/72, dpi/72)
+        pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+        
+        return PageRaster(pix, pdf_path, page_num)
+        
+    def get_page_preview(self, pdf_path: str, page_num: int = 0) -> Optional[str]:
+        """تصویر پیشنمایش صفحه - فقط در صورت نیاز روی دیسک ساخته میشود"""
+        
+        img_path = self.get_page_image_path(pdf_path, page_num)
+        
+        if not Path(img_path).exists():
+            try:
+                with fitz.open(pdf_path) as pdf_document:
+                    self.render_pdf_page(pdf_document, page_num, pdf_path)
+            except Exception as e:
+                self.logger.warning(f"⚠️ خطا در ساخت پیشنمایش {pdf_path}: {e}")
+                return None
                 
-                # روش 4: Morphological operations
-                kernel = np.ones((2,2), np.uint8)
-                enhanced4 = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel)
-                processed_images.append(enhanced4)
+        return img_path
+        
+    def load_gray_image(self, image: Union[str, np.ndarray]) -> Optional[np.ndarray]:
+        """تبدیل ورودی (مسیر فایل یا آرایه) به تصویر خاکستری"""
+        
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return image
+            if image.shape[2] == 1:
+                return image[:, :, 0]
+            if image.shape[2] == 4:
+                return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            
+        # خواندن تصویر
+        loaded = cv2.imread(image)
+        if loaded is None:
+            return None
+            
+        return cv2.cvtColor(loaded, cv2.COLOR_BGR2GRAY)
+        
+    def iter_preprocessed_variants(self, gray: np.ndarray):
+        """تولید تنبل نسخههای پیشپردازش - هر نسخه درست پیش از OCR ساخته میشود
+        
+        آرایه خروجی نسخههای بهبود یافته بافر مشترک است و تا نسخه بعدی معتبر است
+        """
+        
+        yield 'gray', gray
+        
+        if not self.config['enhance_image']:
+            return
+            
+        # بافرهای از پیش تخصیص یافته (مشترک بین نسخهها)
+        output = np.empty(gray.shape, dtype=np.uint8)
+        
+        # روش 1: CLAHE
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        clahe.apply(gray, dst=output)
+        yield 'clahe', output
+        
+        # روش 2: تنظیم کنتراست
+        alpha = 1.5  # کنتراست
+        beta = 30    # روشنایی
+        cv2.convertScaleAbs(gray, dst=output, alpha=alpha, beta=beta)
+        yield 'contrast', output
+        
+        # روش 3: فیلتر گاوسی + کاهش نویز (blur در بافر کمکی)
+        blurred = np.empty_like(output)
+        cv2.GaussianBlur(gray, (3, 3), 0, dst=blurred)
+        cv2.addWeighted(gray, 1.5, blurred, -0.5, 0, dst=output)
+        del blurred
+        yield 'unsharp', output
+        
+        # روش 4: Morphological operations
+        kernel = np.ones((2,2), np.uint8)
+        cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, dst=output)
+        yield 'morph_close', output
+        
+    def preprocess_image_advanced(self, image_path: Union[str, np.ndarray]) -> list:
+        """پیشپردازش پیشرفته تصویر - همه نسخهها به صورت لیست (سازگاری با کدهای قبلی)"""
+        
+        try:
+            # خواندن تصویر و تبدیل به grayscale
+            gray = self.load_gray_image(image_path)
+            if gray is None:
+                return [None]
                 
-            return processed_images
+            # کپی هر نسخه چون بافر خروجی بین نسخهها مشترک است
+            return [
+                img if name == 'gray' else img.copy()
+                for name, img in self.iter_preprocessed_variants(gray)
+            ]
             
         except Exception as e:
-            self.logger.warning(f"⚠️ خطا در پیشپردازش {image_path}: {e}")
+            self.logger.warning(f"⚠️ خطا در پیشپردازش {self._image_label(image_path)}: {e}")
             return [None]
             
-    def extract_text_from_image_advanced(self, image_path: str) -> str:
+    def extract_text_from_image_advanced(self, image_path: Union[str, np.ndarray], page_num: int = 0) -> str:
         """استخراج متن پیشرفته از تصویر"""
         
-        # بررسی کش
-        if image_path in self.ocr_cache:
-            return self.ocr_cache[image_path]
-            
+        self.last_ocr_info = {}
+        
         try:
-            # پیشپردازش
-            processed_images = self.preprocess_image_advanced(image_path)
+            # خواندن تصویر - نسخههای پیشپردازش به صورت تنبل ساخته میشوند
+            gray = self.load_gray_image(image_path)
             
-            if not processed_images or processed_images[0] is None:
+            if gray is None:
                 return ""
                 
+            # کلید کش بر اساس محتوای تصویر (نه مسیر فایل)
+            raster_hash = OCRCache.hash_raster(gray)
+            page_key = OCRCache.make_key(
+                raster_hash, self.ocr_settings_signature(), page_num,
+                self.config.get('ocr_cascade')
+            )
+            
+            # بررسی کش
+            if page_key in self.ocr_cache:
+                self.ocr_cache.move_to_end(page_key)
+                final_text, self.last_ocr_info = self.ocr_cache[page_key]
+                return final_text
+                
             all_text = ""
             best_text = ""
+            best_layout = None
             max_length = 0
-            
-            # OCR روی همه نسخههای پردازش شده
-            for i, img in enumerate(processed_images):
-                if img is None:
-                    continue
-                    
+            cascade_text = None
+            cascade_layout = None
+            cascade_step = 'exhaustive'
+            ocr_passes = 0
+            cached_passes = 0
+            
+            # OCR روی نسخههای پردازش شده (در حالت آبشاری از ارزانترین نسخه)
+            for variant_name, img in self.iter_preprocessed_variants(gray):
+                # کش تشخیص متن برای استفاده مشترک بین تنظیمات OCR این نسخه
+                detection_cache = {}
+                
                 try:
-                    # تنظیمات مختلف OCR
-                    ocr_configs = [
-                        {'detail': 0, 'paragraph': False, 'width_ths': 0.7, 'height_ths': 0.7},
-                        {'detail': 0, 'paragraph': True, 'width_ths': 0.5, 'height_ths': 0.5},
-                        {'detail': 0, 'paragraph': False, 'width_ths': 0.9, 'height_ths': 0.9}
-                    ]
-                    
-                    for config in ocr_configs:
-                        results = self.ocr_reader.readtext(img, **config)
+                    for config_idx, config in enumerate(self.ocr_configs):
+                        # کش پایدار هر پاس (نسخه پیشپردازش + تنظیم OCR)
+                        pass_key = OCRCache.make_key(
+                            raster_hash, self.ocr_settings_signature(),
+                            variant_name, config
+                        )
+                        results = self.persistent_cache.get(pass_key) if self.persistent_cache else None
+                        
+                        if results is None:
+                            results = compact_ocr_results(self.run_ocr_config(img, config, detection_cache))
+                            ocr_passes += 1
+                            
+                            if self.persistent_cache:
+                                self.persistent_cache.put(pass_key, results)
+                        else:
+                            cached_passes += 1
                         
                         if results:
                             text = " ".join(results) if isinstance(results[0], str) else " ".join([r[1] for r in results])
+                            layout = self.build_page_layout(results, gray.shape)
                             
                             if len(text) > max_length:
                                 max_length = len(text)
                                 best_text = text
+                                best_layout = layout
                                 
                             all_text += " " + text
                             
+                            # توقف زودهنگام در صورت اعتبار فیلدهای ضروری
+                            if self.config.get('ocr_cascade') and self.cascade_fields_satisfied(text, page_num, layout):
+                                cascade_text = text
+                                cascade_layout = layout
+                                cascade_step = f"{variant_name}/{config_idx}"
+                                break
+                                
                 except Exception as e:
-                    self.logger.warning(f"خطا در OCR نسخه {i}: {e}")
+                    self.logger.warning(f"خطا در OCR نسخه {variant_name}: {e}")
                     continue
                     
+                if cascade_text is not None:
+                    break
+                    
             # انتخاب بهترین نتیجه
-            final_text = best_text if best_text else all_text
-            
+            if cascade_text is not None:
+                final_text = cascade_text
+                best_layout = cascade_layout
+            else:
+                final_text = best_text if best_text else all_text
+                if self.config.get('ocr_cascade'):
+                    cascade_step = 'fallback'
+                    
             # تبدیل اعداد فارسی/عربی به انگلیسی
             final_text = self.normalize_digits(final_text)
             
             # پاکسازی متن
             final_text = self.clean_text(final_text)
             
-            # ذخیره در کش
-            self.ocr_cache[image_path] = final_text
+            self.last_ocr_info = {
+                'cascade_step': cascade_step,
+                'ocr_passes': ocr_passes,
+                'cached_passes': cached_passes,
+                'layout': best_layout
+            }
+            
+            # ذخیره در کش (چیدمان کادرها حجم زیادی دارد - فقط آخرین صفحات نگه داشته میشوند)
+            self.ocr_cache[page_key] = (final_text, self.last_ocr_info)
+            while len(self.ocr_cache) > max(1, self.config['memory_cache_pages']):
+                self.ocr_cache.popitem(last=False)
             
             return final_text
             
         except Exception as e:
-            self.logger.warning(f"⚠️ خطا در OCR {image_path}: {e}")
+            self.logger.warning(f"⚠️ خطا در OCR {self._image_label(image_path)}: {e}")
             return ""
             
+    def build_page_layout(self, results: List, shape: tuple) -> Optional[PageLayout]:
+        """چیدمان کادرهای یک پاس OCR (None اگر خروجی کادر نداشته باشد)"""
+        
+        if not self.config['layout_extraction'] or not results or isinstance(results[0], str):
+            return None
+            
+        height, width = shape[:2]
+        return PageLayout.from_ocr_results(results, width, height, normalize=self.normalize_ocr_text)
+        
+    def normalize_ocr_text(self, text: str) -> str:
+        """یکسانسازی ارقام و پاکسازی متن یک کادر OCR"""
+        
+        return self.clean_text(self.normalize_digits(text))
+        
+    def load_field_zones(self) -> Dict[str, Dict[str, List[float]]]:
+        """نقشه ناحیه فیلدها - پیشفرض فرم استاندارد + فایل تنظیمات کاربر"""
+        
+        overrides = {}
+        path = Path(self.config['field_zones_path'])
+        
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    overrides = json.load(f)
+            except Exception as e:
+                self.logger.warning(f"⚠️ خطا در بارگذاری ناحیه فیلدها: {e}")
+                
+        zones, invalid = merge_field_zones(overrides)
+        
+        for zone_name in invalid:
+            self.logger.warning(f"⚠️ ناحیه نامعتبر نادیده گرفته شد: {zone_name}")
+            
+        return zones
+        
+    def ocr_zone(self, gray: np.ndarray, pixels: tuple) -> tuple:
+        """OCR یک ناحیه برش خورده - (چیدمان ناحیه، تعداد پاس OCR اجرا شده)"""
+        
+        crop = crop_zone(gray, pixels)
+        if crop.shape[0] < 8 or crop.shape[1] < 8:
+            return None, 0
+            
+        zone_key = OCRCache.make_key(OCRCache.hash_raster(crop), self.ocr_settings_signature(), 'zone')
+        results = self.persistent_cache.get(zone_key) if self.persistent_cache else None
+        passes = 0
+        
+        if results is None:
+            results = compact_ocr_results(
+                self.ocr_reader.readtext(np.ascontiguousarray(crop), detail=1, paragraph=False)
+            )
+            passes = 1
+            
+            if self.persistent_cache:
+                self.persistent_cache.put(zone_key, results)
+                
+        height, width = crop.shape[:2]
+        return PageLayout.from_ocr_results(results, width, height, normalize=self.normalize_ocr_text), passes
+        
+    def extract_from_zones(self, gray: np.ndarray, page_num: int, source_path: str, start_time: float,
+                           zones: Optional[Dict[str, List[float]]] = None,
+                           text_source: str = 'zones') -> Optional[Dict[str, Any]]:
+        """OCR فقط ناحیه فیلدها (نقشه فرم استاندارد یا ناحیههای یک قالب یاد گرفته شده)
+        
+        نوع سند برای هر صفحه از نوار عنوان تشخیص داده میشود و فقط فیلدهای ضروری همان نوع
+        باید در ناحیه خود معتبر باشند. None یعنی مرحله بعدی لازم است
+        """
+        
+        # ناحیههای فرم استاندارد فقط برای صفحه اول تعریف شده اند
+        if zones is None and (page_num > 0 or not self.field_zones):
+            return None
+            
+        # هر ناحیه یک بار خوانده میشود
+        zone_layouts = {}
+        doc_type, ocr_passes = self.detect_zone_document_type(gray, zone_layouts, page_num)
+        
+        if zones is None:
+            zones = self.field_zones.get(doc_type)
+            
+        required = self.get_required_fields(doc_type, page_num) if doc_type else []
+        zone_fields = {} if zones and required and all(field in zones for field in required) else None
+        
+        if zone_fields is not None:
+            patterns_dict = self.import_patterns if doc_type.startswith('import') else self.export_patterns
+            
+            # فیلدهای ضروری اول - با اولین شکست بقیه ناحیهها خوانده نمیشوند
+            ordered_fields = required + [field for field in zones if field not in required]
+            
+            for field_name in ordered_fields:
+                if field_name not in patterns_dict:
+                    continue
+                    
+                pixels = zone_pixels(zones[field_name], gray.shape)
+                if pixels not in zone_layouts:
+                    zone_layouts[pixels], passes = self.ocr_zone(gray, pixels)
+                    ocr_passes += passes
+                    
+                layout = zone_layouts[pixels]
+                found = None
+                if layout is not None and len(layout):
+                    found = self.find_layout_value(
+                        layout, field_name, patterns_dict[field_name]['validation'], whole_zone=True
+                    )
+                    
+                if found:
+                    field_result = self.layout_field_result(layout, *found, method='zone')
+                    field_result['box'] = crop_box_to_page(field_result['box'], pixels, gray.shape)
+                    zone_fields[field_name] = field_result
+                elif field_name in required:
+                    zone_fields = None
+                    break
+                    
+        if zone_fields is None:
+            # برشهای ناموفق هر مرحله (برای گزارش در نتیجه OCR کل صفحه)
+            self.last_zone_info[text_source] = {'zone_crops': len(zone_layouts), 'zone_passes': ocr_passes}
+            return None
+            
+        # متن صفحه از متن ناحیهها (برای نمایش و استخراج مجدد)
+        text = " ".join(
+            " ".join(layout.texts) for layout in zone_layouts.values() if layout is not None and len(layout)
+        )
+        
+        result = self.extract_from_text(text, source_path, page_num, start_time, doc_type=doc_type)
+        result['extracted'].update(zone_fields)
+        
+        successful_fields = sum(1 for field in result['extracted'].values() if field['value'])
+        result['success_rate'] = f"{successful_fields / len(result['extracted']) * 100:.1f}%"
+        result.update({
+            'text_source': text_source,
+            'ocr_passes': ocr_passes,
+            'zone_crops': len(zone_layouts)
+        })
+        
+        self.logger.info(f"🗺️ صفحه {page_num + 1} با {len(zone_layouts)} ناحیه خوانده شد ({doc_type})")
+        return result
+        
+    def detect_zone_document_type(self, gray: np.ndarray, zone_layouts: Dict[tuple, Any],
+                                  page_num: int = 0) -> tuple:
+        """نوع سند از نوار عنوان فرم - (نوع سند یا None، تعداد پاس OCR)
+        
+        شماره کوتاژ روی فرمهای صادراتی هم چاپ میشود، پس واردات/صادرات فقط از عنوان خوانده میشود.
+        نشانههای چندکالایی (تکرار کد و شرح کالا) در نوار عنوان نیستند، پس تک/چندکالایی هم فقط از
+        کلمات عنوان است. صفحات بعدی عنوان ندارند و مثل OCR کل صفحه با detect_document_type تشخیص
+        داده میشوند؛ صفحه اولی که عنوانش نوع را مشخص نکند به OCR کل صفحه واگذار میشود
+        """
+        
+        pixels = zone_pixels(DOCUMENT_TITLE_ZONE, gray.shape)
+        zone_layouts[pixels], passes = self.ocr_zone(gray, pixels)
+        
+        layout = zone_layouts[pixels]
+        title = " ".join(layout.texts).lower() if layout is not None else ""
+        
+        has_import = any(word in title for word in ('واردات', 'import'))
+        has_export = any(word in title for word in ('صادرات', 'export'))
+        if has_import == has_export:
+            return (self.detect_document_type(title) if page_num > 0 else None), passes
+            
+        # کلمات عنوان بدون فاصله و نیمفاصله (چند کالایی / چندکالایی)
+        compact = title.replace(' ', '').replace('\u200c', '')
+        is_multi = any(word in compact for word in TITLE_MULTI_KEYWORDS)
+        is_single = any(word in compact for word in TITLE_SINGLE_KEYWORDS)
+        if is_multi == is_single:
+            return (self.detect_document_type(title) if page_num > 0 else None), passes
+            
+        family = 'import' if has_import else 'export'
+        return f"{family}_{'multi' if is_multi else 'single'}", passes
+        
+    def extract_from_template(self, gray: np.ndarray, fingerprint: np.ndarray, page_num: int,
+                              source_path: str, start_time: float) -> Optional[Dict[str, Any]]:
+        """OCR برشی با قالب چیدمان منطبق بر اثر انگشت صفحه (None اگر قالبی نباشد یا معتبر نشود)
+        
+        فقط محل کادرها از قالب گرفته میشود؛ نوع سند برای همین صفحه دوباره تشخیص داده میشود
+        """
+        
+        matched = self.layout_templates.match(fingerprint, page_num)
+        if matched is None:
+            return None
+            
+        template_id, template = matched
+        result = self.extract_from_zones(
+            gray, page_num, source_path, start_time, zones=template['fields'], text_source='template'
+        )
+        self.layout_templates.record_result(template_id, result is not None)
+        
+        if result is not None:
+            result['layout_template'] = template_id
+            
+        return result
+        
+    def learn_layout_template(self, fingerprint: Optional[np.ndarray], result: Dict[str, Any], page_num: int):
+        """یادگیری محل کادر مقدار فیلدها از صفحهای که فیلدهای ضروری آن معتبر شدهاند"""
+        
+        if fingerprint is None or self.layout_templates is None or result.get('status') != 'success':
+            return
+            
+        doc_type = result['document_type']
+        required = self.get_required_fields(doc_type, page_num)
+        
+        # فقط فیلدهایی که کادرشان معلوم است (چیدمان یا ناحیه) - نه مقادیر regex روی متن پیوسته
+        boxes = {
+            field: self.expand_template_box(data['box'])
+            for field, data in result['extracted'].items() if data.get('value') and data.get('box')
+        }
+        
+        if not required or any(field not in boxes for field in required):
+            return
+            
+        template_id = self.layout_templates.learn(fingerprint, doc_type, page_num, boxes)
+        self.logger.info(f"🧩 قالب چیدمان {template_id} با {len(boxes)} فیلد یاد گرفته شد")
+        
+    def expand_template_box(self, box: List[float]) -> List[float]:
+        """بزرگ کردن کادر مقدار برای برش (طول مقدار در صفحات بعدی متفاوت است)"""
+        
+        dx = max((box[2] - box[0]) * 0.5, 0.03)
+        dy = max((box[3] - box[1]) * 0.5, 0.005)
+        
+        return [max(0.0, box[0] - dx), max(0.0, box[1] - dy), min(1.0, box[2] + dx), min(1.0, box[3] + dy)]
+        
+    def ocr_settings_signature(self) -> Dict[str, Any]:
+        """تنظیمات موثر بر خروجی OCR (بخشی از کلید کش)"""
+        
+        return {
+            'languages': list(self.config['languages']),
+            'dpi': self.config['dpi']
+        }
+        
+    def run_ocr_config(self, img, config: Dict[str, Any], detection_cache: Dict[str, Any]) -> List:
+        """اجرای یک تنظیم OCR - با تشخیص یکباره متن برای هر تصویر"""
+        
+        if not self.config.get('detect_once'):
+            return self.ocr_reader.readtext(img, **config)
+            
+        reader = self.ocr_reader
+        
+        # اجرای شبکه CRAFT فقط یک بار برای هر تصویر
+        if 'text_boxes' not in detection_cache:
+            img_color, img_cv_grey = reformat_input(img)
+            detection_cache['img_cv_grey'] = img_cv_grey
+            detection_cache['text_boxes'] = reader.get_textbox(
+                reader.detector, img_color,
+                canvas_size=2560, mag_ratio=1.0,
+                text_threshold=0.7, link_threshold=0.4, low_text=0.4,
+                poly=False, device=reader.device, optimal_num_chars=None,
+                threshold=0.2, bbox_min_score=0.2, bbox_min_size=3, max_candidates=0
+            )[0]
+            detection_cache['recognized'] = {}
+            
+        img_cv_grey = detection_cache['img_cv_grey']
+        recognized = detection_cache['recognized']
+        
+        # گروهبندی کادرها با پارامترهای همین تنظیم (مشابه Reader.detect)
+        min_size = 20
+        horizontal_list, free_list = group_text_box(
+            detection_cache['text_boxes'], 0.1, 0.5,
+            config.get('height_ths', 0.5), config.get('width_ths', 0.5), 0.1, True
+        )
+        horizontal_list = [box for box in horizontal_list if max(box[1] - box[0], box[3] - box[2]) > min_size]
+        free_list = [box for box in free_list
+                     if max(diff([c[0] for c in box]), diff([c[1] for c in box])) > min_size]
+        
+        # تشخیص متن هر کادر فقط یک بار (کادرهای مشترک بین تنظیمات دوباره خوانده نمیشوند)
+        result = []
+        for box_list, is_free in ((horizontal_list, False), (free_list, True)):
+            for box in box_list:
+                key = (is_free, tuple(tuple(c) for c in box) if is_free else tuple(box))
+                if key not in recognized:
+                    recognized[key] = reader.recognize(
+                        img_cv_grey,
+                        horizontal_list=[] if is_free else [box],
+                        free_list=[box] if is_free else [],
+                        detail=1, paragraph=False, reformat=False
+                    )
+                result += recognized[key]
+                
+        if config.get('paragraph'):
+            direction_mode = 'rtl' if reader.model_lang == 'arabic' else 'ltr'
+            result = get_paragraph(result, x_ths=1.0, y_ths=0.5, mode=direction_mode)
+            
+        if config.get('detail', 1) == 0:
+            return [item[1] for item in result]
+            
+        return result
+        
+    def get_required_fields(self, doc_type: str, page_num: int = 0) -> List[str]:
+        """فیلدهای ضروری نوع سند برای یک صفحه"""
+        
+        required = self.required_fields.get(doc_type, [])
+        
+        # صفحات بعدی فقط فیلدهای کالا دارند
+        if page_num > 0:
+            required = [field for field in required if field in self.item_fields]
+            
+        return required
+        
+    def cascade_fields_satisfied(self, raw_text: str, page_num: int = 0,
+                                 layout: Optional[PageLayout] = None) -> bool:
+        """بررسی اعتبار فیلدهای ضروری روی خروجی یک پاس OCR"""
+        
+        text = self.clean_text(self.normalize_digits(raw_text))
+        if not text:
+            return False
+            
+        doc_type = self.detect_document_type(text)
+        required = self.get_required_fields(doc_type, page_num)
+        
+        if not required:
+            return False
+            
+        results = self.extract_fields_advanced(text, required, doc_type, layout)
+        
+        for field_name in required:
+            result = results[field_name]
+            if not result['value'] or result['confidence'] < self.config['confidence_threshold']:
+                return False
+                
+        return True
+        
     def clean_text(self, text: str) -> str:
         """پاکسازی و بهبود متن"""
         
@@ -590,61 +1455,326 @@ class DocumentExtractor:
     def extract_field_with_patterns_advanced(self, text: str, field_name: str, doc_type: str = 'import_single') -> Dict[str, Any]:
         """استخراج فیلد با الگوهای پیشرفته"""
         
+        return self.extract_fields_advanced(text, [field_name], doc_type)[field_name]
+        
+    def extract_fields_advanced(self, text: str, field_names: List[str], doc_type: str = 'import_single',
+                                layout: Optional[PageLayout] = None,
+                                stats: Optional[PatternStats] = None) -> Dict[str, Dict[str, Any]]:
+        """استخراج چند فیلد با یک اسکن کامپایل شده از متن صفحه (و کادرهای OCR در صورت وجود)
+        
+        آمار الگوها فقط در صورت دادن stats ثبت میشود (استخراج نهایی صفحه، نه پاسهای آزمایشی)
+        """
+        
         # انتخاب الگوهای مناسب
         if doc_type.startswith('import'):
             patterns_dict = self.import_patterns
+            scanner = self.field_scanners['import']
         else:
             patterns_dict = self.export_patterns
+            scanner = self.field_scanners['export']
             
-        if field_name not in patterns_dict:
-            return {'value': None, 'confidence': 0.0, 'method': 'none', 'pattern': None}
+        known_fields = [field for field in field_names if field in patterns_dict]
+        results = {}
+        
+        # الگوهای معتبر یاد گرفته شده اول - در صورت یافتن مقدار، الگوهای پایه اجرا نمیشوند
+        learned_tier = self.get_learned_tier()
+        if learned_tier is not None and learned_tier.trusted:
+            learned_hits = learned_tier.trusted_scanner.scan(
+                text, known_fields, self.pattern_stats_timer('learned', stats)
+            )
+            
+            for field_name in known_fields:
+                if learned_hits.get(field_name):
+                    result = self.select_field_candidate(
+                        text, field_name, patterns_dict[field_name], learned_hits[field_name],
+                        method='learned', stats=stats
+                    )
+                    if result['value']:
+                        results[field_name] = result
+                        
+        # مقدار کادر کنار برچسب فیلد (بدون وابستگی به متن پیوسته صفحه)
+        if layout is not None and len(layout):
+            layout_fields = [field for field in known_fields if field not in results]
+            results.update(self.extract_fields_from_layout(layout, layout_fields, patterns_dict))
+            
+        # جستجو با الگوهای پایه برای فیلدهای باقیمانده
+        remaining_fields = [field for field in known_fields if field not in results]
+        hits = scanner.scan(text, remaining_fields, self.pattern_stats_timer('regex', stats))
+        
+        for field_name in remaining_fields:
+            results[field_name] = self.select_field_candidate(
+                text, field_name, patterns_dict[field_name], hits.get(field_name, []), stats=stats
+            )
+            
+        # الگوهای آزمایشی فقط برای فیلدهایی که هنوز مقدار ندارند
+        if learned_tier is not None and learned_tier.probation:
+            missing_fields = [field for field in remaining_fields if not results[field]['value']]
+            learned_hits = learned_tier.probation_scanner.scan(
+                text, missing_fields, self.pattern_stats_timer('learned', stats)
+            )
+            
+            for field_name in missing_fields:
+                if learned_hits.get(field_name):
+                    result = self.select_field_candidate(
+                        text, field_name, patterns_dict[field_name], learned_hits[field_name],
+                        method='learned', stats=stats
+                    )
+                    if result['value']:
+                        results[field_name] = result
+                        
+        # حفظ ترتیب فیلدهای خواسته شده
+        return {
+            field_name: results.get(
+                field_name, {'value': None, 'confidence': 0.0, 'method': 'none', 'pattern': None}
+            )
+            for field_name in field_names
+        }
+        
+    def extract_fields_from_layout(self, layout: PageLayout, field_names: List[str],
+                                   patterns_dict: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """یافتن مقدار فیلدها در کادرهای همسایه برچسب آنها (فقط مقادیر معتبر برگردانده میشوند)"""
+        
+        results = {}
+        
+        for field_name in field_names:
+            found = self.find_layout_value(layout, field_name, patterns_dict[field_name]['validation'])
+            if found:
+                results[field_name] = self.layout_field_result(layout, *found)
+                
+        return results
+        
+    def find_layout_value(self, layout: PageLayout, field_name: str, validator,
+                          whole_zone: bool = False) -> Optional[tuple]:
+        """مقدار معتبر فیلد در چیدمان - (مقدار، شماره کادر) یا None
+        
+        whole_zone: چیدمان فقط ناحیه همین فیلد است؛ پس از کادرهای کنار برچسب، همه کادرها بررسی میشوند
+        """
+        
+        labels = self.field_labels.get(field_name, [])
+        candidates = [candidate for label in labels for candidate in layout.value_candidates(label)]
+        
+        if whole_zone:
+            label_boxes = {index for label in labels for index in layout.find_labels(label)}
+            candidates += [(text, index) for index, text in enumerate(layout.texts) if index not in label_boxes]
+            
+        # عدد یک یا دو رقمی شبیه شماره کادر است - فقط اگر مقدار دیگری نباشد
+        fallback = None
+        
+        for text, index in candidates:
+            value = self.select_layout_value(text, field_name, validator)
+            if not value:
+                continue
+                
+            if field_name not in self.text_value_fields and len(value) <= 2 and value.isdigit():
+                fallback = fallback or (value, index)
+                continue
+                
+            return value, index
+            
+        return fallback
+        
+    def layout_field_result(self, layout: PageLayout, value: str, index: int,
+                            method: str = 'layout') -> Dict[str, Any]:
+        """نتیجه فیلد یافته شده در یک کادر OCR"""
+        
+        return {
+            'value': value,
+            'confidence': round(min(0.95, 0.5 + 0.5 * float(layout.confidences[index])), 3),
+            'method': method,
+            'pattern': None,
+            'box': layout.normalized_box(index)
+        }
+        
+    def select_layout_value(self, text: str, field_name: str, validator) -> Optional[str]:
+        """مقدار معتبر متن یک کادر
+        
+        فیلدهای عددی کلمه به کلمه بررسی میشوند (بلندترین اول) تا شماره کادر
+        چاپ شده کنار مقدار (مثلا 33 یا 38) به جای مقدار خوانده نشود
+        """
+        
+        if field_name in self.text_value_fields:
+            options = [text]
+        else:
+            options = sorted(text.split(), key=len, reverse=True)
+            
+        for option in options:
+            value = self.clean_field_value(option, field_name)
+            if value and validator(value):
+                return value
+                
+        return None
+        
+    def get_learned_tier(self) -> Optional[LearnedPatternTier]:
+        """لایه الگوهای یاد گرفته شده (با بررسی تغییر الگوها در هر بازه)"""
+        
+        if not self.config['learned_patterns_enabled']:
+            return None
+            
+        if self.learned_tier is None:
+            try:
+                field_names = list(dict.fromkeys(list(self.import_patterns) + list(self.export_patterns)))
+                self.learned_tier = LearnedPatternTier(
+                    self.get_learning_system(),
+                    field_names,
+                    guard=self.regex_guard,
+                    min_accuracy=self.config['learned_min_accuracy'],
+                    reload_interval=self.config['learned_reload_interval']
+                )
+            except Exception as e:
+                self.logger.warning(f"⚠️ الگوهای یاد گرفته شده در دسترس نیستند: {e}")
+                self.config['learned_patterns_enabled'] = False
+                return None
+                
+        self.learned_tier.refresh()
+        return self.learned_tier
+        
+    def get_learning_system(self):
+        """سیستم یادگیری مشترک (در صورت نبود، در اولین استفاده ساخته میشود)"""
+        
+        if self.learning_system is None:
+            from learning_system import LearningSystem
+            self.learning_system = LearningSystem()
+            self.configure_learning_analyzer()
             
-        field_config = patterns_dict[field_name]
-        patterns = field_config['patterns']
+        return self.learning_system
+        
+    def configure_learning_analyzer(self):
+        """تحلیل هزینه الگوهای یاد گرفته شده با همان کش و سقف زمانی موتور استخراج"""
+        
+        if self.learning_system is not None:
+            self.learning_system.configure_analyzer(
+                self.config['ocr_cache_path'], self.config['regex_time_budget_ms']
+            )
+        
+    def active_pattern_stats(self) -> Optional[PatternStats]:
+        """آمار الگوهای استخراج نهایی صفحات (None در صورت غیرفعال بودن آمار)"""
+        
+        return self.pattern_stats if self.config['pattern_stats_enabled'] else None
+        
+    def pattern_stats_timer(self, source: str, stats: Optional[PatternStats]):
+        """تابع ثبت زمان اجرای الگوها برای اسکنر (None بدون آمار)"""
+        
+        if stats is None:
+            return None
+            
+        def record_run(field_name: str, pattern: str, elapsed: float):
+            stats.record_run(source, self.pattern_stats_field(source, field_name, pattern), pattern, elapsed)
+            
+        return record_run
+        
+    def pattern_stats_field(self, source: str, field_name: str, pattern: str) -> str:
+        """نام فیلد آمار - الگوهای یاد گرفته شده با نام ذخیره شده در سیستم یادگیری"""
+        
+        if source == 'learned' and self.learned_tier is not None:
+            return self.learned_tier.stored_names.get((field_name, pattern), field_name)
+        return field_name
+        
+    def record_page_stats(self):
+        """ثبت پایان یک صفحه و ذخیره دستهای آمار الگوها"""
+        
+        if not self.config['pattern_stats_enabled']:
+            return
+            
+        self.pattern_stats.record_page()
+        
+        if self.config['pattern_stats_autoflush'] and \
+                self.pattern_stats.pages >= self.config['pattern_stats_flush_pages']:
+            self.flush_pattern_stats()
+            
+    def flush_pattern_stats(self) -> bool:
+        """انتقال آمار جمع شده به سیستم یادگیری"""
+        
+        snapshot = self.pattern_stats.drain()
+        if snapshot is None:
+            return False
+            
+        try:
+            self.get_learning_system().record_pattern_stats(snapshot)
+            return True
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در ذخیره آمار الگوها: {e}")
+            return False
+        
+    def select_field_candidate(self, text: str, field_name: str, field_config: Dict[str, Any],
+                               field_hits: List[tuple], method: str = 'regex',
+                               stats: Optional[PatternStats] = None) -> Dict[str, Any]:
+        """پاکسازی، اعتبارسنجی و رتبهبندی نامزدهای یک فیلد"""
+        
         validator = field_config['validation']
         priority = field_config.get('priority', 5)
         
         # نتایج مختلف
         candidates = []
         
-        # جستجو با الگوها
-        for pattern_idx, pattern in enumerate(patterns):
-            try:
-                matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+        # پاکسازی و اعتبارسنجی هر مقدار خام فقط یک بار (مقادیر تکراری زیادند)
+        checked_values = {}
+        
+        # آمار الگوها در این صفحه: الگو -> [تعداد match، تعداد مقدار معتبر]
+        pattern_counts = {}
+        
+        for pattern_idx, pattern, match in field_hits:
+            # خطای کامپایل یا اجرای الگو
+            if isinstance(match, Exception):
+                self.logger.warning(f"خطا در الگو {pattern}: {match}")
+                continue
                 
-                for match in matches:
-                    if match.groups():
-                        candidate = match.group(1).strip()
-                        
+            try:
+                if match.groups():
+                    raw_value = match.group(1)
+                    
+                    if raw_value not in checked_values:
                         # پاکسازی بر اساس نوع فیلد
-                        candidate = self.clean_field_value(candidate, field_name)
+                        candidate = self.clean_field_value(raw_value.strip(), field_name)
                         
                         # اعتبارسنجی
-                        if candidate and validator(candidate):
-                            # محاسبه امتیاز کیفیت
-                            quality_score = self.calculate_quality_score(
-                                candidate, pattern, pattern_idx, match, text
-                            )
-                            
-                            candidates.append({
-                                'value': candidate,
-                                'confidence': quality_score,
-                                'method': 'regex',
-                                'pattern': pattern,
-                                'priority': priority,
-                                'position': match.start()
-                            })
+                        checked_values[raw_value] = candidate if candidate and validator(candidate) else None
+                        
+                    candidate = checked_values[raw_value]
+                    
+                    if stats is not None:
+                        counts = pattern_counts.setdefault(pattern, [0, 0])
+                        counts[0] += 1
+                        if candidate:
+                            counts[1] += 1
                             
+                    if candidate:
+                        # محاسبه امتیاز کیفیت
+                        quality_score = self.calculate_quality_score(
+                            candidate, pattern, pattern_idx, match, text
+                        )
+                        
+                        candidates.append({
+                            'value': candidate,
+                            'confidence': quality_score,
+                            'method': method,
+                            'pattern': pattern,
+                            'priority': priority,
+                            'position': match.start()
+                        })
+                        
             except Exception as e:
                 self.logger.warning(f"خطا در الگو {pattern}: {e}")
                 continue
                 
+        if stats is not None:
+            # الگویی که تنها منبع مقدار معتبر فیلد بود
+            valid_patterns = [pattern for pattern, (hits, valid) in pattern_counts.items() if valid]
+            unique_pattern = valid_patterns[0] if len(valid_patterns) == 1 else None
+            
+            for pattern, (hits, valid) in pattern_counts.items():
+                stats.record_hits(method, self.pattern_stats_field(method, field_name, pattern), pattern,
+                                  hits, valid, unique=pattern == unique_pattern)
+                    
         # انتخاب بهترین نامزد
         if candidates:
             # مرتبسازی بر اساس اولویت و کیفیت
             candidates.sort(key=lambda x: (x['priority'], -x['confidence'], x['position']))
             best_candidate = candidates[0]
             
+            if stats is not None:
+                stats.record_chosen(method, self.pattern_stats_field(method, field_name, best_candidate['pattern']),
+                                    best_candidate['pattern'])
+            
             return {
                 'value': best_candidate['value'],
                 'confidence': min(best_candidate['confidence'], 0.95),  # حداکثر 95%
@@ -727,63 +1857,389 @@ class DocumentExtractor:
         
         return score
         
-    def extract_from_single_page_advanced(self, image_path: str, page_num: int = 0) -> Dict[str, Any]:
-        """استخراج پیشرفته از یک صفحه"""
+    def extract_from_single_page_advanced(self, image_path: Union[str, np.ndarray], page_num: int = 0,
+                                          source_path: Optional[str] = None) -> Dict[str, Any]:
+        """استخراج پیشرفته از یک صفحه - ورودی مسیر تصویر یا آرایه در حافظه"""
         
         start_time = time.time()
         
-        try:
-            # استخراج متن
-            text = self.extract_text_from_image_advanced(image_path)
+        # نام منبع برای نتیجه (آرایهها مسیر ندارند)
+        if source_path is None:
+            source_path = self._image_label(image_path)
             
-            if not text:
-                return self._empty_page_result(image_path, page_num)
+        self.last_zone_info = {}
+        
+        try:
+            # صفحات خالی و تکراری دسته پیش از هر پردازش دیگری کنار گذاشته میشوند
+            if self.page_dedup is not None:
+                gray = self.load_gray_image(image_path)
+                if gray is None:
+                    return self._empty_page_result(source_path, page_num)
+                    
+                signature = self.page_dedup.signature(gray)
                 
-            # تشخیص نوع سند
-            doc_type = self.detect_document_type(text)
+                if self.page_dedup.is_blank(signature):
+                    self.page_dedup.blank_pages += 1
+                    self.logger.info(f"⬜ صفحه {page_num + 1} خالی است - بدون OCR")
+                    return self._skipped_page_result(
+                        source_path, page_num, {'kind': 'blank', 'ink': signature['ink']}
+                    )
+                    
+                original = self.page_dedup.find(signature, gray)
+                if original is not None:
+                    self.logger.info(
+                        f"🪞 صفحه {page_num + 1} تکرار صفحه {original['page'] + 1} از {original['file']} است"
+                    )
+                    result = self.page_dedup.reuse(original, Path(source_path).name, page_num)
+                    result['processing_time'] = f"{time.time() - start_time:.1f}s"
+                    return result
+                    
+                result = self.extract_from_page_image(gray, page_num, source_path, start_time)
+                
+                # صفحات ناموفق ثبت نمیشوند تا تکرار آنها دوباره پردازش شود
+                if result.get('status') != 'failed':
+                    self.page_dedup.add(signature, result, gray)
+                    
+                return result
+                
+            return self.extract_from_page_image(image_path, page_num, source_path, start_time)
             
-            # انتخاب فیلدها بر اساس نوع سند و صفحه
-            if page_num == 0:
-                # صفحه اول - همه فیلدها
-                fields_to_extract = list(self.import_patterns.keys())
-            else:
-                # صفحات بعدی - فیلدهای کالا
-                fields_to_extract = [
-                    'شرح_کالا', 'تعداد_بسته', 'نوع_بسته', 'وزن_خالص',
-                    'کد_کالا', 'بیمه', 'کرایه', 'تعداد_واحد_کالا',
-                    'ارزش_قلم_کالا', 'ارزش_گمرکی', 'مبلغ_حقوق_ورودی',
-                    'مالیات_بر_ارزش_افزوده', 'جمع_حقوق_عوارض'
-                ]
+        except Exception as e:
+            self.logger.error(f"❌ خطا در استخراج {source_path}: {e}")
+            return self._empty_page_result(source_path, page_num)
+            
+    def extract_from_page_image(self, image_path: Union[str, np.ndarray], page_num: int,
+                                source_path: str, start_time: float) -> Dict[str, Any]:
+        """استخراج از تصویر صفحه: صاف کردن، OCR برشی و در صورت نیاز OCR کل صفحه"""
+        
+        gray = None
+        orientation = {}
+        use_zones = self.config['zone_ocr_enabled'] and page_num == 0
+        
+        if self.config['auto_orient'] or self.layout_templates is not None or use_zones:
+            gray = self.load_gray_image(image_path)
+            
+            # صاف کردن صفحه یک بار پیش از همه مراحل OCR
+            if gray is not None and self.config['auto_orient']:
+                gray, orientation = self.orient_page(gray)
                 
-            # استخراج فیلدها
-            extracted_data = {}
+        result = self.extract_from_oriented_page(
+            image_path if gray is None else gray, gray, page_num, source_path, start_time, use_zones
+        )
+        
+        # بررسی وارونگی با OCR فقط وقتی مراحل ارزانتر فیلدهای ضروری را معتبر نکردهاند
+        if orientation and not self.page_fields_valid(result, page_num) and self.recheck_page_flip(gray):
+            gray = rotate_page(gray, 180)
+            orientation['rotation'] = (orientation['rotation'] + 180) % 360
+            self.logger.info(f"🙃 صفحه {page_num + 1} وارونه بود - استخراج دوباره")
+            
+            result = self.extract_from_oriented_page(gray, gray, page_num, source_path, start_time, use_zones)
             
-            for field_name in fields_to_extract:
-                result = self.extract_field_with_patterns_advanced(text, field_name, doc_type)
-                extracted_data[field_name] = result
+        result.update(orientation)
+        return result
+        
+    def extract_from_oriented_page(self, image: Union[str, np.ndarray], gray: Optional[np.ndarray],
+                                   page_num: int, source_path: str, start_time: float,
+                                   use_zones: bool) -> Dict[str, Any]:
+        """مراحل OCR روی صفحه صاف شده: قالب یاد گرفته شده، فرم استاندارد، سپس OCR کل صفحه"""
+        
+        fingerprint = None
+        
+        # OCR برشی - کل صفحه فقط در صورت نامعتبر بودن فیلدهای ضروری
+        if gray is not None:
+            if self.layout_templates is not None:
+                fingerprint = self.layout_templates.fingerprint(gray)
+                template_result = self.extract_from_template(
+                    gray, fingerprint, page_num, source_path, start_time
+                )
+                if template_result is not None:
+                    return template_result
+                    
+            if use_zones:
+                zone_result = self.extract_from_zones(gray, page_num, source_path, start_time)
+                if zone_result is not None:
+                    self.learn_layout_template(fingerprint, zone_result, page_num)
+                    return zone_result
+                    
+        # استخراج متن (تصویر خوانده شده برای OCR کل صفحه هم استفاده میشود)
+        text = self.extract_text_from_image_advanced(image, page_num)
+        ocr_info = self.last_ocr_info
+        
+        if not text:
+            return self._empty_page_result(source_path, page_num)
+            
+        result = self.extract_from_text(text, source_path, page_num, start_time, ocr_info.get('layout'))
+        result.update({
+            'text_source': 'ocr',
+            'ocr_cascade_step': ocr_info.get('cascade_step'),
+            'ocr_passes': ocr_info.get('ocr_passes', 0)
+        })
+        
+        # پاسهای ناحیهای ناموفق پیش از OCR کل صفحه
+        if self.last_zone_info:
+            result['zone_fallback'] = dict(self.last_zone_info)
+            
+        self.learn_layout_template(fingerprint, result, page_num)
+        
+        return result
+        
+    def page_fields_valid(self, result: Dict[str, Any], page_num: int) -> bool:
+        """آیا همه فیلدهای ضروری نوع سند نتیجه مقدار دارند"""
+        
+        if result.get('status') != 'success':
+            return False
+            
+        required = self.get_required_fields(result.get('document_type', ''), page_num)
+        extracted = result.get('extracted', {})
+        
+        return bool(required) and all(extracted.get(field, {}).get('value') for field in required)
+        
+    def orient_page(self, gray: np.ndarray) -> tuple:
+        """تشخیص جهت (مضرب 90 درجه) و کجی صفحه و چرخش یکباره در حافظه
+        
+        خروجی: (تصویر صاف شده، {'rotation': درجه ساعتگرد، 'skew': کجی اصلاح شده})
+        """
+        
+        estimate = None
+        cache_key = None
+        
+        # تشخیص جهت هر تصویر فقط یک بار (همراه نتیجه بررسی وارونگی با OCR) - جدا از خروجی پاسهای OCR
+        if self.persistent_cache:
+            cache_key = OCRCache.make_key(OCRCache.hash_raster(gray), self.config['deskew_max_angle'])
+            estimate = self.persistent_cache.get(cache_key, kind=ORIENTATION)
+            
+        if estimate is None:
+            estimate = self.estimate_page_orientation(gray)
+            if cache_key is not None:
+                self.persistent_cache.put(cache_key, estimate, kind=ORIENTATION)
                 
-            processing_time = time.time() - start_time
+        # برای بررسی وارونگی در صورت شکست مراحل بعدی
+        self.last_orientation = {'cache_key': cache_key, 'estimate': estimate}
+        
+        rotation = estimate['rotation']
+        skew = estimate['skew'] if abs(estimate['skew']) >= self.config['deskew_min_angle'] else 0.0
+        
+        if rotation or skew:
+            self.logger.info(f"🧭 چرخش صفحه {rotation}° و اصلاح کجی {skew}°")
+            gray = rotate_page(gray, rotation, skew)
+            
+        return gray, {'rotation': rotation, 'skew': skew}
+        
+    def estimate_page_orientation(self, gray: np.ndarray) -> Dict[str, Any]:
+        """جهت و کجی صفحه روی نسخه کوچک شده"""
+        
+        small = downscale(gray, SKEW_WIDTH)
+        
+        # خطوط افقی یا عمودی - سپس کجی روی صفحه چرخیده
+        rotation, flipped_rotation = orientation_candidates(small)
+        skew = estimate_skew(rotate_page(small, rotation), self.config['deskew_max_angle'])
+        
+        # وارونگی (180 درجه) از پروفایل قابل تشخیص نیست - اینجا فقط قالبهای شناخته شده؛
+        # OCR یک نوار متن فقط پس از شکست مراحل استخراج (recheck_page_flip)
+        upright = rotate_page(downscale(gray, SKEW_WIDTH * 2), rotation, skew)
+        if self.page_upside_down(upright):
+            rotation = flipped_rotation
             
-            # محاسبه آمار
-            successful_fields = sum(1 for field in extracted_data.values() if field['value'])
-            success_rate = (successful_fields / len(fields_to_extract)) * 100 if fields_to_extract else 0
+        return {'rotation': rotation, 'skew': skew}
+        
+    def page_upside_down(self, upright: np.ndarray) -> bool:
+        """آیا صفحه صاف شده با قالبهای شناخته شده وارونه است"""
+        
+        if self.layout_templates is None:
+            return False
             
-            return {
-                'file': Path(image_path).name,
-                'page': page_num,
-                'document_type': doc_type,
-                'extracted': extracted_data,
-                'text_length': len(text),
-                'full_text': text,
-                'processing_time': f"{processing_time:.1f}s",
-                'success_rate': f"{success_rate:.1f}%",
-                'status': 'success'
-            }
+        if self.layout_templates.find(self.layout_templates.fingerprint(upright)):
+            return False
             
+        flipped_page = np.ascontiguousarray(upright[::-1, ::-1])
+        return self.layout_templates.find(self.layout_templates.fingerprint(flipped_page)) is not None
+        
+    def recheck_page_flip(self, upright: np.ndarray) -> bool:
+        """بررسی وارونگی صفحه صاف شده با OCR یک نوار متن (یک بار برای هر تصویر)
+        
+        نتیجه در تخمین جهت ذخیره میشود تا صفحه وارونه دفعه بعد مستقیم چرخانده شود
+        و صفحه درست دوباره بررسی نشود
+        """
+        
+        orientation = self.last_orientation
+        estimate = orientation.get('estimate', {})
+        
+        if not self.config['orientation_ocr_check'] or self.ocr_reader is None or estimate.get('ocr_checked'):
+            return False
+            
+        band = densest_text_band(downscale(upright, SKEW_WIDTH * 2))
+        
+        try:
+            normal = upright_score(self.ocr_reader.readtext(band, detail=1, paragraph=False))
+            flipped = upright_score(
+                self.ocr_reader.readtext(np.ascontiguousarray(band[::-1, ::-1]), detail=1, paragraph=False)
+            )
         except Exception as e:
-            self.logger.error(f"❌ خطا در استخراج {image_path}: {e}")
-            return self._empty_page_result(image_path, page_num)
+            self.logger.warning(f"⚠️ خطا در بررسی وارونگی صفحه: {e}")
+            return False
+            
+        upside_down = flipped > normal * 1.2
+        
+        estimate = dict(estimate, ocr_checked=True)
+        if upside_down:
+            estimate['rotation'] = (estimate['rotation'] + 180) % 360
+            
+        orientation['estimate'] = estimate
+        if orientation.get('cache_key') is not None:
+            self.persistent_cache.put(orientation['cache_key'], estimate, kind=ORIENTATION)
+            
+        return upside_down
+        
+    def _image_label(self, image: Union[str, np.ndarray]) -> str:
+        """برچسب ورودی تصویر برای لاگ و نتایج"""
+        
+        if isinstance(image, np.ndarray):
+            return f"array_{image.shape[1]}x{image.shape[0]}"
             
+        return str(image)
+        
+    def extract_from_text(self, text: str, source_path: str, page_num: int = 0,
+                          start_time: Optional[float] = None,
+                          layout: Optional[PageLayout] = None,
+                          doc_type: Optional[str] = None) -> Dict[str, Any]:
+        """استخراج فیلدها از متن یک صفحه (خروجی OCR یا لایه متنی PDF)"""
+        
+        if start_time is None:
+            start_time = time.time()
+            
+        # تشخیص نوع سند (مگر از پیش معلوم باشد)
+        if doc_type is None:
+            doc_type = self.detect_document_type(text)
+        
+        # انتخاب فیلدها بر اساس نوع سند و صفحه
+        if page_num == 0:
+            # صفحه اول - همه فیلدها
+            fields_to_extract = list(self.import_patterns.keys())
+        else:
+            # صفحات بعدی - فیلدهای کالا
+            fields_to_extract = list(self.item_fields)
+            
+        # استخراج فیلدها (یک اسکن برای همه فیلدها) - آمار الگوها فقط همین یک بار برای هر صفحه ثبت میشود
+        stats = self.active_pattern_stats()
+        extracted_data = self.extract_fields_advanced(text, fields_to_extract, doc_type, layout, stats)
+        
+        # آمار الگوها در دستههای چند صفحهای ذخیره میشود
+        self.record_page_stats()
+        
+        # متن نهایی صفحه برای آزمون الگوها (یک رکورد برای هر صفحه، نه برای هر پاس OCR)
+        self.remember_page_text(text)
+        
+        # نسخه الگوهای هر فیلد (برای استخراج مجدد پس از تغییر الگوها)
+        pattern_versions = self.field_pattern_versions(doc_type)
+        
+        processing_time = time.time() - start_time
+        
+        # محاسبه آمار
+        successful_fields = sum(1 for field in extracted_data.values() if field['value'])
+        success_rate = (successful_fields / len(fields_to_extract)) * 100 if fields_to_extract else 0
+        
+        return {
+            'file': Path(source_path).name,
+            'page': page_num,
+            'document_type': doc_type,
+            'extracted': extracted_data,
+            'pattern_versions': {
+                field: pattern_versions[field] for field in fields_to_extract if field in pattern_versions
+            },
+            'text_length': len(text),
+            'full_text': text,
+            'processing_time': f"{processing_time:.1f}s",
+            'success_rate': f"{success_rate:.1f}%",
+            'status': 'success'
+        }
+            
+    def remember_page_text(self, text: str):
+        """ذخیره متن نهایی صفحه در کش پایدار (مجموعه متن آزمون الگوها)"""
+        
+        if self.persistent_cache and text:
+            self.persistent_cache.put(OCRCache.make_key(text), text, kind=PAGE_TEXT)
+            
+    def field_pattern_versions(self, doc_type: str) -> Dict[str, str]:
+        """هش مجموعه الگوهای هر فیلد (الگوهای پایه + الگوهای یاد گرفته شده فعلی)"""
+        
+        family = 'import' if doc_type.startswith('import') else 'export'
+        patterns_dict = self.import_patterns if family == 'import' else self.export_patterns
+        
+        learned_tier = self.get_learned_tier()
+        key = (family, learned_tier.version if learned_tier is not None else 0)
+        
+        if key not in self._pattern_versions:
+            versions = {}
+            
+            for field_name, field_config in patterns_dict.items():
+                pattern_set = [field_config['patterns'], field_config.get('priority', 5)]
+                
+                if learned_tier is not None:
+                    pattern_set.append([p['pattern'] for p in learned_tier.trusted.get(field_name, [])])
+                    pattern_set.append([p['pattern'] for p in learned_tier.probation.get(field_name, [])])
+                    
+                content = json.dumps(pattern_set, ensure_ascii=False)
+                versions[field_name] = hashlib.md5(content.encode('utf-8')).hexdigest()[:12]
+                
+            # فقط آخرین نسخه هر خانواده نگهداری میشود
+            self._pattern_versions = {k: v for k, v in self._pattern_versions.items() if k[0] != family}
+            self._pattern_versions[key] = versions
+            
+        return self._pattern_versions[key]
+        
+    def reextract_results(self, results: Dict[str, Any]) -> Dict[str, int]:
+        """استخراج مجدد فقط فیلدهایی که الگوهایشان تغییر کرده (روی متن ذخیره شده صفحات، بدون OCR)
+        
+        نتایج در همان دیکشنری بهروزرسانی میشوند
+        """
+        
+        summary = {'pages': 0, 'stale_pages': 0, 'fields': 0, 'changed': 0}
+        
+        for file_result in results.values():
+            pages = file_result.get('pages') if 'pages' in file_result else [file_result]
+            
+            for page_result in pages:
+                text = page_result.get('full_text')
+                stored_versions = page_result.get('pattern_versions')
+                if not text or stored_versions is None:
+                    continue
+                    
+                summary['pages'] += 1
+                
+                doc_type = page_result.get('document_type', 'import_single')
+                versions = self.field_pattern_versions(doc_type)
+                extracted = page_result['extracted']
+                
+                # فیلدهای با نسخه قدیمی (مقادیر ویرایش شده دستی - ذخیره ویرایشها در برنامه - و
+                # مقادیر کادرهای OCR حفظ میشوند؛ کادرها در نتایج ذخیره نمیشوند)
+                stale_fields = [
+                    field for field, version in stored_versions.items()
+                    if versions.get(field) != version
+                    and extracted.get(field, {}).get('method') not in ('manual', 'layout', 'zone')
+                ]
+                if not stale_fields:
+                    continue
+                    
+                summary['stale_pages'] += 1
+                summary['fields'] += len(stale_fields)
+                
+                # بدون آمار الگوها (stats=None) - استخراج مجدد در آمار عملکرد شمرده نمیشود
+                for field, field_result in self.extract_fields_advanced(text, stale_fields, doc_type).items():
+                    if extracted.get(field, {}).get('value') != field_result['value']:
+                        summary['changed'] += 1
+                    extracted[field] = field_result
+                    stored_versions[field] = versions[field]
+                    
+                successful_fields = sum(1 for field in extracted.values() if field['value'])
+                page_result['success_rate'] = f"{successful_fields / len(extracted) * 100:.1f}%" if extracted else "0%"
+                
+        self.logger.info(
+            f"🔁 استخراج مجدد: {summary['fields']} فیلد در {summary['stale_pages']} صفحه، "
+            f"{summary['changed']} مقدار تغییر کرد"
+        )
+        
+        return summary
+        
     def _empty_page_result(self, image_path: str, page_num: int) -> Dict[str, Any]:
         """نتیجه خالی برای صفحه"""
         return {
@@ -799,6 +2255,23 @@ class DocumentExtractor:
             'status': 'failed'
         }
         
+    def _skipped_page_result(self, source_path: str, page_num: int, probe: Dict[str, Any]) -> Dict[str, Any]:
+        """نتیجه صفحهای که در بررسی اولیه رد شد (خالی یا پیوست)"""
+        return {
+            'file': Path(source_path).name,
+            'page': page_num,
+            'document_type': 'unknown',
+            'extracted': {},
+            'text_length': 0,
+            'full_text': '',
+            'processing_time': '0s',
+            'success_rate': '0%',
+            'status': 'skipped',
+            'skip_reason': probe['kind'],
+            'skip_detail': describe_probe(probe),
+            'probe': probe
+        }
+        
     def process_single_file(self, file_path: str) -> Dict[str, Any]:
         """پردازش یک فایل"""
         
@@ -808,29 +2281,38 @@ class DocumentExtractor:
             file_ext = Path(file_path).suffix.lower()
             
             if file_ext == '.pdf':
-                # تبدیل PDF به تصاویر
-                image_paths = self.convert_pdf_to_images(file_path)
-                
-                if not image_paths:
-                    return {
-                        'type': 'pdf',
-                        'pages': [self._empty_page_result(file_path, 0)],
-                        'total_pages': 0,
-                        'status': 'failed'
-                    }
-                
-                # پردازش هر صفحه
+                pdf_document = fitz.open(file_path)
+                
+                # پردازش هر صفحه - صفحههای با خطا به صورت نتیجه خالی در جای خود میمانند
                 document_results = []
+                errors = 0
                 
-                for i, img_path in enumerate(image_paths):
-                    result = self.extract_from_single_page_advanced(img_path, i)
-                    document_results.append(result)
+                try:
+                    self.logger.info(f"📄 پردازش PDF با {len(pdf_document)} صفحه")
+                    
+                    # رندر صفحه بعد همزمان با OCR صفحه جاری
+                    for page_num, result, error in self.iter_pdf_pages(pdf_document, file_path):
+                        if error is not None:
+                            self.logger.warning(f"⚠️ خطا در پردازش صفحه {page_num}: {error}")
+                            result = self._empty_page_result(file_path, page_num)
+                            result['error'] = str(error)
+                            errors += 1
+                        document_results.append(result)
+                finally:
+                    pdf_document.close()
+                    
+                if not document_results or errors == len(document_results):
+                    status = 'failed'
+                elif errors:
+                    status = 'partial'
+                else:
+                    status = 'success'
                     
                 return {
                     'type': 'pdf',
-                    'pages': document_results,
-                    'total_pages': len(image_paths),
-                    'status': 'success'
+                    'pages': document_results or [self._empty_page_result(file_path, 0)],
+                    'total_pages': len(document_results),
+                    'status': status
                 }
                 
             elif file_ext in ['.png', '.jpg', '.jpeg']:
@@ -860,6 +2342,12 @@ class DocumentExtractor:
     def process_files(self, files: List[str]) -> Dict[str, Any]:
         """پردازش لیست فایلها"""
         
+        # پردازش موازی با چند پردازشگر
+        if self.config.get('workers', 1) > 1:
+            from batch_engine import BatchEngine
+            return BatchEngine(self.config).process_files(files)
+            
+        self.reset_page_dedup()
         all_results = {}
         
         for file_path in files:
@@ -961,6 +2449,29 @@ class DocumentExtractor:
         if 'languages' in new_config:
             self.setup_ocr()
             
+        # اعمال سقف زمانی جدید الگوها
+        if 'regex_time_budget_ms' in new_config or 'regex_max_strikes' in new_config:
+            self.regex_guard.time_budget = max(0.0, float(self.config['regex_time_budget_ms'])) / 1000.0
+            self.regex_guard.max_strikes = max(1, int(self.config['regex_max_strikes']))
+            self.pattern_analyzer = None
+            self.configure_learning_analyzer()
+            
+        # ساخت دوباره لایه الگوهای یاد گرفته شده با تنظیمات جدید
+        if any(key.startswith('learned_') for key in new_config):
+            self.learned_tier = None
+            
+        # بارگذاری دوباره نقشه ناحیه فیلدها
+        if 'field_zones_path' in new_config:
+            self.field_zones = self.load_field_zones()
+            
+        # ساخت دوباره کش قالبهای چیدمان با تنظیمات جدید
+        if any(key.startswith('layout_template') for key in new_config):
+            self.setup_layout_templates()
+            
+        # ساخت دوباره تشخیص صفحات تکراری با تنظیمات جدید
+        if any(key.startswith('dedup_') or key == 'page_dedup_enabled' for key in new_config):
+            self.setup_page_dedup()
+                
         # پاک کردن کش
         self.ocr_cache.clear()
         
@@ -968,10 +2479,22 @@ class DocumentExtractor:
         """دریافت لیست فیلدهای پشتیبانی شده"""
         return list(self.import_patterns.keys())
         
-    def validate_pattern(self, pattern: str) -> bool:
-        """اعتبارسنجی الگوی regex"""
+    def validate_pattern(self, pattern: str, override: bool = False) -> bool:
+        """اعتبارسنجی الگوی regex - شامل تحلیل هزینه و خطر ReDoS"""
         try:
             re.compile(pattern)
-            return True
         except re.error:
-            return False
+            return False
+            
+        if override:
+            return True
+            
+        if self.pattern_analyzer is None:
+            from pattern_analyzer import PatternAnalyzer
+            self.pattern_analyzer = PatternAnalyzer(
+                self.config['ocr_cache_path'],
+                time_budget_ms=self.config['regex_time_budget_ms']
+            )
+            
+        self.last_pattern_analysis = self.pattern_analyzer.analyze(pattern)
+        return self.last_pattern_analysis['accepted']
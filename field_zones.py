@@ -0,0 +1,105 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗺️ ناحیه فیلدهای فرم استاندارد اظهارنامه (مختصات نسبی صفحه برای OCR ناحیهای)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# ناحیه هر فیلد در صفحه اول اظهارنامه: [x0, y0, x1, y1] نسبی (0 تا 1، مبدا گوشه بالا چپ)
+# مقادیر تقریبی هستند و با فایل patterns/field_zones.json برای هر نوع سند قابل تنظیم اند
+STANDARD_DECLARATION_ZONES = {
+    'شماره_کوتا': [0.50, 0.02, 0.98, 0.09],
+    'نوع_معامله': [0.02, 0.16, 0.34, 0.21],
+    'کشور_طرف_معامله': [0.34, 0.16, 0.66, 0.21],
+    'نوع_ارز': [0.02, 0.21, 0.22, 0.26],
+    'نرخ_ارز': [0.22, 0.21, 0.50, 0.26],
+    'شرح_کالا': [0.34, 0.38, 0.98, 0.50],           # کادر 31
+    'نوع_بسته': [0.66, 0.34, 0.98, 0.38],
+    'تعداد_بسته': [0.50, 0.34, 0.66, 0.38],
+    'کد_کالا': [0.02, 0.38, 0.34, 0.43],            # کادر 33
+    'وزن_خالص': [0.02, 0.46, 0.34, 0.51],           # کادر 38
+    'تعداد_واحد_کالا': [0.02, 0.51, 0.34, 0.56],
+    'ارزش_قلم_کالا': [0.02, 0.56, 0.34, 0.61],
+    'بیمه': [0.34, 0.56, 0.66, 0.61],
+    'کرایه': [0.66, 0.56, 0.98, 0.61],
+    'ارزش_گمرکی': [0.02, 0.61, 0.34, 0.66],
+    'مبلغ_حقوق_ورودی': [0.02, 0.70, 0.34, 0.74],
+    'مالیات_بر_ارزش_افزوده': [0.02, 0.74, 0.34, 0.78],
+    'جمع_حقوق_عوارض': [0.02, 0.78, 0.34, 0.83]
+}
+
+# نوار عنوان فرم (واردات/صادرات) - نوع سند فقط از عنوان تشخیص داده میشود
+DOCUMENT_TITLE_ZONE = [0.02, 0.0, 0.98, 0.16]
+
+# کلمات تک/چندکالایی در عنوان فرم (بدون فاصله و نیمفاصله)
+TITLE_MULTI_KEYWORDS = ['چندکالایی', 'چندقلمی', 'multiitem', 'multi-item', 'multiple']
+TITLE_SINGLE_KEYWORDS = ['تککالایی', 'تکقلمی', 'singleitem', 'single-item']
+
+# نقشه پیشفرض هر نوع سند (صفحه اول همه انواع روی همان فرم چاپ میشود)
+DEFAULT_FIELD_ZONES = {
+    'import_single': STANDARD_DECLARATION_ZONES,
+    'import_multi': STANDARD_DECLARATION_ZONES,
+    'export_single': STANDARD_DECLARATION_ZONES,
+    'export_multi': STANDARD_DECLARATION_ZONES
+}
+
+def merge_field_zones(overrides: Dict[str, Optional[Dict[str, Optional[List[float]]]]]) -> tuple:
+    """نقشه ناحیهها: پیشفرض + تنظیمات کاربر (نوع سند -> فیلد -> ناحیه)
+    
+    نوع سند یا فیلدی که مقدار null داشته باشد غیرفعال میشود
+    خروجی: (نقشه نهایی، لیست ناحیههای نامعتبر نادیده گرفته شده)
+    """
+    
+    zones = {doc_type: dict(fields) for doc_type, fields in DEFAULT_FIELD_ZONES.items()}
+    invalid = []
+    
+    for doc_type, fields in (overrides or {}).items():
+        if fields is None:
+            zones.pop(doc_type, None)
+            continue
+            
+        target = zones.setdefault(doc_type, {})
+        for field_name, rect in fields.items():
+            if rect is None:
+                target.pop(field_name, None)
+            elif len(rect) == 4 and 0 <= rect[0] < rect[2] <= 1 and 0 <= rect[1] < rect[3] <= 1:
+                target[field_name] = [float(v) for v in rect]
+            else:
+                invalid.append(f"{doc_type}/{field_name}")
+                
+    return zones, invalid
+
+def zone_pixels(rect: List[float], shape: tuple, pad: float = 0.005) -> tuple:
+    """مختصات پیکسلی ناحیه (با کمی حاشیه) - (x0, y0, x1, y1)"""
+    
+    height, width = shape[:2]
+    
+    x0 = max(0, int((rect[0] - pad) * width))
+    y0 = max(0, int((rect[1] - pad) * height))
+    x1 = min(width, int(np.ceil((rect[2] + pad) * width)))
+    y1 = min(height, int(np.ceil((rect[3] + pad) * height)))
+    
+    return x0, y0, x1, y1
+
+def crop_zone(gray: np.ndarray, pixels: tuple) -> np.ndarray:
+    """برش ناحیه از تصویر صفحه (نمای آرایه، بدون کپی)"""
+    
+    x0, y0, x1, y1 = pixels
+    return gray[y0:y1, x0:x1]
+
+def crop_box_to_page(box: List[float], pixels: tuple, shape: tuple) -> List[float]:
+    """تبدیل کادر نسبی درون برش به مختصات نسبی صفحه"""
+    
+    height, width = shape[:2]
+    x0, y0, x1, y1 = pixels
+    crop_width, crop_height = x1 - x0, y1 - y0
+    
+    return [
+        round((x0 + box[0] * crop_width) / width, 4), round((y0 + box[1] * crop_height) / height, 4),
+        round((x0 + box[2] * crop_width) / width, 4), round((y0 + box[3] * crop_height) / height, 4)
+    ]
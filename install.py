@@ -47,7 +47,8 @@ def create_directories():
         "temp", 
         "results",
         "uploads",
-        "assets"
+        "assets",
+        "cache"
     ]
     
     for directory in directories:
@@ -73,6 +74,8 @@ def create_config_file():
         "theme": "light",
         "auto_save": True,
         "learning_enabled": True,
+        "workers": 1,
+        "threads_per_worker": 1,
         "created_at": "2025-06-05",
         "version": "2.0"
     }
@@ -0,0 +1,216 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📐 چیدمان صفحه از کادرهای OCR (آرایههای فشرده + شاخص شبکهای برای جستجوی همسایهها)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from typing import List, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+# ترتیب جستجوی مقدار نسبت به برچسب (فرم فارسی: شماره کادر سمت راست برچسب است)
+DEFAULT_DIRECTIONS = ('left', 'below', 'right')
+
+def compact_ocr_results(results: Iterable) -> List[list]:
+    """تبدیل خروجی detail=1 به لیستهای ساده قابل ذخیره در JSON: [نقاط، متن، اطمینان]"""
+    
+    compact = []
+    
+    for item in results:
+        if isinstance(item, str):
+            compact.append(item)
+            continue
+            
+        points = [[int(round(float(x))), int(round(float(y)))] for x, y in item[0]]
+        confidence = float(item[2]) if len(item) > 2 else 0.5
+        compact.append([points, item[1], round(confidence, 4)])
+        
+    return compact
+
+class PageLayout:
+    def __init__(self, boxes: np.ndarray, texts: List[str], confidences: np.ndarray,
+                 width: float, height: float):
+        """کادرهای متن یک صفحه
+        
+        boxes: آرایه float32 با شکل (N, 4) به صورت x0, y0, x1, y1
+        """
+        
+        self.boxes = boxes
+        self.texts = texts
+        self.confidences = confidences
+        self.width = float(width)
+        self.height = float(height)
+        
+        # متن بدون فاصله برای یافتن برچسبها
+        self.compact_texts = [text.replace(' ', '') for text in texts]
+        
+        # ارتفاع معمول یک خط (مقیاس فاصلهها)
+        if len(boxes):
+            self.line_height = float(max(1.0, np.median(boxes[:, 3] - boxes[:, 1])))
+        else:
+            self.line_height = 1.0
+            
+        self.build_grid()
+        
+    @classmethod
+    def from_ocr_results(cls, results: Iterable, width: float, height: float,
+                         normalize: Optional[Callable[[str], str]] = None) -> 'PageLayout':
+        """ساخت چیدمان از خروجی detail=1 (متنهای بدون کادر نادیده گرفته میشوند)"""
+        
+        boxes = []
+        texts = []
+        confidences = []
+        
+        for item in results:
+            if isinstance(item, str) or not item[1].strip():
+                continue
+                
+            points = np.asarray(item[0], dtype=np.float32).reshape(-1, 2)
+            boxes.append((points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()))
+            
+            text = item[1].strip()
+            texts.append(normalize(text) if normalize else text)
+            confidences.append(float(item[2]) if len(item) > 2 else 0.5)
+            
+        return cls(
+            np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+            texts,
+            np.asarray(confidences, dtype=np.float32),
+            width, height
+        )
+        
+    def __len__(self) -> int:
+        return len(self.texts)
+        
+    def build_grid(self):
+        """شاخص شبکهای: خانه -> شماره کادرهایی که با آن همپوشانی دارند"""
+        
+        self.cell_size = self.line_height * 4
+        self.grid = {}
+        
+        if not len(self.boxes):
+            return
+            
+        cells = np.floor(self.boxes / self.cell_size).astype(np.int32)
+        
+        for index, (cx0, cy0, cx1, cy1) in enumerate(cells):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self.grid.setdefault((cx, cy), []).append(index)
+                    
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[int]:
+        """کادرهایی که با مستطیل داده شده همپوشانی دارند"""
+        
+        cx0, cy0 = int(x0 // self.cell_size), int(y0 // self.cell_size)
+        cx1, cy1 = int(x1 // self.cell_size), int(y1 // self.cell_size)
+        
+        found = set()
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                found.update(self.grid.get((cx, cy), ()))
+                
+        if not found:
+            return []
+            
+        # بررسی دقیق همپوشانی روی آرایه
+        candidates = np.fromiter(found, dtype=np.int64)
+        boxes = self.boxes[candidates]
+        overlap = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        
+        return candidates[overlap].tolist()
+        
+    def find_labels(self, label: str) -> List[int]:
+        """کادرهایی که متن برچسب (بدون توجه به فاصلهها) را دارند"""
+        
+        compact_label = label.replace(' ', '')
+        return [index for index, text in enumerate(self.compact_texts) if compact_label in text]
+        
+    def text_after_label(self, index: int, label: str) -> str:
+        """ادامه متن کادر برچسب پس از خود برچسب (مقدار چسبیده به برچسب)"""
+        
+        text = self.texts[index]
+        position = text.replace(' ', '').find(label.replace(' ', ''))
+        if position < 0:
+            return ""
+            
+        # نگاشت موقعیت در متن بدون فاصله به متن اصلی
+        remaining = len(label.replace(' ', '')) + position
+        for offset, char in enumerate(text):
+            if char != ' ':
+                remaining -= 1
+            if remaining == 0:
+                return text[offset + 1:].strip()
+                
+        return ""
+        
+    def neighbors(self, index: int, direction: str, max_gap_lines: float = 12.0) -> List[int]:
+        """کادرهای همسایه در یک جهت به ترتیب فاصله"""
+        
+        x0, y0, x1, y1 = self.boxes[index]
+        height = max(y1 - y0, 1.0)
+        
+        if direction in ('left', 'right'):
+            max_gap = self.line_height * max_gap_lines
+            if direction == 'left':
+                region = (x0 - max_gap, y0, x0, y1)
+            else:
+                region = (x1, y0, x1 + max_gap, y1)
+        elif direction == 'below':
+            region = (x0, y1, x1, y1 + self.line_height * 3)
+        else:
+            raise ValueError(f"جهت نامعتبر: {direction}")
+            
+        result = []
+        
+        for other in self.query(*region):
+            if other == index:
+                continue
+                
+            ox0, oy0, ox1, oy1 = self.boxes[other]
+            
+            if direction in ('left', 'right'):
+                # همان خط: حداقل نصف ارتفاع همپوشانی عمودی
+                vertical_overlap = min(y1, oy1) - max(y0, oy0)
+                if vertical_overlap < 0.5 * min(height, oy1 - oy0):
+                    continue
+                    
+                distance = x0 - ox1 if direction == 'left' else ox0 - x1
+                if distance < -0.25 * height:
+                    continue
+            else:
+                distance = oy0 - y1
+                if distance < -0.25 * height:
+                    continue
+                    
+            result.append((float(distance), other))
+            
+        result.sort()
+        return [other for _, other in result]
+        
+    def normalized_box(self, index: int) -> List[float]:
+        """کادر به مختصات نسبی صفحه (0 تا 1)"""
+        
+        x0, y0, x1, y1 = self.boxes[index]
+        return [
+            round(float(x0) / self.width, 4), round(float(y0) / self.height, 4),
+            round(float(x1) / self.width, 4), round(float(y1) / self.height, 4)
+        ]
+        
+    def value_candidates(self, label: str,
+                         directions: Tuple[str, ...] = DEFAULT_DIRECTIONS) -> List[Tuple[str, int]]:
+        """متنهای نامزد مقدار برای یک برچسب: (متن، شماره کادر) به ترتیب اولویت"""
+        
+        candidates = []
+        
+        for index in self.find_labels(label):
+            remainder = self.text_after_label(index, label)
+            if remainder:
+                candidates.append((remainder, index))
+                
+            for direction in directions:
+                for other in self.neighbors(index, direction)[:2]:
+                    candidates.append((self.texts[other], other))
+                    
+        return candidates
@@ -0,0 +1,286 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧩 قالبهای چیدمان یاد گرفته شده (اثر انگشت صفحه -> محل کادر مقدار هر فیلد)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# تعداد بخشهای هر پروفایل (سطرها و ستونها)
+PROFILE_BINS = 64
+
+# عرض تصویر کوچک شده برای محاسبه اثر انگشت
+FINGERPRINT_WIDTH = 256
+
+def page_role(page_num: int) -> int:
+    """نقش صفحه در اظهارنامه: 0 صفحه اول، 1 صفحات بعدی (فیلدهای ضروری فقط به همین بستگی دارند)"""
+    
+    return 0 if page_num == 0 else 1
+
+class LayoutTemplateCache:
+    def __init__(self, path: str, max_templates: int = 200, min_similarity: float = 0.9,
+                 max_misses: int = 3, save_every: int = 25):
+        """کش قالبهای چیدمان با حذف LRU و ذخیره در کنار الگوها
+        
+        اثر انگشت هر صفحه پروفایل افقی و عمودی جوهر روی تصویر کوچک شده است؛
+        خطوط جدول و کادرهای فرم بیشترین سهم را در این پروفایلها دارند
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        
+        # مرحله رندر (شناسایی صفحات) و مرحله OCR از رشتههای مختلف به قالبها دسترسی دارند
+        self._lock = threading.RLock()
+        
+        self.path = Path(path)
+        self.max_templates = max(1, max_templates)
+        self.min_similarity = min_similarity
+        
+        # قالبی که پشت سر هم در برش ناحیهها شکست بخورد حذف میشود
+        self.max_misses = max(1, max_misses)
+        
+        # ذخیره شمارندهها پس از این تعداد تغییر (قالب جدید فورا ذخیره میشود)
+        self.save_every = max(1, save_every)
+        
+        # شناسه -> قالب (ترتیب: کمترین استفاده اخیر اول)
+        self.templates = OrderedDict()
+        self.removed = set()
+        self.dirty = 0
+        
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        
+        # ماتریس پروفایلها برای مقایسه یکجا (با هر تغییر قالبها دوباره ساخته میشود)
+        self._matrix = None
+        self._matrix_ids = []
+        self._matrix_roles = None
+        
+        self.load()
+        
+    @staticmethod
+    def fingerprint(gray: np.ndarray) -> np.ndarray:
+        """اثر انگشت چیدمان: پروفایل جوهر سطرها و ستونها (نرمال شده) + نسبت ابعاد"""
+        
+        height, width = gray.shape[:2]
+        small_height = max(1, int(round(height * FINGERPRINT_WIDTH / width)))
+        small = cv2.resize(gray, (FINGERPRINT_WIDTH, small_height), interpolation=cv2.INTER_AREA)
+        
+        _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        ink = ink.astype(np.float32)
+        
+        rows = cv2.resize(ink.mean(axis=1).reshape(-1, 1), (1, PROFILE_BINS), interpolation=cv2.INTER_AREA).ravel()
+        cols = cv2.resize(ink.mean(axis=0).reshape(1, -1), (PROFILE_BINS, 1), interpolation=cv2.INTER_AREA).ravel()
+        
+        profiles = []
+        for profile in (rows, cols):
+            profile = profile - profile.mean()
+            norm = float(np.linalg.norm(profile))
+            profiles.append(profile / norm if norm > 0 else profile)
+            
+        return np.concatenate(profiles + [np.array([height / width], dtype=np.float32)]).astype(np.float32)
+        
+    def _build_matrix(self):
+        """ماتریس اثر انگشت قالبها (هر سطر یک قالب)"""
+        
+        with self._lock:
+            self._matrix_ids = list(self.templates)
+            if self._matrix_ids:
+                self._matrix = np.array(
+                    [self.templates[template_id]['fingerprint'] for template_id in self._matrix_ids],
+                    dtype=np.float32
+                )
+                self._matrix_roles = np.array(
+                    [page_role(self.templates[template_id].get('page', 0)) for template_id in self._matrix_ids]
+                )
+            else:
+                self._matrix = None
+                self._matrix_roles = None
+                
+    def match(self, fingerprint: np.ndarray, page_num: Optional[int] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """نزدیکترین قالب با شباهت کافی - (شناسه، قالب) یا None"""
+        
+        with self._lock:
+            self.lookups += 1
+            
+            template_id = self.find(fingerprint, page_num)
+            if template_id is None:
+                return None
+                
+            self.templates.move_to_end(template_id)
+            return template_id, self.templates[template_id]
+            
+    def find(self, fingerprint: np.ndarray, page_num: Optional[int] = None) -> Optional[str]:
+        """شناسه نزدیکترین قالب با شباهت کافی (بدون ثبت در آمار)
+        
+        با شماره صفحه فقط قالبهای همان نقش صفحه (اول یا بعدی) مقایسه میشوند
+        """
+        
+        with self._lock:
+            if self._matrix is None or len(self._matrix_ids) != len(self.templates):
+                self._build_matrix()
+            if self._matrix is None:
+                return None
+                
+            # میانگین همبستگی پروفایل سطرها و ستونها
+            similarity = (self._matrix[:, :-1] @ fingerprint[:-1]) / 2
+            
+            # صفحات با نسبت ابعاد متفاوت مقایسه نمیشوند
+            similarity[np.abs(self._matrix[:, -1] - fingerprint[-1]) > 0.02] = -1.0
+            
+            if page_num is not None:
+                similarity[self._matrix_roles != page_role(page_num)] = -1.0
+                
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.min_similarity:
+                return None
+                
+            return self._matrix_ids[best]
+            
+    def record_result(self, template_id: str, success: bool):
+        """ثبت نتیجه استفاده از قالب (برش ناحیهها معتبر بود یا نه)"""
+        
+        with self._lock:
+            template = self.templates.get(template_id)
+            if template is None:
+                return
+                
+            if success:
+                self.hits += 1
+                template['hits'] += 1
+                template['consecutive_misses'] = 0
+            else:
+                self.misses += 1
+                template['misses'] += 1
+                template['consecutive_misses'] += 1
+                
+                # چیدمان دیگری با اثر انگشت مشابه - قالب کنار گذاشته میشود
+                if template['consecutive_misses'] >= self.max_misses:
+                    self.remove(template_id)
+                    self.save()
+                    return
+                    
+            template['last_used'] = datetime.now().isoformat()
+            
+            self.dirty += 1
+            if self.dirty >= self.save_every:
+                self.save()
+                
+    def learn(self, fingerprint: np.ndarray, doc_type: str, page_num: int,
+              field_boxes: Dict[str, List[float]]) -> str:
+        """ثبت یا بهروزرسانی قالب صفحهای که فیلدهایش معتبر شدهاند"""
+        
+        with self._lock:
+            template_id = self.find(fingerprint, page_num)
+            
+            if template_id is not None:
+                template = self.templates[template_id]
+            else:
+                template_id = hashlib.md5(fingerprint.tobytes() + bytes([page_role(page_num)])).hexdigest()[:16]
+                template = {
+                    'fingerprint': [round(float(v), 5) for v in fingerprint],
+                    'hits': 0,
+                    'misses': 0,
+                    'consecutive_misses': 0,
+                    'created': datetime.now().isoformat()
+                }
+                self.templates[template_id] = template
+                self.removed.discard(template_id)
+                
+            template.update({
+                'doc_type': doc_type,
+                'page': page_num,
+                'fields': {field: [round(float(v), 4) for v in box] for field, box in field_boxes.items()},
+                'last_used': datetime.now().isoformat()
+            })
+            self.templates.move_to_end(template_id)
+            
+            # حذف قالبهایی که مدتها استفاده نشدهاند
+            while len(self.templates) > self.max_templates:
+                self.remove(next(iter(self.templates)))
+                
+            self._matrix = None
+            self.save()
+            
+            return template_id
+            
+    def remove(self, template_id: str):
+        """حذف یک قالب"""
+        
+        with self._lock:
+            if self.templates.pop(template_id, None) is not None:
+                self.removed.add(template_id)
+                self._matrix = None
+                
+    def load(self):
+        """بارگذاری قالبهای ذخیره شده"""
+        
+        if not self.path.exists():
+            return
+            
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در بارگذاری قالبهای چیدمان: {e}")
+            return
+            
+        templates = sorted(data.get('templates', {}).items(), key=lambda item: item[1].get('last_used', ''))
+        self.templates = OrderedDict(templates[-self.max_templates:])
+        self._matrix = None
+        
+        self.logger.info(f"🧩 {len(self.templates)} قالب چیدمان بارگذاری شد")
+        
+    def save(self):
+        """ذخیره قالبها - قالبهای ذخیره شده پردازشگرهای دیگر حفظ میشوند"""
+        
+        with self._lock:
+            try:
+                on_disk = {}
+                if self.path.exists():
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        on_disk = json.load(f).get('templates', {})
+                        
+                for template_id, template in on_disk.items():
+                    if template_id not in self.templates and template_id not in self.removed:
+                        self.templates[template_id] = template
+                        self.templates.move_to_end(template_id, last=False)
+                        
+                while len(self.templates) > self.max_templates:
+                    self.remove(next(iter(self.templates)))
+                    
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'templates': self.templates}, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+                
+                self.dirty = 0
+                self._matrix = None
+                
+            except Exception as e:
+                self.logger.warning(f"⚠️ خطا در ذخیره قالبهای چیدمان: {e}")
+                
+    def get_stats(self) -> Dict[str, Any]:
+        """آمار استفاده از قالبها"""
+        
+        with self._lock:
+            return {
+                'templates': len(self.templates),
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / self.lookups * 100, 1) if self.lookups else 0.0
+            }
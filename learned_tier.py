@@ -0,0 +1,174 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📚 لایه الگوهای یاد گرفته شده در مسیر استخراج (کامپایل شده با بارگذاری مجدد خودکار)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import time
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+from pattern_scanner import FieldScanner, context_literals
+from regex_guard import RegexGuard
+
+# ترتیب هزینه برای رتبهبندی الگوها
+_COST_RANK = {'low': 0, 'medium': 1, 'high': 2, 'catastrophic': 3}
+
+# الگوهای بدون رتبه بهینهساز (مثلا یاد گرفته شده پس از آخرین بهینهسازی) بعد از الگوهای رتبهدار
+_UNRANKED = float('inf')
+
+class LearnedPatternTier:
+    def __init__(self, learning_system, field_names: List[str], guard: Optional[RegexGuard] = None,
+                 min_accuracy: float = 70.0, reload_interval: float = 1.0):
+        """الگوهای یاد گرفته شده در دو سطح
+        
+        - trusted: بهترین الگوهای هر فیلد (get_best_patterns_for_field) که جز مقدار رشته ثابت
+          دیگری (برچسب یا متن اطراف) دارند - پیش از الگوهای پایه
+        - probation: الگوهای هنوز ارزیابی نشده و بهترین الگوهای بدون برچسب (مقدار ثابت اصلاح شده) -
+          فقط وقتی الگوهای پایه چیزی پیدا نکنند
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.learning_system = learning_system
+        self.field_names = list(field_names)
+        self.guard = guard
+        self.min_accuracy = min_accuracy
+        self.reload_interval = reload_interval
+        
+        self.trusted_scanner = FieldScanner({}, guard=guard)
+        self.probation_scanner = FieldScanner({}, guard=guard)
+        
+        # اطلاعات الگوهای هر سطح: فیلد -> لیست دادههای الگو به ترتیب اجرا
+        self.trusted = {}
+        self.probation = {}
+        
+        # نام ذخیره شده هر الگو در سیستم یادگیری: (فیلد، الگو) -> نام فیلد ذخیره شده
+        self.stored_names = {}
+        
+        self.version = 0
+        self._signature = None
+        self._last_check = 0.0
+        
+    def normalize_field_name(self, field_name: str) -> Optional[str]:
+        """تبدیل نام فیلد ذخیره شده (برچسب یا کلید) به کلید فیلد موتور استخراج"""
+        
+        key = field_name.strip().replace(' ', '_')
+        if key in self.field_names:
+            return key
+            
+        # برچسبهایی مثل «جمع حقوق و عوارض»
+        key = key.replace('_و_', '_')
+        if key in self.field_names:
+            return key
+            
+        return None
+        
+    def signature(self) -> Tuple:
+        """امضای وضعیت فعلی الگوها (تغییر در حافظه یا فایل)"""
+        
+        return tuple(
+            (field_name, pattern_data.get('pattern'), pattern_data.get('accuracy'),
+             pattern_data.get('total_attempts'), pattern_data.get('cost_class'),
+             pattern_data.get('optimizer_rank'))
+            for field_name, patterns in sorted(self.learning_system.learned_patterns.items())
+            for pattern_data in patterns
+        )
+        
+    def refresh(self, force: bool = False) -> bool:
+        """بارگذاری مجدد در صورت تغییر الگوها (حداکثر یک بار در هر بازه)"""
+        
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return False
+        self._last_check = now
+        
+        # تغییر فایل توسط GUI یا پردازه دیگر
+        self.learning_system.reload_if_changed()
+        
+        signature = self.signature()
+        if not force and signature == self._signature:
+            return False
+            
+        self._signature = signature
+        self.rebuild()
+        return True
+        
+    def rebuild(self):
+        """ساخت دوباره اسکنرهای دو سطح"""
+        
+        trusted = {}
+        probation = {}
+        stored_names = {}
+        
+        for stored_name, patterns in self.learning_system.learned_patterns.items():
+            field_name = self.normalize_field_name(stored_name)
+            if field_name is None:
+                continue
+                
+            for pattern_data in patterns:
+                stored_names.setdefault((field_name, pattern_data['pattern']), stored_name)
+                
+            # الگوی بدون برچسب هر جای صفحه match میشود و نباید الگوهای پایه را کنار بزند
+            best = []
+            unanchored = set()
+            for pattern_data in self.learning_system.get_best_patterns_for_field(stored_name, self.min_accuracy):
+                if context_literals(pattern_data['pattern']):
+                    best.append(pattern_data)
+                else:
+                    unanchored.add(pattern_data['pattern'])
+                    
+            best_patterns = {pattern_data['pattern'] for pattern_data in best}
+            
+            trusted.setdefault(field_name, []).extend(best)
+            
+            # الگوهایی که هنوز به اندازه کافی ارزیابی نشدهاند
+            probation.setdefault(field_name, []).extend(
+                pattern_data for pattern_data in patterns
+                if pattern_data['pattern'] not in best_patterns
+                and (pattern_data.get('total_attempts', 0) < 2 or pattern_data['pattern'] in unanchored)
+            )
+            
+        # ترتیب: رتبه اعمال شده بهینهساز، دقت بیشتر، هزینه کمتر، موفقیت بیشتر
+        for field_name in trusted:
+            trusted[field_name].sort(key=lambda p: (
+                p.get('optimizer_rank', _UNRANKED),
+                -p.get('accuracy', 0.0),
+                _COST_RANK.get(p.get('cost_class'), 1),
+                -p.get('success_count', 0)
+            ))
+            
+        for field_name in probation:
+            probation[field_name].sort(key=lambda p: (
+                p.get('optimizer_rank', _UNRANKED),
+                _COST_RANK.get(p.get('cost_class'), 1),
+                -p.get('quality_score', 0.0)
+            ))
+            
+        self.trusted = {field: patterns for field, patterns in trusted.items() if patterns}
+        self.probation = {field: patterns for field, patterns in probation.items() if patterns}
+        self.stored_names = stored_names
+        
+        self.trusted_scanner = FieldScanner(self._scanner_config(self.trusted), guard=self.guard)
+        self.probation_scanner = FieldScanner(self._scanner_config(self.probation), guard=self.guard)
+        
+        self.version += 1
+        
+        trusted_count = sum(len(patterns) for patterns in self.trusted.values())
+        probation_count = sum(len(patterns) for patterns in self.probation.values())
+        self.logger.info(f"📚 الگوهای یاد گرفته شده: {trusted_count} معتبر، {probation_count} آزمایشی")
+        
+    def _scanner_config(self, tier: Dict[str, List[Dict]]) -> Dict[str, Dict[str, Any]]:
+        """تبدیل سطح به ورودی FieldScanner"""
+        
+        return {
+            field_name: {'patterns': [pattern_data['pattern'] for pattern_data in patterns]}
+            for field_name, patterns in tier.items()
+        }
+        
+    def is_empty(self) -> bool:
+        """آیا هیچ الگوی یاد گرفته شدهای وجود ندارد"""
+        
+        return not self.trusted and not self.probation
@@ -6,6 +6,8 @@
 تاریخ: 2025-06-05
 """
 
+import os
+import copy
 import json
 import re
 from pathlib import Path
@@ -15,6 +17,39 @@ from typing import Dict, List, Any, Optional
 import pickle
 import hashlib
 
+from pattern_stats import empty_counters, add_counters
+
+def merge_learned_patterns(base: Dict[str, List[Dict]], mine: Dict[str, List[Dict]],
+                           theirs: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """ادغام سه طرفه الگوها (کلید: فیلد و متن الگو)
+    
+    base: آخرین نسخه مشترک، mine: نسخه این پردازه، theirs: نسخه فعلی فایل.
+    الگویی که فقط یک طرف تغییر داده (یا حذف کرده) نسخه همان طرف را میگیرد؛ در تغییر دو طرفه نسخه این پردازه میماند
+    """
+    
+    def index(patterns: Dict[str, List[Dict]]) -> Dict[tuple, Dict]:
+        return {
+            (field_name, pattern_data['pattern']): pattern_data
+            for field_name, field_patterns in patterns.items()
+            for pattern_data in field_patterns
+        }
+        
+    base_index, my_index, their_index = index(base), index(mine), index(theirs)
+    
+    merged = {}
+    
+    # ترتیب الگوهای فایل حفظ میشود؛ الگوهای جدید این پردازه در انتها
+    keys = list(their_index) + [key for key in my_index if key not in their_index]
+    
+    for key in keys:
+        base_data, my_data, their_data = base_index.get(key), my_index.get(key), their_index.get(key)
+        
+        chosen = their_data if my_data == base_data else my_data
+        if chosen is not None:
+            merged.setdefault(key[0], []).append(chosen)
+            
+    return merged
+
 class LearningSystem:
     def __init__(self):
         """سیستم یادگیری هوشمند"""
@@ -29,12 +64,23 @@ class LearningSystem:
         self.learned_patterns_file = self.patterns_dir / "learned_patterns.json"
         self.user_corrections_file = self.patterns_dir / "user_corrections.json"
         self.performance_log_file = self.patterns_dir / "performance_log.json"
+        self.pattern_stats_file = self.patterns_dir / "pattern_stats.json"
+        self.optimization_report_file = self.patterns_dir / "pattern_optimization.json"
         
         # ساختار دادههای یادگیری
         self.learned_patterns = {}
+        
+        # زمان آخرین تغییر فایل الگوها (برای بارگذاری مجدد خودکار)
+        self._patterns_mtime = None
+        
+        # آخرین نسخه خوانده یا نوشته شده فایل (مبنای ادغام با تغییرات پردازههای دیگر)
+        self._patterns_base = {}
         self.user_corrections = []
         self.performance_log = []
         
+        # آمار اجرای الگوهای پایه: فیلد -> الگو -> شمارندهها
+        self.pattern_stats = {'pages': 0, 'fields': {}}
+        
         # آمار یادگیری
         self.learning_stats = {
             'total_corrections': 0,
@@ -43,6 +89,12 @@ class LearningSystem:
             'last_learning_session': None
         }
         
+        # تحلیلگر هزینه الگوها (در اولین استفاده ساخته میشود) - تنظیمات از موتور استخراج
+        self.pattern_analyzer = None
+        self.analyzer_settings = {'cache_path': "cache/ocr_cache.db", 'time_budget_ms': 250}
+        self.pattern_optimizer = None
+        self.last_pattern_analysis = None
+        
         # بارگذاری دادههای موجود
         self.load_all_data()
         
@@ -52,6 +104,7 @@ class LearningSystem:
             self.load_patterns()
             self.load_corrections()
             self.load_performance_log()
+            self.load_pattern_stats()
             self.logger.info("✅ دادههای یادگیری بارگذاری شد")
         except Exception as e:
             self.logger.warning(f"⚠️ خطا در بارگذاری دادهها: {e}")
@@ -60,6 +113,7 @@ class LearningSystem:
         """بارگذاری الگوهای یاد گرفته شده"""
         try:
             if self.learned_patterns_file.exists():
+                self._patterns_mtime = self.learned_patterns_file.stat().st_mtime_ns
                 with open(self.learned_patterns_file, 'r', encoding='utf-8') as f:
                     self.learned_patterns = json.load(f)
                 self.logger.info(f"📚 {len(self.learned_patterns)} الگو بارگذاری شد")
@@ -69,6 +123,8 @@ class LearningSystem:
             self.logger.error(f"❌ خطا در بارگذاری الگوها: {e}")
             self.learned_patterns = {}
             
+        self._patterns_base = copy.deepcopy(self.learned_patterns)
+            
     def load_corrections(self):
         """بارگذاری تصحیحات کاربر"""
         try:
@@ -90,8 +146,22 @@ class LearningSystem:
             self.logger.error(f"❌ خطا در بارگذاری لاگ عملکرد: {e}")
             self.performance_log = []
             
+    def load_pattern_stats(self):
+        """بارگذاری آمار اجرای الگوهای پایه"""
+        try:
+            if self.pattern_stats_file.exists():
+                with open(self.pattern_stats_file, 'r', encoding='utf-8') as f:
+                    self.pattern_stats = json.load(f)
+        except Exception as e:
+            self.logger.error(f"❌ خطا در بارگذاری آمار الگوها: {e}")
+            self.pattern_stats = {'pages': 0, 'fields': {}}
+            
     def learn_from_edits(self, edit_widgets: Dict[str, Any]):
-        """یادگیری از ویرایشهای کاربر"""
+        """یادگیری از ویرایشهای کاربر
+        
+        هر ویرایش مقدار فعلی را در 'value' دارد (نه متغیر Tk) تا در نخ پسزمینه اجرا شود؛
+        تحلیل هزینه الگوهای جدید ممکن است طول بکشد
+        """
         
         learning_session = {
             'session_id': self.generate_session_id(),
@@ -104,7 +174,7 @@ class LearningSystem:
         
         try:
             for field_id, widget_data in edit_widgets.items():
-                current_value = widget_data['var'].get().strip()
+                current_value = widget_data['value'].strip()
                 original_value = widget_data['original_value']
                 field_name = widget_data['label']
                 confidence = widget_data['confidence']
@@ -396,8 +466,35 @@ class LearningSystem:
         
         return pattern_scores[0][0] if pattern_scores else patterns[0]
         
-    def add_learned_pattern(self, field_name: str, pattern_data: Dict):
-        """اضافه کردن الگوی یاد گرفته شده"""
+    def configure_analyzer(self, cache_path: str, time_budget_ms: float):
+        """تنظیمات تحلیلگر هزینه (کش OCR و سقف زمانی موتور استخراج)"""
+        
+        settings = {'cache_path': cache_path, 'time_budget_ms': time_budget_ms}
+        if settings != self.analyzer_settings:
+            self.analyzer_settings = settings
+            self.pattern_analyzer = None
+            
+    def analyze_pattern(self, pattern: str) -> Dict[str, Any]:
+        """تحلیل هزینه و خطر ReDoS الگو (ممکن است طول بکشد - در نخ پسزمینه فراخوانی شود)"""
+        
+        if self.pattern_analyzer is None:
+            from pattern_analyzer import PatternAnalyzer
+            self.pattern_analyzer = PatternAnalyzer(
+                self.analyzer_settings['cache_path'],
+                time_budget_ms=self.analyzer_settings['time_budget_ms']
+            )
+            
+        self.last_pattern_analysis = self.pattern_analyzer.analyze(pattern)
+        return self.last_pattern_analysis
+        
+    def add_learned_pattern(self, field_name: str, pattern_data: Dict, override: bool = False,
+                            analysis: Optional[Dict[str, Any]] = None):
+        """اضافه کردن الگوی یاد گرفته شده (الگوهای پرهزینه فقط با override پذیرفته میشوند)
+        
+        analysis: نتیجه analyze_pattern همین الگو در صورت اجرای قبلی (تحلیل دوباره اجرا نمیشود)
+        """
+        
+        self.last_pattern_analysis = None
         
         try:
             if field_name not in self.learned_patterns:
@@ -407,6 +504,25 @@ class LearningSystem:
             existing_patterns = [p['pattern'] for p in self.learned_patterns[field_name]]
             
             if pattern_data['pattern'] not in existing_patterns:
+                # تحلیل هزینه پیش از پذیرش
+                if analysis is None or analysis.get('pattern') != pattern_data['pattern']:
+                    analysis = self.analyze_pattern(pattern_data['pattern'])
+                self.last_pattern_analysis = analysis
+                
+                if not analysis['valid']:
+                    self.logger.error(f"الگوی نامعتبر: {analysis['error']}")
+                    return False
+                    
+                if not analysis['accepted'] and not override:
+                    self.logger.warning(
+                        f"🚫 الگوی پرهزینه برای {field_name} رد شد ({analysis['cost_class']}): {pattern_data['pattern']}"
+                    )
+                    return False
+                    
+                pattern_data['cost_class'] = analysis['cost_class']
+                if not analysis['accepted']:
+                    pattern_data['cost_override'] = True
+                    
                 self.learned_patterns[field_name].append(pattern_data)
                 self.learning_stats['successful_patterns'] += 1
                 
@@ -434,7 +550,8 @@ class LearningSystem:
         """دریافت الگوهای یاد گرفته شده"""
         return self.learned_patterns.copy()
         
-    def add_custom_pattern(self, field_name: str, pattern: str) -> bool:
+    def add_custom_pattern(self, field_name: str, pattern: str, override: bool = False,
+                           analysis: Optional[Dict[str, Any]] = None) -> bool:
         """اضافه کردن الگوی دستی"""
         
         try:
@@ -454,7 +571,7 @@ class LearningSystem:
                 'pattern_type': 'manual'
             }
             
-            return self.add_learned_pattern(field_name, custom_pattern)
+            return self.add_learned_pattern(field_name, custom_pattern, override=override, analysis=analysis)
             
         except re.error as e:
             self.logger.error(f"الگوی نامعتبر: {e}")
@@ -511,6 +628,34 @@ class LearningSystem:
         except Exception as e:
             self.logger.error(f"خطا در بهروزرسانی عملکرد: {e}")
             
+    def record_pattern_stats(self, snapshot: Dict[str, Any]):
+        """ادغام دستهای آمار اجرای الگوها (خروجی PatternStats.drain)
+        
+        الگوهای یاد گرفته شده: فقط runtime_stats - انتخاب شدن یعنی عبور از اعتبارسنجی، نه درستی مقدار؛
+        دقت و شمارنده موفقیت فقط با تصحیحات کاربر تغییر میکنند.
+        الگوهای پایه در pattern_stats.json نگهداری میشوند
+        """
+        
+        learned_changed = False
+        
+        for (source, field_name, pattern), counters in snapshot.get('counters', {}).items():
+            if source == 'learned':
+                for pattern_data in self.learned_patterns.get(field_name, []):
+                    if pattern_data['pattern'] == pattern:
+                        add_counters(pattern_data.setdefault('runtime_stats', empty_counters()), counters)
+                        learned_changed = True
+                        break
+            else:
+                field_stats = self.pattern_stats['fields'].setdefault(field_name, {})
+                add_counters(field_stats.setdefault(pattern, empty_counters()), counters)
+                
+        self.pattern_stats['pages'] += snapshot.get('pages', 0)
+        self.pattern_stats['updated_at'] = datetime.now().isoformat()
+        
+        if learned_changed:
+            self.save_patterns()
+        self.save_pattern_stats()
+        
     def get_best_patterns_for_field(self, field_name: str, min_accuracy: float = 70.0) -> List[Dict]:
         """دریافت بهترین الگوها برای یک فیلد"""
         
@@ -615,8 +760,8 @@ class LearningSystem:
             self.logger.error(f"خطا در صادر کردن: {e}")
             return False
             
-    def import_patterns_from_file(self, input_file: str) -> bool:
-        """وارد کردن الگوها از فایل"""
+    def import_patterns_from_file(self, input_file: str, override: bool = False) -> bool:
+        """وارد کردن الگوها از فایل (الگوهای پرهزینه بدون override رد میشوند)"""
         
         try:
             with open(input_file, 'r', encoding='utf-8') as f:
@@ -626,6 +771,7 @@ class LearningSystem:
                 raise ValueError("فرمت فایل نامعتبر است")
                 
             imported_count = 0
+            rejected_count = 0
             
             for field_name, patterns in import_data['patterns'].items():
                 for pattern_data in patterns:
@@ -633,10 +779,14 @@ class LearningSystem:
                     pattern_data['pattern_type'] = 'imported'
                     pattern_data['imported_at'] = datetime.now().isoformat()
                     
-                    if self.add_learned_pattern(field_name, pattern_data):
+                    if self.add_learned_pattern(field_name, pattern_data, override=override):
                         imported_count += 1
+                    elif self.last_pattern_analysis and not self.last_pattern_analysis['accepted']:
+                        rejected_count += 1
                         
             self.logger.info(f"📥 {imported_count} الگو وارد شد")
+            if rejected_count:
+                self.logger.warning(f"🚫 {rejected_count} الگوی پرهزینه یا نامعتبر رد شد")
             return True
             
         except Exception as e:
@@ -649,17 +799,53 @@ class LearningSystem:
             self.save_patterns()
             self.save_corrections()
             self.save_performance_log()
+            self.save_pattern_stats()
         except Exception as e:
             self.logger.error(f"خطا در ذخیره دادهها: {e}")
             
     def save_patterns(self):
-        """ذخیره الگوهای یاد گرفته شده"""
+        """ذخیره الگوهای یاد گرفته شده - تغییرات پردازههای دیگر (مثلا ویرایش در برنامه) حفظ میشوند"""
         try:
-            with open(self.learned_patterns_file, 'w', encoding='utf-8') as f:
+            # فایل پس از آخرین خواندن توسط پردازه دیگری نوشته شده - ادغام سه طرفه
+            if self.learned_patterns_file.exists() and \
+                    self.learned_patterns_file.stat().st_mtime_ns != self._patterns_mtime:
+                with open(self.learned_patterns_file, 'r', encoding='utf-8') as f:
+                    on_disk = json.load(f)
+                self.learned_patterns = merge_learned_patterns(self._patterns_base, self.learned_patterns, on_disk)
+                
+            self.learned_patterns_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.learned_patterns_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
                 json.dump(self.learned_patterns, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.learned_patterns_file)
+            
+            self._patterns_mtime = self.learned_patterns_file.stat().st_mtime_ns
+            self._patterns_base = copy.deepcopy(self.learned_patterns)
         except Exception as e:
             self.logger.error(f"خطا در ذخیره الگوها: {e}")
             
+    def reload_if_changed(self) -> bool:
+        """بارگذاری مجدد الگوها در صورت تغییر فایل توسط پردازه دیگر"""
+        
+        try:
+            mtime = self.learned_patterns_file.stat().st_mtime_ns
+        except OSError:
+            return False
+            
+        if mtime == self._patterns_mtime:
+            return False
+            
+        self.load_patterns()
+        return True
+            
+    def save_pattern_stats(self):
+        """ذخیره آمار اجرای الگوهای پایه"""
+        try:
+            with open(self.pattern_stats_file, 'w', encoding='utf-8') as f:
+                json.dump(self.pattern_stats, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"خطا در ذخیره آمار الگوها: {e}")
+            
     def save_corrections(self):
         """ذخیره تصحیحات کاربر"""
         try:
@@ -709,6 +895,85 @@ class LearningSystem:
         
         return stats
         
+    def optimize_patterns(self, apply: bool = False, min_runs: int = 50,
+                          include_manual: bool = False) -> Dict[str, Any]:
+        """بهینهسازی الگوها بر اساس هزینه اجرا و سهم واقعی (آمار pattern_stats)
+        
+        برای الگوهای پایه فقط پیشنهاد ثبت میشود؛ با apply الگوهای یاد گرفته شده
+        بدون برد حذف و ترتیب پیشنهادی بقیه در optimizer_rank ذخیره میشود (ترتیب اجرا در LearnedPatternTier)
+        """
+        
+        from pattern_optimizer import PatternOptimizer
+        
+        optimizer = PatternOptimizer(min_runs=min_runs, protect_manual=not include_manual)
+        self.pattern_optimizer = optimizer
+        
+        report = optimizer.optimize(self.pattern_stats, self.learned_patterns)
+        report['applied'] = False
+        report['created_at'] = datetime.now().isoformat()
+        
+        if apply:
+            retired_count = 0
+            
+            for field_report in report['fields']:
+                if field_report['source'] != 'learned' or field_report['field'] not in self.learned_patterns:
+                    continue
+                    
+                by_pattern = {p['pattern']: p for p in self.learned_patterns[field_report['field']]}
+                retired_count += len(field_report['retire'])
+                
+                self.learned_patterns[field_report['field']] = [
+                    by_pattern[pattern] for pattern in field_report['proposed_order'] if pattern in by_pattern
+                ]
+                for rank, pattern_data in enumerate(self.learned_patterns[field_report['field']]):
+                    pattern_data['optimizer_rank'] = rank
+                
+            self.learned_patterns = {field: patterns for field, patterns in self.learned_patterns.items() if patterns}
+            self.save_patterns()
+            
+            report['applied'] = True
+            self.logger.info(f"⚡ {retired_count} الگوی یاد گرفته شده بدون برد حذف شد")
+            
+        try:
+            with open(self.optimization_report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"خطا در ذخیره گزارش بهینهسازی: {e}")
+            
+        self.logger.info(
+            f"⚡ بهینهسازی الگوها: {report['retire_count']} الگوی قابل حذف، "
+            f"صرفهجویی {report['saved_ms_per_page']:.3f} ms در هر صفحه"
+        )
+        
+        return report
+        
+    def backtest_patterns(self, candidate: Dict[str, List[str]], cache_path: Optional[str] = "cache/ocr_cache.db",
+                          results_path: Optional[str] = None, workers: Optional[int] = None,
+                          max_pages: Optional[int] = None, config: Optional[Dict[str, Any]] = None,
+                          progress_callback=None) -> Dict[str, Any]:
+        """آزمون الگوهای پیشنهادی (فیلد -> لیست الگو) روی متن صفحات ذخیره شده
+        
+        مقدار هر فیلد با مقدار برنده فعلی و تصحیحات کاربر مقایسه میشود؛
+        برای اجرا در پسزمینه (نخ جداگانه) طراحی شده است
+        """
+        
+        from backtest_engine import BacktestEngine, load_corpus, normalize_field_key
+        
+        texts = load_corpus(cache_path, results_path, max_pages)
+        
+        # تصحیحات کاربر: (فیلد، مقدار اشتباه، مقدار درست)
+        corrections = [
+            (normalize_field_key(c['field_name']), c['original_value'], c['corrected_value'])
+            for c in self.user_corrections
+            if c.get('original_value') and c.get('corrected_value')
+        ]
+        
+        engine = BacktestEngine(config, workers=workers)
+        report = engine.run(candidate, texts, self.learned_patterns, corrections, progress_callback)
+        
+        self.logger.info(f"🧪 آزمون الگوها روی {report['pages']} صفحه در {report['elapsed']:.1f} ثانیه")
+        return report
+        
     def cleanup_old_patterns(self, days_old: int = 30, min_accuracy: float = 30.0):
         """پاکسازی الگوهای قدیمی و ضعیف"""
         
@@ -801,4 +1066,4 @@ class LearningSystem:
         except Exception as e:
             self.logger.error(f"خطا در اعتبارسنجی: {e}")
             
-        return validation_report
+        return validation_report
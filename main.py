@@ -10,8 +10,10 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import tkinter.font as tkFont
 from PIL import Image, ImageTk
+import copy
 import json
 import os
+import re
 from pathlib import Path
 import threading
 import queue
@@ -42,9 +44,14 @@ class CustomsExtractorGUI:
         self.results_data = {}
         self.selected_widget = None
         
-        # موتورهای اصلی
-        self.extractor = DocumentExtractor()
+        # پردازش و استخراج مجدد همزمان از استخراجگر مشترک و نتایج استفاده نمیکنند
+        self.processing = False
+        self.reextracting = False
+        self.reextract_pending = False
+        
+        # موتورهای اصلی (الگوهای یاد گرفته شده مستقیما در استخراج استفاده میشوند)
         self.learning_system = LearningSystem()
+        self.extractor = DocumentExtractor(learning_system=self.learning_system)
         
         # ایجاد رابط کاربری
         self.create_ui()
@@ -730,6 +737,16 @@ class CustomsExtractorGUI:
             cursor='hand2'
         ).pack(side="left", padx=5)
         
+        tk.Button(
+            mgmt_buttons,
+            text="🧪 آزمون الگو",
+            command=self.backtest_pattern,
+            bg='#16a085',
+            fg='white',
+            font=self.fonts['persian'],
+            cursor='hand2'
+        ).pack(side="left", padx=5)
+        
         tk.Button(
             mgmt_buttons,
             text="✏️ ویرایش الگو",
@@ -770,6 +787,16 @@ class CustomsExtractorGUI:
             cursor='hand2'
         ).pack(side="right", padx=5)
         
+        tk.Button(
+            mgmt_buttons,
+            text="⚡ بهینهسازی الگوها",
+            command=self.optimize_patterns,
+            bg='#f39c12',
+            fg='white',
+            font=self.fonts['persian'],
+            cursor='hand2'
+        ).pack(side="right", padx=5)
+        
         # ناحیه ویرایش الگو
         edit_pattern_frame = tk.LabelFrame(
             management_frame,
@@ -892,6 +919,27 @@ class CustomsExtractorGUI:
                 bg='white'
             ).pack(side="left", padx=10)
             
+        # پردازش موازی
+        workers_frame = tk.Frame(processing_settings, bg='white')
+        workers_frame.pack(fill="x", padx=10, pady=10)
+        
+        tk.Label(
+            workers_frame,
+            text="تعداد پردازشگر موازی:",
+            font=self.fonts['persian'],
+            bg='white'
+        ).pack(side="left", padx=5)
+        
+        self.workers_var = tk.IntVar(value=1)
+        tk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=max(1, os.cpu_count() or 1),
+            textvariable=self.workers_var,
+            width=5,
+            font=self.fonts['persian_small']
+        ).pack(side="left", padx=10)
+        
         # تنظیمات OCR
         ocr_settings = tk.LabelFrame(
             self.settings_frame,
@@ -1269,6 +1317,12 @@ class CustomsExtractorGUI:
             messagebox.showwarning("هشدار", "ابتدا فایلهایی را انتخاب کنید")
             return
             
+        if self.processing or self.reextracting:
+            messagebox.showwarning("هشدار", "پردازش یا استخراج مجدد در حال اجراست")
+            return
+            
+        self.processing = True
+        
         # تنظیم progress bar
         self.progress_var.set(0)
         self.update_status("🔄 شروع پردازش...")
@@ -1284,6 +1338,13 @@ class CustomsExtractorGUI:
         try:
             total_files = len(self.current_files)
             
+            # پردازش موازی در صورت تنظیم چند پردازشگر
+            if self.extractor.config.get('workers', 1) > 1:
+                self.process_files_parallel()
+                return
+                
+            self.extractor.reset_page_dedup()
+            
             for i, file_path in enumerate(self.current_files):
                 # بهروزرسانی progress
                 progress = (i / total_files) * 100
@@ -1301,18 +1362,47 @@ class CustomsExtractorGUI:
                         self.results_data[file_path] = result
                         
                     # بهروزرسانی وضعیت
-                    status = "موفق" if result.get('status') == 'success' else "ناموفق"
+                    status = {'success': "موفق", 'partial': "ناقص"}.get(result.get('status'), "ناموفق")
                     self.root.after(0, lambda idx=i, s=status: self.update_file_status(idx, s))
                     
                 except Exception as e:
                     self.root.after(0, lambda idx=i: self.update_file_status(idx, "خطا"))
                     
+            # ذخیره آمار باقیمانده الگوها
+            self.extractor.flush_pattern_stats()
+            
             # تکمیل پردازش
             self.root.after(0, self.on_processing_complete)
             
         except Exception as e:
             self.root.after(0, lambda err=str(e): self.on_processing_error(err))
             
+    def process_files_parallel(self):
+        """پردازش فایلها با موتور دستهای چندپردازشگری"""
+        from batch_engine import BatchEngine
+        
+        total_files = len(self.current_files)
+        engine = BatchEngine(self.extractor.config, learning_system=self.learning_system)
+        
+        for i in range(total_files):
+            self.root.after(0, lambda idx=i: self.update_file_status(idx, "در صف"))
+            
+        for i, (file_path, result) in enumerate(engine.process(self.current_files)):
+            # بهروزرسانی progress
+            progress = ((i + 1) / total_files) * 100
+            self.root.after(0, lambda p=progress: self.progress_var.set(p))
+            
+            # ذخیره نتیجه
+            if file_path not in self.results_data:
+                self.results_data[file_path] = result
+                
+            # بهروزرسانی وضعیت
+            status = {'success': "موفق", 'partial': "ناقص"}.get(result.get('status'), "ناموفق")
+            self.root.after(0, lambda idx=i, s=status: self.update_file_status(idx, s))
+            
+        # تکمیل پردازش
+        self.root.after(0, self.on_processing_complete)
+        
     def update_file_status(self, index, status):
         """بهروزرسانی وضعیت فایل"""
         try:
@@ -1331,6 +1421,7 @@ class CustomsExtractorGUI:
         
     def on_processing_complete(self):
         """اتمام پردازش"""
+        self.finish_processing()
         self.progress_var.set(100)
         self.update_status("✅ پردازش تکمیل شد")
         
@@ -1345,6 +1436,7 @@ class CustomsExtractorGUI:
         
     def on_processing_error(self, error):
         """خطا در پردازش"""
+        self.finish_processing()
         self.update_status("❌ خطا در پردازش")
         messagebox.showerror("خطا", f"خطا در پردازش: {error}")
         
@@ -1556,7 +1648,8 @@ class CustomsExtractorGUI:
             'original_value': current_value,
             'confidence': confidence,
             'method': method,
-            'label': field_label
+            'label': field_label,
+            'data': field_data
         }
         
     def load_image_for_preview(self, file_path):
@@ -1564,14 +1657,9 @@ class CustomsExtractorGUI:
         try:
             # اگر فایل PDF است تصویر صفحه اول را بارگذاری کن
             if file_path.lower().endswith('.pdf'):
-                # جستجو برای تصویر متناظر در پوشه temp
-                file_stem = Path(file_path).stem
-                temp_dir = Path("temp")
-                
-                image_files = list(temp_dir.glob(f"{file_stem}_page_0.*"))
-                if image_files:
-                    image_path = str(image_files[0])
-                else:
+                # ساخت تصویر صفحه اول فقط برای پیشنمایش
+                image_path = self.extractor.get_page_preview(file_path, 0)
+                if not image_path:
                     return
             else:
                 image_path = file_path
@@ -1611,10 +1699,16 @@ class CustomsExtractorGUI:
             current_value = widget_data['var'].get().strip()
             original_value = widget_data['original_value']
             
-            if current_value != original_value:
+            if current_value != (original_value or ''):
                 changes_made = True
-                # بهروزرسانی دادهها
-                # (کد بهروزرسانی اینجا اضافه میشود)
+                
+                # بهروزرسانی نتیجه - مقدار دستی در استخراج مجدد پس از تغییر الگوها بازنویسی نمیشود
+                widget_data['data'].update({
+                    'value': current_value or None,
+                    'confidence': 1.0,
+                    'method': 'manual',
+                    'pattern': None
+                })
                 
         if changes_made:
             messagebox.showinfo("موفقیت", "تغییرات ذخیره شد")
@@ -1631,9 +1725,24 @@ class CustomsExtractorGUI:
         # ذخیره تغییرات
         self.save_edits()
         
-        # شروع فرآیند یادگیری
-        self.learning_system.learn_from_edits(self.edit_widgets)
+        # مقادیر ویرایش شده در نخ رابط خوانده میشوند؛ یادگیری (و تحلیل هزینه الگوها) در پسزمینه
+        edits = {
+            field_id: dict(widget_data, value=widget_data['var'].get())
+            for field_id, widget_data in self.edit_widgets.items()
+        }
+        self.update_status("🤖 در حال یادگیری...")
         
+        def run_learning():
+            learned = self.learning_system.learn_from_edits(edits)
+            self.root.after(0, lambda: self.on_learning_complete(learned))
+            
+        threading.Thread(target=run_learning, daemon=True).start()
+        
+    def on_learning_complete(self, learned):
+        """نمایش نتیجه یادگیری (در نخ رابط)"""
+        if learned:
+            self.refresh_results_after_pattern_change()
+            
         messagebox.showinfo("موفقیت", "تغییرات اعمال شد و الگوهای جدید یاد گرفته شد")
         self.update_status("🤖 یادگیری انجام شد")
         
@@ -1724,93 +1833,15 @@ class CustomsExtractorGUI:
                 
     def generate_excel_output(self, output_file):
         """تولید فایل Excel با فرمت مناسب"""
-        import pandas as pd
-        from openpyxl import load_workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        
-        # تهیه دادهها
-        data_rows = []
-        row_num = 1
-        
-        for file_path, result in self.results_data.items():
-            if 'pages' in result:
-                for page_result in result['pages']:
-                    data_rows.append(self.prepare_excel_row(row_num, file_path, page_result))
-                    row_num += 1
-            else:
-                data_rows.append(self.prepare_excel_row(row_num, file_path, result))
-                row_num += 1
-                
-        # ایجاد DataFrame
-        columns = [
-            'ردیف', 'نام فایل', 'وضعیت', 'زمان پردازش',
-            'شماره کوتا', 'کد کالا', 'شرح کالا', 'نوع بسته', 'تعداد بسته',
-            'وزن خالص', 'کشور طرف معامله', 'نرخ ارز', 'نوع ارز',
-            'ارزش گمرکی', 'بیمه', 'کرایه', 'حقوق ورودی', 'مالیات', 'جمع عوارض'
-        ]
-        
-        df = pd.DataFrame(data_rows, columns=columns)
+        from excel_export import write_excel
         
-        # ذخیره با pandas
-        df.to_excel(output_file, index=False, engine='openpyxl')
-        
-        # فرمتبندی با openpyxl
-        wb = load_workbook(output_file)
-        ws = wb.active
-        
-        # تنظیم راستچین
-        for row in ws.iter_rows():
-            for cell in row:
-                cell.alignment = Alignment(horizontal='right', vertical='center')
-                cell.font = Font(name='Tahoma', size=10)
-                
-        # رنگبندی هدر
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = Font(name='Tahoma', size=11, bold=True, color='FFFFFF')
-            
-        # تنظیم عرض ستونها
-        column_widths = {
-            'A': 8, 'B': 25, 'C': 12, 'D': 15, 'E': 15, 'F': 12,
-            'G': 30, 'H': 12, 'I': 12, 'J': 12, 'K': 20, 'L': 12,
-            'M': 10, 'N': 15, 'O': 12, 'P': 12, 'Q': 15, 'R': 12, 'S': 15
-        }
-        
-        for col, width in column_widths.items():
-            ws.column_dimensions[col].width = width
-            
-        wb.save(output_file)
+        write_excel(self.results_data.items(), output_file)
         
     def prepare_excel_row(self, row_num, file_path, result):
         """تهیه ردیف برای Excel"""
-        file_name = Path(file_path).name
-        status = result.get('status', 'نامشخص')
-        processing_time = result.get('processing_time', '0s')
+        from excel_export import prepare_excel_row
         
-        extracted = result.get('extracted', {})
-        
-        return [
-            row_num,
-            file_name,
-            'موفق' if status == 'success' else 'ناموفق',
-            processing_time,
-            extracted.get('شماره_کوتا', {}).get('value', ''),
-            extracted.get('کد_کالا', {}).get('value', ''),
-            extracted.get('شرح_کالا', {}).get('value', ''),
-            extracted.get('نوع_بسته', {}).get('value', ''),
-            extracted.get('تعداد_بسته', {}).get('value', ''),
-            extracted.get('وزن_خالص', {}).get('value', ''),
-            extracted.get('کشور_طرف_معامله', {}).get('value', ''),
-            extracted.get('نرخ_ارز', {}).get('value', ''),
-            extracted.get('نوع_ارز', {}).get('value', ''),
-            extracted.get('ارزش_گمرکی', {}).get('value', ''),
-            extracted.get('بیمه', {}).get('value', ''),
-            extracted.get('کرایه', {}).get('value', ''),
-            extracted.get('مبلغ_حقوق_ورودی', {}).get('value', ''),
-            extracted.get('مالیات_بر_ارزش_افزوده', {}).get('value', ''),
-            extracted.get('جمع_حقوق_عوارض', {}).get('value', '')
-        ]
+        return prepare_excel_row(row_num, file_path, result)
         
     def copy_to_clipboard(self):
         """کپی به کلیپبورد"""
@@ -1985,20 +2016,180 @@ class CustomsExtractorGUI:
             messagebox.showwarning("هشدار", "الگو نمیتواند خالی باشد")
             return
             
-        # تست الگو
+        field_name = self.pattern_field_var.get().replace(' ', '_')
+        
+        # تحلیل هزینه (بنچمارک بدترین حالت) در پسزمینه - یک بار برای بررسی و افزودن
+        self.update_status("🔬 در حال تحلیل الگو...")
+        
+        def run_analysis():
+            analysis = self.learning_system.analyze_pattern(pattern_text)
+            self.root.after(0, lambda: self.finish_add_pattern(field_name, pattern_text, analysis))
+            
+        threading.Thread(target=run_analysis, daemon=True).start()
+        
+    def finish_add_pattern(self, field_name, pattern_text, analysis):
+        """افزودن الگو پس از تحلیل هزینه (در نخ رابط)"""
+        self.update_status("✅ تحلیل الگو انجام شد")
+        
+        if not analysis['valid']:
+            messagebox.showerror("خطا", f"الگو نامعتبر است:\n{analysis['error']}")
+            return
+            
+        override = False
+        if not analysis['accepted']:
+            report = self.learning_system.pattern_analyzer.format_report(analysis)
+            override = messagebox.askyesno(
+                "الگوی پرهزینه",
+                f"این الگو ممکن است پردازش را بسیار کند کند:\n\n{report}\n\nآیا با این وجود اضافه شود؟"
+            )
+            if not override:
+                return
+                
+        # افزودن الگو
+        if not self.learning_system.add_custom_pattern(field_name, pattern_text, override=override,
+                                                       analysis=analysis):
+            messagebox.showwarning("هشدار", "الگو اضافه نشد (تکراری یا نامعتبر)")
+            return
+            
+        # ذخیره تا پردازشگرهای موازی هم الگو را بارگذاری کنند
+        self.learning_system.save_patterns()
+        
+        messagebox.showinfo("موفقیت", "الگو با موفقیت اضافه شد")
+        self.update_learning_display()
+        self.refresh_results_after_pattern_change()
+        
+    def finish_processing(self):
+        """پایان پردازش - استخراج مجدد معوق پس از تغییر الگوها در حین پردازش"""
+        self.processing = False
+        
+        if self.reextract_pending:
+            self.reextract_pending = False
+            self.refresh_results_after_pattern_change()
+            
+    def refresh_results_after_pattern_change(self):
+        """استخراج مجدد فیلدهای تغییر کرده روی متن ذخیره شده نتایج (در پسزمینه، بدون OCR)
+        
+        روی کپی نتایج اجرا میشود و نتیجه در رشته Tk جایگزین میشود؛ در حین پردازش تا پایان آن به تعویق میافتد
+        """
+        if not self.results_data:
+            return
+            
+        if self.processing or self.reextracting:
+            self.reextract_pending = True
+            return
+            
+        self.reextracting = True
+        snapshot = copy.deepcopy(self.results_data)
+        
+        def run_reextract():
+            try:
+                summary = self.extractor.reextract_results(snapshot)
+                self.root.after(0, lambda: self.on_reextract_complete(snapshot, summary))
+                
+            except Exception as e:
+                self.root.after(0, lambda err=str(e): self.on_reextract_complete(None, None, err))
+                
+        threading.Thread(target=run_reextract, daemon=True).start()
+        
+    def on_reextract_complete(self, snapshot, summary, error=None):
+        """اعمال نتایج استخراج مجدد در رشته Tk"""
+        self.reextracting = False
+        
+        if error is not None:
+            self.update_status(f"❌ خطا در استخراج مجدد: {error}")
+        elif summary['fields']:
+            self.apply_reextracted_results(snapshot)
+            self.display_results()
+            self.update_status(
+                f"🔁 {summary['fields']} فیلد در {summary['stale_pages']} صفحه دوباره استخراج شد "
+                f"({summary['changed']} تغییر)"
+            )
+            
+        # تغییر الگو در حین استخراج مجدد
+        if self.reextract_pending and not self.processing:
+            self.reextract_pending = False
+            self.refresh_results_after_pattern_change()
+            
+    def apply_reextracted_results(self, snapshot):
+        """جایگزینی فیلدهای استخراج شده مجدد در نتایج فعلی
+        
+        دیکشنری فیلدها درجا بهروز میشود (ویجتهای ویرایش به آنها ارجاع دارند)؛ مقادیری که در این
+        فاصله دستی ویرایش شدهاند حفظ میشوند
+        """
+        for file_path, snapshot_result in snapshot.items():
+            live_result = self.results_data.get(file_path)
+            if live_result is None:
+                continue
+                
+            snapshot_pages = snapshot_result.get('pages', [snapshot_result])
+            live_pages = live_result.get('pages', [live_result])
+            
+            for snapshot_page, live_page in zip(snapshot_pages, live_pages):
+                versions = snapshot_page.get('pattern_versions')
+                live_versions = live_page.get('pattern_versions')
+                if not versions or live_versions is None:
+                    continue
+                    
+                live_extracted = live_page.get('extracted', {})
+                
+                for field, version in versions.items():
+                    live_field = live_extracted.get(field)
+                    if live_versions.get(field) == version or live_field is None:
+                        continue
+                    if live_field.get('method') == 'manual':
+                        continue
+                        
+                    live_field.clear()
+                    live_field.update(snapshot_page['extracted'][field])
+                    live_versions[field] = version
+                    
+                live_page['success_rate'] = snapshot_page.get('success_rate', live_page.get('success_rate'))
+        
+    def backtest_pattern(self):
+        """آزمون الگو روی صفحات ذخیره شده در کش OCR (در پسزمینه)"""
+        if not self.pattern_field_var.get():
+            messagebox.showwarning("هشدار", "ابتدا فیلدی را انتخاب کنید")
+            return
+            
+        pattern_text = self.pattern_entry.get("1.0", tk.END).strip()
+        if not pattern_text:
+            messagebox.showwarning("هشدار", "الگو نمیتواند خالی باشد")
+            return
+            
         try:
-            import re
             re.compile(pattern_text)
         except re.error as e:
             messagebox.showerror("خطا", f"الگو نامعتبر است:\n{e}")
             return
             
-        # افزودن الگو
         field_name = self.pattern_field_var.get().replace(' ', '_')
-        self.learning_system.add_custom_pattern(field_name, pattern_text)
+        self.update_status("🧪 آزمون الگو روی صفحات ذخیره شده...")
         
-        messagebox.showinfo("موفقیت", "الگو با موفقیت اضافه شد")
-        self.update_learning_display()
+        def run_backtest():
+            try:
+                from backtest_engine import BacktestEngine
+                
+                report = self.learning_system.backtest_patterns(
+                    {field_name: [pattern_text]},
+                    cache_path=self.extractor.config.get('ocr_cache_path'),
+                    config=self.extractor.config,
+                    progress_callback=lambda done, total: self.root.after(
+                        0, lambda: self.update_status(f"🧪 آزمون الگو: {done}/{total} صفحه")
+                    )
+                )
+                
+                if not report['pages']:
+                    self.root.after(0, lambda: messagebox.showinfo("آزمون الگو", "صفحهای در کش OCR یافت نشد"))
+                else:
+                    text = BacktestEngine.format_report(report)
+                    self.root.after(0, lambda: messagebox.showinfo("آزمون الگو", text))
+                    
+                self.root.after(0, lambda: self.update_status("✅ آزمون الگو کامل شد"))
+                
+            except Exception as e:
+                self.root.after(0, lambda err=str(e): messagebox.showerror("خطا", f"خطا در آزمون الگو: {err}"))
+                
+        threading.Thread(target=run_backtest, daemon=True).start()
         
     def edit_pattern(self):
         """ویرایش الگو"""
@@ -2032,7 +2223,9 @@ class CustomsExtractorGUI:
             field_name = values[0].replace(' ', '_')
             pattern = values[1]
             
-            self.learning_system.remove_pattern(field_name, pattern)
+            if self.learning_system.remove_pattern(field_name, pattern):
+                self.learning_system.save_patterns()
+                self.refresh_results_after_pattern_change()
             self.update_learning_display()
             
             messagebox.showinfo("موفقیت", "الگو حذف شد")
@@ -2051,11 +2244,39 @@ class CustomsExtractorGUI:
         try:
             self.learning_system.load_patterns()
             self.update_learning_display()
+            self.refresh_results_after_pattern_change()
             messagebox.showinfo("موفقیت", "الگوها بارگذاری شد")
             self.update_status("🔄 الگوها بارگذاری شد")
         except Exception as e:
             messagebox.showerror("خطا", f"خطا در بارگذاری الگوها: {e}")
             
+    def optimize_patterns(self):
+        """بهینهسازی الگوها بر اساس آمار اجرا"""
+        try:
+            report = self.learning_system.optimize_patterns()
+            text = self.learning_system.pattern_optimizer.format_report(report)
+            
+            learned_retire = sum(
+                len(field['retire']) for field in report['fields'] if field['source'] == 'learned'
+            )
+            
+            if not learned_retire:
+                messagebox.showinfo("بهینهسازی الگوها", text)
+                return
+                
+            if messagebox.askyesno(
+                "بهینهسازی الگوها",
+                f"{text}\n\nالگوهای یاد گرفته شده بدون برد حذف و بقیه مرتب شوند؟\n"
+                "(تغییرات الگوهای پایه فقط پیشنهاد است)"
+            ):
+                self.learning_system.optimize_patterns(apply=True)
+                self.update_learning_display()
+                self.refresh_results_after_pattern_change()
+                self.update_status(f"⚡ {learned_retire} الگو حذف شد")
+                
+        except Exception as e:
+            messagebox.showerror("خطا", f"خطا در بهینهسازی الگوها: {e}")
+            
     # متدهای تنظیمات
     def update_confidence_label(self, value):
         """بهروزرسانی برچسب اطمینان"""
@@ -2078,9 +2299,14 @@ class CustomsExtractorGUI:
                 'ar': self.lang_ar.get()
             },
             'theme': self.theme_var.get(),
+            'workers': self.workers_var.get(),
+            'threads_per_worker': self.extractor.config.get('threads_per_worker', 1),
             'last_update': datetime.now().isoformat()
         }
         
+        # اعمال تنظیمات پردازش موازی روی موتور
+        self.extractor.update_config({'workers': settings['workers']})
+        
         try:
             with open("settings.json", 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
@@ -2098,6 +2324,7 @@ class CustomsExtractorGUI:
             self.lang_en.set(True)
             self.lang_ar.set(True)
             self.theme_var.set("light")
+            self.workers_var.set(1)
             
             messagebox.showinfo("موفقیت", "تنظیمات به حالت پیشفرض برگشت")
             self.update_status("🔄 تنظیمات بازنشانی شد")
@@ -2139,6 +2366,13 @@ class CustomsExtractorGUI:
                 
                 self.theme_var.set(settings.get('theme', 'light'))
                 
+                # تنظیمات پردازش موازی
+                self.workers_var.set(settings.get('workers', 1))
+                self.extractor.update_config({
+                    'workers': settings.get('workers', 1),
+                    'threads_per_worker': settings.get('threads_per_worker', 1)
+                })
+                
         except Exception as e:
             print(f"خطا در بارگذاری تنظیمات: {e}")
             
@@ -0,0 +1,250 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💾 کش پایدار نتایج OCR بر اساس محتوای تصویر
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+# نوع دادههای غیر از پاس OCR (جدول page_data)
+PAGE_TEXT = 'page_text'
+ORIENTATION = 'orientation'
+
+class OCRCache:
+    def __init__(self, db_path: str = "cache/ocr_cache.db", max_size_mb: float = 512):
+        """کش OCR روی SQLite با حذف LRU بر اساس حجم
+        
+        جدول ocr_cache فقط خروجی پاسهای OCR را نگه میدارد؛ دادههای دیگر هر صفحه
+        (متن نهایی صفحه، نتیجه تشخیص جهت و ...) با نوع خود در جدول page_data ذخیره میشوند
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        
+        # اتصال به صورت تنبل ساخته میشود (هر پردازشگر اتصال خودش را دارد)
+        self._connection = None
+        self._lock = threading.Lock()
+        
+        # بررسی حجم هر چند نوشتن یک بار
+        self._writes_since_check = 0
+        self._check_interval = 50
+        
+        # زمان دسترسی رکوردهای خوانده شده - با نوشتن بعدی (یا پس از این تعداد خواندن) یکجا ثبت میشود
+        # تا خواندن از کش قفل نوشتن SQLite را بین پردازشگرها نگیرد
+        self._touched = {}
+        self._touch_flush_size = 256
+        
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        
+    def _connect(self) -> sqlite3.Connection:
+        """ایجاد اتصال و جدول کش"""
+        
+        if self._connection is None:
+            self._connection = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ocr_cache_access ON ocr_cache(last_access)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS page_data ("
+                "key TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL, PRIMARY KEY (kind, key))"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_page_data_access ON page_data(last_access)"
+            )
+            self._connection.commit()
+            
+        return self._connection
+        
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """ساخت کلید کش از هش تصویر و تنظیمات موثر OCR"""
+        
+        content = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        
+    @staticmethod
+    def hash_raster(image) -> str:
+        """هش محتوای تصویر (آرایه numpy)"""
+        
+        if not image.flags['C_CONTIGUOUS']:
+            image = image.copy()
+            
+        digest = hashlib.sha1(str(image.shape).encode('utf-8'))
+        digest.update(image.data)
+        return digest.hexdigest()
+        
+    def get(self, key: str, kind: Optional[str] = None) -> Optional[Any]:
+        """خواندن مقدار از کش و بهروزرسانی زمان دسترسی (kind: نوع داده غیر OCR)"""
+        
+        table, where, params = self._location(key, kind)
+        
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    f"SELECT value FROM {table} WHERE {where}", params
+                ).fetchone()
+                
+                if row is None:
+                    self.stats['misses'] += 1
+                    return None
+                    
+                self._touched[(table, params)] = time.time()
+                if len(self._touched) >= self._touch_flush_size:
+                    self._flush_touches(connection)
+                    connection.commit()
+                    
+            self.stats['hits'] += 1
+            return json.loads(row[0])
+            
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در خواندن کش OCR: {e}")
+            return None
+            
+    def put(self, key: str, value: Any, kind: Optional[str] = None):
+        """ذخیره مقدار در کش (kind: نوع داده غیر OCR)"""
+        
+        try:
+            data = json.dumps(value, ensure_ascii=False)
+            size = len(data.encode('utf-8'))
+            
+            with self._lock:
+                connection = self._connect()
+                if kind is None:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO ocr_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                        (key, data, size, time.time())
+                    )
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO page_data (key, kind, value, size, last_access) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, kind, data, size, time.time())
+                    )
+                self._flush_touches(connection)
+                connection.commit()
+                
+                self.stats['writes'] += 1
+                self._writes_since_check += 1
+                
+                if self._writes_since_check >= self._check_interval:
+                    self._writes_since_check = 0
+                    self._evict(connection)
+                    
+        except Exception as e:
+            self.logger.warning(f"⚠️ خطا در ذخیره کش OCR: {e}")
+            
+    def _flush_touches(self, connection: sqlite3.Connection):
+        """ثبت زمان دسترسی رکوردهای خوانده شده (بدون commit - در تراکنش نوشتن بعدی)"""
+        
+        if not self._touched:
+            return
+            
+        for table, where in (('ocr_cache', "key = ?"), ('page_data', "kind = ? AND key = ?")):
+            rows = [
+                (accessed,) + params for (row_table, params), accessed in self._touched.items() if row_table == table
+            ]
+            if rows:
+                connection.executemany(f"UPDATE {table} SET last_access = ? WHERE {where}", rows)
+                
+        self._touched.clear()
+        
+    @staticmethod
+    def _location(key: str, kind: Optional[str]) -> tuple:
+        """جدول و شرط رکورد: (جدول، شرط WHERE، پارامترها)"""
+        
+        if kind is None:
+            return 'ocr_cache', "key = ?", (key,)
+        return 'page_data', "kind = ? AND key = ?", (kind, key)
+        
+    def iter_values(self, kind: str) -> Iterator[Any]:
+        """همه مقادیر ذخیره شده یک نوع داده (مثلا متن نهایی صفحات)"""
+        
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT value FROM page_data WHERE kind = ?", (kind,)
+            ).fetchall()
+            
+        for (value,) in rows:
+            yield json.loads(value)
+            
+    def _evict(self, connection: sqlite3.Connection):
+        """حذف قدیمیترین رکوردها (هر دو جدول) تا رسیدن به سقف حجم"""
+        
+        total = connection.execute(
+            "SELECT (SELECT COALESCE(SUM(size), 0) FROM ocr_cache) + (SELECT COALESCE(SUM(size), 0) FROM page_data)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+            
+        to_free = total - self.max_bytes
+        freed = 0
+        ocr_keys = []
+        data_keys = []
+        
+        rows = connection.execute(
+            "SELECT key, NULL, size, last_access FROM ocr_cache "
+            "UNION ALL SELECT key, kind, size, last_access FROM page_data "
+            "ORDER BY last_access ASC"
+        )
+        for key, kind, size, _ in rows:
+            if kind is None:
+                ocr_keys.append((key,))
+            else:
+                data_keys.append((kind, key))
+            freed += size
+            if freed >= to_free:
+                break
+                
+        connection.executemany("DELETE FROM ocr_cache WHERE key = ?", ocr_keys)
+        connection.executemany("DELETE FROM page_data WHERE kind = ? AND key = ?", data_keys)
+        connection.commit()
+        
+        evicted = len(ocr_keys) + len(data_keys)
+        
+        self.stats['evictions'] += evicted
+        self.logger.info(f"🧹 {evicted} رکورد قدیمی از کش OCR حذف شد")
+        
+    def clear(self):
+        """پاک کردن کامل کش"""
+        
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM ocr_cache")
+            connection.execute("DELETE FROM page_data")
+            connection.commit()
+            self._touched.clear()
+            
+    def close(self):
+        """بستن اتصال"""
+        
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._flush_touches(self._connection)
+                    self._connection.commit()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ خطا در ثبت زمان دسترسی کش OCR: {e}")
+                self._connection.close()
+                self._connection = None
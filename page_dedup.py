@@ -0,0 +1,222 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🪞 حذف صفحات خالی و تکراری با هش ادراکی (dHash) و میزان جوهر
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import copy
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import cv2
+import numpy as np
+
+from page_probe import ink_coverage
+from page_orientation import downscale
+
+# ابعاد هش: صفحات یک فرم فقط در مقادیر پر شده فرق دارند؛ هش 8×8 معمول برای تفکیک آنها کافی نیست
+HASH_SIZE = 16
+
+# اختلاف روشنایی کمتر از این مقدار در هش صفر حساب میشود (نواحی سفید با نویز اسکن)
+HASH_MARGIN = 2
+
+# عرض تصویر کوچک شده برای محاسبه میزان جوهر
+INK_WIDTH = 512
+
+# عرض تصویر کوچک شده برای یافتن صفحات کاندید
+THUMB_WIDTH = 256
+
+# حاشیه کادر مقدار برای برش (نسبت به صفحه) و جستجوی جابجایی اسکن دوباره (نسبت به عرض صفحه)
+ZONE_PAD = 0.005
+ZONE_SHIFT = 0.01
+
+# پیکسل تیرهتر از این مقدار جوهر است
+INK_THRESHOLD = 128
+
+def ink_map(gray: np.ndarray) -> np.ndarray:
+    """نقشه جوهر (0/1) یک برش"""
+    
+    return (gray < INK_THRESHOLD).astype(np.uint8)
+
+def dhash(gray: np.ndarray, hash_size: int = HASH_SIZE) -> int:
+    """هش تفاضلی: مقایسه هر خانه با خانه سمت راست آن روی تصویر کوچک شده"""
+    
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1] + HASH_MARGIN).ravel()
+    
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+class PageDeduplicator:
+    def __init__(self, max_distance: int = 6, blank_ink: float = 0.003, max_pages: int = 128,
+                 max_pixel_difference: int = 40, max_zone_difference: int = 12):
+        """صفحات دیده شده در دسته جاری و نتیجه استخراج آنها
+        
+        هش و تصویر کوچک شده فقط صفحات کاندید را پیدا میکنند: تصویر 256 پیکسلی یک رقم نازک را
+        تفکیک نمیکند. صفحه تکراری باید در کادر مقدار همه فیلدهای استخراج شده با وضوح کامل
+        حداکثر max_zone_difference پیکسل جوهر متفاوت داشته باشد؛ نتیجهای که کادر مقادیرش معلوم
+        نیست (مقدار از متن پیوسته) هرگز برای صفحه دیگری استفاده نمیشود
+        """
+        
+        self.max_distance = max_distance
+        self.blank_ink = blank_ink
+        self.max_pages = max(1, max_pages)
+        self.max_pixel_difference = max_pixel_difference
+        self.max_zone_difference = max_zone_difference
+        
+        # شماره ترتیب -> (هش، تصویر کوچک شده، برش کادر مقادیر، کپی نتیجه صفحه)؛
+        # صفحات متفاوت با هش یکسان هر دو نگه داشته میشوند
+        self.pages = OrderedDict()
+        self._next_id = 0
+        
+        self.blank_pages = 0
+        self.duplicate_pages = 0
+        
+    def signature(self, gray: np.ndarray) -> Dict[str, Any]:
+        """هش ادراکی، تصویر کوچک شده و میزان جوهر یک صفحه"""
+        
+        thumbnail = downscale(gray, THUMB_WIDTH)
+        
+        return {
+            'hash': dhash(thumbnail),
+            'thumbnail': thumbnail,
+            'ink': round(ink_coverage(downscale(gray, INK_WIDTH)), 5)
+        }
+        
+    def is_blank(self, signature: Dict[str, Any]) -> bool:
+        """صفحه خالی (جوهر کمتر از آستانه)"""
+        
+        return signature['ink'] < self.blank_ink
+        
+    def find(self, signature: Dict[str, Any], gray: np.ndarray) -> Optional[Dict[str, Any]]:
+        """نتیجه صفحه مشابه قبلی در دسته (None اگر صفحه جدید باشد)"""
+        
+        page_hash = signature['hash']
+        
+        for page_id, (stored_hash, thumbnail, zones, result) in self.pages.items():
+            if bin(stored_hash ^ page_hash).count('1') > self.max_distance:
+                continue
+            if not self.same_thumbnail(thumbnail, signature['thumbnail']):
+                continue
+            if not self.same_value_zones(zones, gray):
+                continue
+                
+            self.pages.move_to_end(page_id)
+            return result
+            
+        return None
+        
+    def same_thumbnail(self, first: np.ndarray, second: np.ndarray) -> bool:
+        """تصاویر کوچک شده یکسان (جز تفاوت روشنایی کلی و نویز فشردهسازی)
+        
+        تغییر یک رقم در یک کادر چند پیکسل را کاملا تیره یا روشن میکند
+        """
+        
+        if first.shape != second.shape:
+            return False
+            
+        difference = first.astype(np.int16) - second.astype(np.int16)
+        difference -= int(round(float(np.median(difference))))
+        
+        return int(np.abs(difference).max()) <= self.max_pixel_difference
+        
+    def value_zones(self, gray: np.ndarray, result: Dict[str, Any]) -> Optional[List[tuple]]:
+        """برش با وضوح کامل کادر مقدار فیلدهای استخراج شده - [(مختصات پیکسلی، نقشه جوهر)]
+        
+        None اگر مقداری کادر نداشته باشد یا صفحه پیش از استخراج چرخانده شده باشد
+        (کادرها نسبت به صفحه چرخیده هستند)
+        """
+        
+        if result.get('rotation') or result.get('skew'):
+            return None
+            
+        values = [field for field in result.get('extracted', {}).values() if field.get('value')]
+        if not values or any(not field.get('box') for field in values):
+            return None
+            
+        height, width = gray.shape[:2]
+        zones = []
+        
+        for field in values:
+            box = field['box']
+            x0 = max(0, int((box[0] - ZONE_PAD) * width))
+            y0 = max(0, int((box[1] - ZONE_PAD) * height))
+            x1 = min(width, int(np.ceil((box[2] + ZONE_PAD) * width)))
+            y1 = min(height, int(np.ceil((box[3] + ZONE_PAD) * height)))
+            
+            if x1 > x0 and y1 > y0:
+                zones.append(((x0, y0, x1, y1), ink_map(gray[y0:y1, x0:x1])))
+                
+        return zones
+        
+    def same_value_zones(self, zones: List[tuple], gray: np.ndarray) -> bool:
+        """کادر مقادیر صفحه جدید با صفحه ذخیره شده یکسان است (با جابجایی کوچک اسکن دوباره)
+        
+        پیکسل جوهری متفاوت حساب میشود که در همسایگی یک پیکسلی صفحه دیگر جوهری نداشته باشد
+        """
+        
+        height, width = gray.shape[:2]
+        shift = max(1, int(round(width * ZONE_SHIFT)))
+        kernel = np.ones((3, 3), np.uint8)
+        
+        for (x0, y0, x1, y1), stored in zones:
+            # ناحیه جستجو: کادر ذخیره شده با حاشیه جابجایی
+            sx0, sy0 = max(0, x0 - shift), max(0, y0 - shift)
+            sx1, sy1 = min(width, x1 + shift), min(height, y1 + shift)
+            search = ink_map(gray[sy0:sy1, sx0:sx1])
+            
+            if search.shape[0] < stored.shape[0] or search.shape[1] < stored.shape[1]:
+                return False
+                
+            # بهترین جابجایی (کمترین اختلاف جوهر)
+            scores = cv2.matchTemplate(search.astype(np.float32), stored.astype(np.float32), cv2.TM_SQDIFF)
+            _, _, (dx, dy), _ = cv2.minMaxLoc(scores)
+            current = search[dy:dy + stored.shape[0], dx:dx + stored.shape[1]]
+            
+            missing = stored & (1 - cv2.dilate(current, kernel))
+            extra = current & (1 - cv2.dilate(stored, kernel))
+            
+            if int(missing.sum()) + int(extra.sum()) > self.max_zone_difference:
+                return False
+                
+        return True
+        
+    def add(self, signature: Dict[str, Any], result: Dict[str, Any], gray: np.ndarray) -> bool:
+        """ثبت نتیجه صفحه برای استفاده صفحات تکراری بعدی (False اگر کادر مقادیر معلوم نباشد)
+        
+        کپی نتیجه نگه داشته میشود تا ویرایش نتیجه اصلی (ویرایش دستی، استخراج مجدد) به تکراریها نرسد
+        """
+        
+        zones = self.value_zones(gray, result)
+        if zones is None:
+            return False
+            
+        self.pages[self._next_id] = (signature['hash'], signature['thumbnail'], zones, copy.deepcopy(result))
+        self._next_id += 1
+        
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+            
+        return True
+        
+    def reuse(self, original: Dict[str, Any], file_name: str, page_num: int) -> Dict[str, Any]:
+        """کپی نتیجه صفحه اصلی برای صفحه تکراری"""
+        
+        self.duplicate_pages += 1
+        
+        result = copy.deepcopy(original)
+        result.update({
+            'file': file_name,
+            'page': page_num,
+            'deduplicated_from': {'file': original['file'], 'page': original['page']}
+        })
+        
+        return result
+        
+    def reset(self):
+        """شروع دسته جدید"""
+        
+        self.pages.clear()
+        self.blank_pages = 0
+        self.duplicate_pages = 0
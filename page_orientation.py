@@ -0,0 +1,119 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧭 تشخیص جهت و کجی صفحه با پروفایل تصویر کوچک شده و چرخش یکباره در حافظه
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from page_probe import text_orientation
+
+# عرض تصویر کوچک شده برای تخمین کجی
+SKEW_WIDTH = 800
+
+# حداکثر نقاط جوهر برای محاسبه پروفایل (نمونهبرداری یکنواخت)
+MAX_INK_POINTS = 20000
+
+def downscale(gray: np.ndarray, width: int) -> np.ndarray:
+    """کوچک کردن تصویر به عرض داده شده (تصاویر کوچکتر بدون تغییر)"""
+    
+    height, current_width = gray.shape[:2]
+    if current_width <= width:
+        return gray
+        
+    new_height = max(1, int(round(height * width / current_width)))
+    return cv2.resize(gray, (width, new_height), interpolation=cv2.INTER_AREA)
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 5.0) -> float:
+    """زاویه کجی خطوط متن (درجه، مثبت یعنی متن پادساعتگرد چرخیده است)
+    
+    زاویهای که پروفایل افقی نقاط جوهر را تیزتر کند (بیشترین مجموع مربعات) انتخاب میشود
+    """
+    
+    small = downscale(gray, SKEW_WIDTH)
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    
+    ys, xs = np.nonzero(ink)
+    if len(xs) < 100:
+        return 0.0
+        
+    if len(xs) > MAX_INK_POINTS:
+        step = len(xs) // MAX_INK_POINTS + 1
+        ys, xs = ys[::step], xs[::step]
+        
+    xs = xs.astype(np.float32) - small.shape[1] / 2
+    ys = ys.astype(np.float32) - small.shape[0] / 2
+    
+    def best_angle(angles: np.ndarray) -> float:
+        radians = np.deg2rad(angles).astype(np.float32)[:, None]
+        
+        # مختصات عمودی نقاط پس از چرخش برای همه زاویهها به صورت یکجا
+        projected = ys[None, :] * np.cos(radians) + xs[None, :] * np.sin(radians)
+        projected = np.round(projected - projected.min()).astype(np.int64)
+        
+        scores = [float(np.square(np.bincount(row)).sum()) for row in projected]
+        return float(angles[int(np.argmax(scores))])
+        
+    coarse = best_angle(np.arange(-max_angle, max_angle + 0.01, 0.5))
+    fine = best_angle(np.arange(coarse - 0.5, coarse + 0.51, 0.1))
+    
+    return round(fine, 2)
+
+def densest_text_band(gray: np.ndarray, band_ratio: float = 0.12) -> np.ndarray:
+    """نوار افقی با بیشترین جوهر (برای بررسی وارونگی متن با OCR)"""
+    
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    rows = ink.sum(axis=1).astype(np.float64)
+    
+    band = max(8, int(gray.shape[0] * band_ratio))
+    if band >= len(rows):
+        return gray
+        
+    # مجموع لغزان جوهر سطرها
+    window = np.convolve(rows, np.ones(band), mode='valid')
+    top = int(np.argmax(window))
+    
+    return gray[top:top + band]
+
+def vertical_text(gray: np.ndarray) -> bool:
+    """خطوط متن عمودی هستند (صفحه 90 یا 270 درجه چرخیده)"""
+    
+    return text_orientation(downscale(gray, SKEW_WIDTH)) == 90
+
+def rotate_page(gray: np.ndarray, rotation: int, skew: float = 0.0) -> np.ndarray:
+    """چرخش یکباره صفحه: مضرب 90 درجه ساعتگرد + حذف کجی اندازهگیری شده (پسزمینه سفید)"""
+    
+    rotation %= 360
+    
+    if not skew:
+        if rotation == 0:
+            return gray
+        return np.ascontiguousarray(np.rot90(gray, k=-(rotation // 90)))
+        
+    # ماتریس چرخش کل (جهت + کجی) حول مرکز و جابجایی به مرکز تصویر خروجی
+    height, width = gray.shape[:2]
+    out_width, out_height = (height, width) if rotation in (90, 270) else (width, height)
+    
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), -(rotation + skew), 1.0)
+    matrix[0, 2] += out_width / 2 - width / 2
+    matrix[1, 2] += out_height / 2 - height / 2
+    
+    return cv2.warpAffine(
+        gray, matrix, (out_width, out_height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255
+    )
+
+def upright_score(results) -> float:
+    """امتیاز خوانایی خروجی OCR (مجموع اطمینان × طول متن)"""
+    
+    return float(sum(float(item[2]) * len(item[1].strip()) for item in results if len(item) > 2))
+
+def orientation_candidates(gray: np.ndarray) -> Tuple[int, int]:
+    """دو جهت ممکن صفحه: (0، 180) برای متن افقی و (90، 270) برای متن عمودی"""
+    
+    return (90, 270) if vertical_text(gray) else (0, 180)
@@ -0,0 +1,118 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 بررسی اولیه صفحه با وضوح پایین (خالی/محتوا، جهت متن، فرم اظهارنامه یا پیوست)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from typing import Dict, Any
+
+import cv2
+import numpy as np
+import fitz  # PyMuPDF
+
+# کلمات فرم اظهارنامه (صفحه با حداقل دو کلمه جزو اظهارنامه است)
+DECLARATION_KEYWORDS = [
+    'اظهارنامه', 'کوتا', 'کد کالا', 'وزن خالص', 'ارزش گمرکی',
+    'حقوق ورودی', 'شرح کالا', 'گمرک'
+]
+
+def render_probe_gray(page, dpi: int = 72) -> np.ndarray:
+    """رندر صفحه با وضوح پایین به آرایه خاکستری (کپی مستقل از Pixmap)"""
+    
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+    
+    samples = np.frombuffer(pix.samples, dtype=np.uint8)
+    return samples.reshape(pix.height, pix.stride)[:, :pix.width].copy()
+
+def ink_mask(gray: np.ndarray, margin: float = 0.03) -> np.ndarray:
+    """پیکسلهای جوهر (بدون حاشیه صفحه که سایه اسکنر دارد)"""
+    
+    height, width = gray.shape[:2]
+    dy, dx = int(height * margin), int(width * margin)
+    inner = gray[dy:height - dy, dx:width - dx]
+    
+    # آستانه ثابت: Otsu روی صفحه تقریبا سفید نویز را جوهر حساب میکند
+    return inner < 160
+
+def ink_coverage(gray: np.ndarray) -> float:
+    """نسبت پیکسلهای جوهر صفحه"""
+    
+    mask = ink_mask(gray)
+    return float(mask.mean()) if mask.size else 0.0
+
+def count_form_lines(gray: np.ndarray) -> Dict[str, int]:
+    """تعداد خطوط افقی و عمودی بلند (خطوط جدول و کادرهای فرم)"""
+    
+    mask = ink_mask(gray).astype(np.uint8)
+    if not mask.size:
+        return {'horizontal': 0, 'vertical': 0}
+        
+    height, width = mask.shape
+    
+    horizontal = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((1, max(3, width // 6)), np.uint8))
+    vertical = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((max(3, height // 10), 1), np.uint8))
+    
+    def count_runs(profile: np.ndarray) -> int:
+        # خطوط مجاور (ضخامت چند پیکسلی) یک خط حساب میشوند
+        present = (profile > 0).astype(np.int8)
+        return int(np.count_nonzero(np.diff(np.concatenate(([0], present))) == 1))
+        
+    return {
+        'horizontal': count_runs(horizontal.sum(axis=1)),
+        'vertical': count_runs(vertical.sum(axis=0))
+    }
+
+def text_orientation(gray: np.ndarray, min_components: int = 10) -> int:
+    """جهت خطوط متن: 0 برای خطوط افقی، 90 برای صفحه چرخیده (خطوط عمودی)
+    
+    حروف هر کلمه با کمی گسترش به هم میچسبند؛ کلمات متن افقی پهن و کلمات متن چرخیده بلند هستند
+    """
+    
+    mask = cv2.dilate(ink_mask(gray).astype(np.uint8), np.ones((3, 3), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    
+    # حذف پسزمینه و لکههای کوچک
+    stats = stats[1:]
+    stats = stats[stats[:, cv2.CC_STAT_AREA] >= 6]
+    
+    # صفحه بدون کلمه کافی (مثلا فقط جدول خالی) - بدون تغییر
+    if len(stats) < min_components:
+        return 0
+        
+    ratio = stats[:, cv2.CC_STAT_WIDTH].sum() / max(1, stats[:, cv2.CC_STAT_HEIGHT].sum())
+    
+    return 90 if ratio < 0.67 else 0
+    
+def is_declaration_text(text: str, min_keywords: int = 2) -> bool:
+    """وجود کلمات فرم اظهارنامه در متن صفحه"""
+    
+    compact = text.replace(' ', '')
+    found = sum(1 for keyword in DECLARATION_KEYWORDS if keyword.replace(' ', '') in compact)
+    return found >= min_keywords
+
+def describe_probe(probe: Dict[str, Any]) -> str:
+    """دلیل خوانای رد شدن صفحه در بررسی اولیه (برای نتایج و Excel)"""
+    
+    kind = probe.get('kind')
+    
+    if kind == 'blank':
+        return f"صفحه خالی (جوهر {probe.get('ink', 0) * 100:.2f}%)"
+    if kind == 'attachment':
+        return f"پیوست - {probe.get('form_lines', 0)} خط فرم در بررسی اولیه"
+        
+    return str(kind)
+
+def probe_summary(gray: np.ndarray) -> Dict[str, Any]:
+    """ویژگیهای تصویر بررسی اولیه"""
+    
+    lines = count_form_lines(gray)
+    
+    return {
+        'ink': round(ink_coverage(gray), 5),
+        'orientation': text_orientation(gray),
+        'form_lines': lines['horizontal'] + lines['vertical'],
+        'size': [int(gray.shape[1]), int(gray.shape[0])]
+    }
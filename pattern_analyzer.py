@@ -0,0 +1,357 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تحلیل هزینه و خطر ReDoS الگوهای regex پیش از پذیرش
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+import json
+import time
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set
+
+from pattern_scanner import PATTERN_FLAGS, extract_required_literals, sre_parse, sre_constants
+from regex_guard import RegexGuard, RegexTimeout
+from ocr_cache import PAGE_TEXT
+
+# کلاسهای هزینه به ترتیب
+COST_CLASSES = ['low', 'medium', 'high', 'catastrophic']
+
+# کلاسهایی که بدون تایید صریح پذیرفته میشوند
+ACCEPTED_COST_CLASSES = ['low', 'medium']
+
+# کاراکترهای نمونه برای مقایسه شروع شاخهها
+_SAMPLE_ALPHABET = "0123456789 \t\n.:-/()aAzZkKxX" + "آابپتثجچحخدذرزسشصطعغفقکگلمنوهی" + "۰۱۲۹"
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+_UNBOUNDED = sre_constants.MAXREPEAT
+
+_CATEGORY_TESTS = {
+    sre_constants.CATEGORY_DIGIT: lambda ch: bool(re.match(r'\d', ch)),
+    sre_constants.CATEGORY_NOT_DIGIT: lambda ch: not re.match(r'\d', ch),
+    sre_constants.CATEGORY_SPACE: lambda ch: ch.isspace(),
+    sre_constants.CATEGORY_NOT_SPACE: lambda ch: not ch.isspace(),
+    sre_constants.CATEGORY_WORD: lambda ch: bool(re.match(r'\w', ch)),
+    sre_constants.CATEGORY_NOT_WORD: lambda ch: not re.match(r'\w', ch),
+}
+
+def _char_in_set(items: list, ch: str) -> bool:
+    """آیا کاراکتر با مجموعه [...] تطابق دارد"""
+    
+    negate = False
+    matched = False
+    
+    for op, av in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            matched |= ch.lower() == chr(av).lower()
+        elif op == sre_constants.RANGE:
+            matched |= av[0] <= ord(ch) <= av[1] or av[0] <= ord(ch.lower()) <= av[1]
+        elif op == sre_constants.CATEGORY:
+            matched |= _CATEGORY_TESTS.get(av, lambda c: True)(ch)
+        else:
+            matched = True
+            
+    return matched != negate
+
+def _first_chars(items: list) -> Set[str]:
+    """کاراکترهای نمونهای که اولین کاراکتر یک دنباله میتواند باشد (تقریبی)"""
+    
+    chars = set()
+    
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            return chars | {ch for ch in _SAMPLE_ALPHABET if ch.lower() == chr(av).lower()}
+        if op == sre_constants.NOT_LITERAL:
+            return chars | {ch for ch in _SAMPLE_ALPHABET if ch.lower() != chr(av).lower()}
+        if op == sre_constants.ANY:
+            return chars | set(_SAMPLE_ALPHABET)
+        if op == sre_constants.IN:
+            return chars | {ch for ch in _SAMPLE_ALPHABET if _char_in_set(av, ch)}
+        if op == sre_constants.SUBPATTERN:
+            return chars | _first_chars(list(av[-1]))
+        if op == sre_constants.BRANCH:
+            for branch in av[1]:
+                chars |= _first_chars(list(branch))
+            return chars
+        if op in _REPEATS:
+            chars |= _first_chars(list(av[2]))
+            if av[0] >= 1:
+                return chars
+            continue
+        if op == sre_constants.AT or op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue
+            
+        # سایر موارد - هر کاراکتری ممکن است
+        return set(_SAMPLE_ALPHABET)
+        
+    return chars
+
+def _contains_unbounded_repeat(items: list) -> bool:
+    """آیا در زیردرخت تکرار نامحدود وجود دارد"""
+    
+    for op, av in items:
+        if op in _REPEATS:
+            if av[1] == _UNBOUNDED or _contains_unbounded_repeat(list(av[2])):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _contains_unbounded_repeat(list(av[-1])):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_contains_unbounded_repeat(list(branch)) for branch in av[1]):
+                return True
+                
+    return False
+
+def find_static_issues(pattern: str, flags: int = PATTERN_FLAGS) -> List[Dict[str, str]]:
+    """بررسی ایستای ساختار الگو برای الگوهای پرخطر
+    
+    - کمیتسنج تودرتو: تکرار نامحدود درون تکرار دیگر - مثل (\\s*\\d+)*
+    - شاخههای همپوشان درون تکرار: (a|ab)* که شروع شاخهها یکسان است
+    - .* بدون لنگر با DOTALL: تا انتهای متن پیش میرود و روی هر موقعیت عقبگرد میکند
+    """
+    
+    parsed = sre_parse.parse(pattern, flags)
+    items = list(parsed)
+    issues = []
+    seen = set()
+    
+    def add(issue_type: str, severity: str, message: str):
+        if issue_type not in seen:
+            seen.add(issue_type)
+            issues.append({'type': issue_type, 'severity': severity, 'message': message})
+            
+    dotall = bool(parsed.state.flags & re.DOTALL)
+    
+    def walk(items: list, inside_repeat: bool):
+        for op, av in items:
+            if op in _REPEATS:
+                min_count, max_count, inner = av[0], av[1], list(av[2])
+                repeating = max_count == _UNBOUNDED or max_count > 1
+                
+                if repeating and _contains_unbounded_repeat(inner):
+                    add('nested_quantifier', 'high', "کمیتسنج تودرتو (عقبگرد نمایی)")
+                    
+                if max_count == _UNBOUNDED and any(op_inner == sre_constants.ANY for op_inner, _ in inner) and dotall:
+                    add('unanchored_dotstar', 'medium', ".* بدون لنگر با DOTALL (عقبگرد تا انتهای متن)")
+                    
+                walk(inner, inside_repeat or repeating)
+                
+            elif op == sre_constants.SUBPATTERN:
+                walk(list(av[-1]), inside_repeat)
+                
+            elif op == sre_constants.BRANCH:
+                branches = [list(branch) for branch in av[1]]
+                
+                if inside_repeat:
+                    first_sets = [_first_chars(branch) for branch in branches]
+                    for i in range(len(first_sets)):
+                        for j in range(i + 1, len(first_sets)):
+                            if first_sets[i] & first_sets[j]:
+                                add('overlapping_alternation', 'high', "شاخههای همپوشان درون تکرار")
+                                
+                for branch in branches:
+                    walk(branch, inside_repeat)
+                    
+            elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+                walk(list(av[1]), inside_repeat)
+                
+    walk(items, False)
+    
+    return issues
+
+class PatternAnalyzer:
+    def __init__(self, cache_path: str = "cache/ocr_cache.db", sample_size: int = 20,
+                 time_budget_ms: float = 250, flags: int = PATTERN_FLAGS):
+        """تحلیلگر الگو - بررسی ایستا و بنچمارک روی متن بدترین حالت و متنهای کش OCR"""
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.cache_path = Path(cache_path)
+        self.sample_size = sample_size
+        self.flags = flags
+        
+        # سقف زمانی هر اجرای بنچمارک
+        self.guard = RegexGuard(time_budget_ms, max_strikes=1, log_strikes=False)
+        
+        # طول متنهای بدترین حالت (کوتاه، متوسط، بلند)
+        self.worst_case_lengths = [256, 1024, 4096]
+        
+        # آستانههای هزینه روی متن نمونه (میلیثانیه به ازای هر کیلوبایت)
+        self.medium_ms_per_kb = 0.5
+        self.high_ms_per_kb = 2.0
+        
+        self._sample_texts = None
+        
+    def load_sample_texts(self) -> List[str]:
+        """نمونه متن صفحات از کش OCR (در صورت وجود)"""
+        
+        if self._sample_texts is not None:
+            return self._sample_texts
+            
+        texts = []
+        
+        if self.cache_path.exists():
+            try:
+                connection = sqlite3.connect(str(self.cache_path), timeout=5)
+                try:
+                    rows = connection.execute(
+                        "SELECT value FROM page_data WHERE kind = ? ORDER BY size DESC LIMIT ?",
+                        (PAGE_TEXT, self.sample_size)
+                    ).fetchall()
+                finally:
+                    connection.close()
+                    
+                for (value,) in rows:
+                    text = json.loads(value)
+                    if isinstance(text, str) and text:
+                        texts.append(text)
+                        
+            except Exception as e:
+                self.logger.warning(f"⚠️ خطا در خواندن متنهای نمونه از کش: {e}")
+                
+        self._sample_texts = texts
+        return texts
+        
+    def build_worst_case_texts(self, pattern: str, length: int) -> List[str]:
+        """متنهای بدترین حالت: رشتههای ثابت الگو + تکرار کاراکترهایی که تکرارها میپذیرند و شکست در انتها
+        
+        فاصلههای پشت سر هم ساخته نمیشوند چون clean_text پیش از استخراج آنها را یکی میکند
+        """
+        
+        prefix = " ".join(extract_required_literals(pattern, self.flags))
+        
+        fillers = ["1 ", "1", "آ", "آ ", "a", "a1", "1.", ":"]
+        
+        return [f"{prefix} {filler * (length // len(filler))}!" for filler in fillers]
+        
+    def time_pattern(self, compiled: re.Pattern, pattern: str, texts: List[str]) -> Optional[float]:
+        """زمان اجرای الگو روی متنها (ثانیه) - None در صورت عبور از سقف زمانی"""
+        
+        total = 0.0
+        
+        for text in texts:
+            start_time = time.perf_counter()
+            try:
+                self.guard.finditer(pattern, compiled, text)
+            except RegexTimeout:
+                return None
+            finally:
+                self.guard.release(pattern)
+            total += time.perf_counter() - start_time
+            
+        return total
+        
+    def analyze(self, pattern: str) -> Dict[str, Any]:
+        """تحلیل کامل الگو و تعیین کلاس هزینه"""
+        
+        report = {
+            'pattern': pattern,
+            'valid': True,
+            'error': None,
+            'issues': [],
+            'benchmark': {},
+            'cost_class': 'low',
+            'accepted': True
+        }
+        
+        try:
+            compiled = re.compile(pattern, self.flags)
+        except re.error as e:
+            report.update({'valid': False, 'error': str(e), 'cost_class': None, 'accepted': False})
+            return report
+            
+        issues = find_static_issues(pattern, self.flags)
+        report['issues'] = issues
+        
+        cost_index = 0
+        if any(issue['severity'] == 'medium' for issue in issues):
+            cost_index = 1
+        if any(issue['severity'] == 'high' for issue in issues):
+            cost_index = 2
+            
+        # بنچمارک بدترین حالت - بدون امکان قطع، الگوهای پرخطر اجرا نمیشوند
+        if self.guard.can_interrupt() or cost_index < 2:
+            timings = {}
+            
+            for length in self.worst_case_lengths:
+                elapsed = self.time_pattern(compiled, pattern, self.build_worst_case_texts(pattern, length))
+                timings[length] = elapsed
+                if elapsed is None:
+                    break
+                    
+            report['benchmark']['worst_case_ms'] = {
+                length: (round(elapsed * 1000, 3) if elapsed is not None else None)
+                for length, elapsed in timings.items()
+            }
+            
+            short, middle, long = self.worst_case_lengths
+            
+            if timings.get(short, 0) is None:
+                # عبور از سقف روی متن کوتاه - رشد نمایی
+                cost_index = 3
+            elif timings.get(middle, 0) is None:
+                cost_index = max(cost_index, 2)
+            elif timings.get(long, 0) is None:
+                cost_index = max(cost_index, 1)
+            elif timings.get(middle) and timings.get(long):
+                # رشد فوقخطی: چهار برابر شدن طول بیش از ده برابر زمان
+                growth = timings[long] / max(timings[middle], 1e-6)
+                report['benchmark']['growth_4x'] = round(growth, 2)
+                if growth > 10 and timings[long] > 0.01:
+                    cost_index = max(cost_index, 1)
+        else:
+            report['benchmark']['worst_case_ms'] = 'skipped'
+            
+        # بنچمارک روی متن صفحات واقعی (بدون امکان قطع، الگوهای پرخطر اجرا نمیشوند)
+        samples = self.load_sample_texts()
+        if samples and cost_index < (3 if self.guard.can_interrupt() else 2):
+            elapsed = self.time_pattern(compiled, pattern, samples)
+            
+            if elapsed is None:
+                cost_index = 3
+            else:
+                size_kb = max(sum(len(text) for text in samples) / 1024, 1e-3)
+                ms_per_kb = elapsed * 1000 / size_kb
+                report['benchmark']['sample_ms_per_kb'] = round(ms_per_kb, 4)
+                report['benchmark']['samples'] = len(samples)
+                
+                if ms_per_kb > self.high_ms_per_kb:
+                    cost_index = max(cost_index, 2)
+                elif ms_per_kb > self.medium_ms_per_kb:
+                    cost_index = max(cost_index, 1)
+                    
+        report['cost_class'] = COST_CLASSES[cost_index]
+        report['accepted'] = report['cost_class'] in ACCEPTED_COST_CLASSES
+        
+        return report
+        
+    def format_report(self, report: Dict[str, Any]) -> str:
+        """متن خوانای گزارش تحلیل"""
+        
+        if not report['valid']:
+            return f"الگو نامعتبر است: {report['error']}"
+            
+        lines = [f"کلاس هزینه: {report['cost_class']}"]
+        
+        for issue in report['issues']:
+            lines.append(f"• {issue['message']}")
+            
+        worst_case = report['benchmark'].get('worst_case_ms')
+        if isinstance(worst_case, dict) and worst_case:
+            longest = max(worst_case)
+            value = worst_case[longest]
+            lines.append(f"بدترین حالت ({longest} کاراکتر): " + (f"{value}ms" if value is not None else "عبور از سقف زمانی"))
+            
+        if 'sample_ms_per_kb' in report['benchmark']:
+            lines.append(f"متنهای نمونه: {report['benchmark']['sample_ms_per_kb']}ms/KB")
+            
+        return "\n".join(lines)
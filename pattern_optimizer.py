@@ -0,0 +1,135 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⚡ بهینهسازی ترتیب و حذف الگوها بر اساس هزینه و سهم واقعی آنها
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import logging
+from typing import Dict, List, Any
+
+class PatternOptimizer:
+    def __init__(self, min_runs: int = 50, keep_min: int = 1, protect_manual: bool = True):
+        """پیشنهاد ترتیب جدید و الگوهای قابل حذف هر فیلد
+        
+        معیارها از آمار اجرا (pattern_stats) گرفته میشوند:
+        زمان CPU هر الگو، دفعات انتخاب شدن و صفحاتی که فقط همان الگو مقدار فیلد را پیدا کرد
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        
+        # حداقل اجرای الگو پیش از قضاوت درباره آن
+        self.min_runs = min_runs
+        
+        # حداقل تعداد الگوی باقیمانده هر فیلد
+        self.keep_min = keep_min
+        
+        # الگوهای دستی کاربر حذف نمیشوند
+        self.protect_manual = protect_manual
+        
+    def optimize(self, builtin_stats: Dict[str, Any], learned_patterns: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """تحلیل همه فیلدها - الگوهای پایه فقط پیشنهاد، الگوهای یاد گرفته شده قابل اعمال"""
+        
+        pages = max(1, builtin_stats.get('pages', 0))
+        fields = []
+        
+        for field_name, patterns in builtin_stats.get('fields', {}).items():
+            rows = [self._pattern_row(pattern, counters, pages) for pattern, counters in patterns.items()]
+            fields.append(self.optimize_field('regex', field_name, rows))
+            
+        for field_name, patterns in learned_patterns.items():
+            rows = []
+            for pattern_data in patterns:
+                row = self._pattern_row(pattern_data['pattern'], pattern_data.get('runtime_stats', {}), pages)
+                row['protected'] = self.protect_manual and pattern_data.get('pattern_type') == 'manual'
+                rows.append(row)
+            fields.append(self.optimize_field('learned', field_name, rows))
+            
+        fields.sort(key=lambda field: -field['saved_ms_per_page'])
+        
+        return {
+            'pages': builtin_stats.get('pages', 0),
+            'min_runs': self.min_runs,
+            'fields': fields,
+            'retire_count': sum(len(field['retire']) for field in fields),
+            'saved_ms_per_page': round(sum(field['saved_ms_per_page'] for field in fields), 3)
+        }
+        
+    def _pattern_row(self, pattern: str, counters: Dict[str, Any], pages: int) -> Dict[str, Any]:
+        """خلاصه آمار یک الگو"""
+        
+        runs = counters.get('runs', 0)
+        time_ms = counters.get('time_ms', 0.0)
+        
+        return {
+            'pattern': pattern,
+            'runs': runs,
+            'time_ms': round(time_ms, 3),
+            'ms_per_page': round(time_ms / pages, 4),
+            'ms_per_run': round(time_ms / runs, 4) if runs else 0.0,
+            'chosen': counters.get('chosen', 0),
+            'unique': counters.get('unique', 0),
+            'protected': False
+        }
+        
+    def optimize_field(self, source: str, field_name: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ترتیب پیشنهادی و الگوهای قابل حذف یک فیلد"""
+        
+        # الگوهایی که هرگز برنده نشدهاند - پرهزینهترینها اول حذف میشوند
+        losers = sorted(
+            (row for row in rows
+             if row['runs'] >= self.min_runs and row['chosen'] == 0 and row['unique'] == 0
+             and not row['protected']),
+            key=lambda row: -row['time_ms']
+        )
+        
+        retire = []
+        for row in losers:
+            if len(rows) - len(retire) <= self.keep_min:
+                break
+            retire.append(row['pattern'])
+            
+        retired = set(retire)
+        
+        for row in rows:
+            if row['pattern'] in retired:
+                row['action'] = 'retire'
+            elif row['runs'] >= self.min_runs and row['unique'] == 0:
+                # برنده میشود ولی همیشه الگوی دیگری هم همان مقدار را پیدا میکند
+                row['action'] = 'redundant'
+            else:
+                row['action'] = 'keep'
+                
+        # ترتیب پیشنهادی: سهم یکتا، دفعات انتخاب، سپس هزینه کمتر
+        kept = [row for row in rows if row['pattern'] not in retired]
+        kept.sort(key=lambda row: (-row['unique'], -row['chosen'], row['ms_per_run']))
+        
+        return {
+            'source': source,
+            'field': field_name,
+            'patterns': rows,
+            'proposed_order': [row['pattern'] for row in kept],
+            'retire': retire,
+            'saved_ms_per_page': round(sum(row['ms_per_page'] for row in rows if row['pattern'] in retired), 4)
+        }
+        
+    def format_report(self, report: Dict[str, Any], limit: int = 10) -> str:
+        """متن خلاصه گزارش برای نمایش به کاربر"""
+        
+        lines = [
+            f"📄 صفحات بررسی شده: {report['pages']}",
+            f"🗑️ الگوهای قابل حذف: {report['retire_count']}",
+            f"⏱️ صرفهجویی مورد انتظار: {report['saved_ms_per_page']:.3f} ms در هر صفحه"
+        ]
+        
+        for field in report['fields'][:limit]:
+            if not field['retire']:
+                continue
+                
+            source = 'پایه' if field['source'] == 'regex' else 'یاد گرفته شده'
+            lines.append(f"\n🔹 {field['field']} ({source}) - {field['saved_ms_per_page']:.3f} ms/صفحه")
+            for pattern in field['retire']:
+                lines.append(f"   ✖ {pattern}")
+                
+        return "\n".join(lines)
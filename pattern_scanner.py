@@ -0,0 +1,309 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 اسکنر کامپایل شده الگوهای فیلدها (یک فراخوانی برای همه فیلدهای صفحه)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+import time
+import logging
+from typing import Dict, List, Any, Callable, Iterable, Optional, Set, Tuple
+
+from regex_guard import RegexGuard, RegexTimeout
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# پرچمهای مشترک همه الگوهای استخراج
+PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL
+
+# کوتاهترین رشته ثابتی که برای پیشفیلتر ارزش دارد
+MIN_LITERAL_LENGTH = 2
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+def extract_required_literals(pattern: str, flags: int = PATTERN_FLAGS) -> List[str]:
+    """رشتههای ثابتی که هر match الگو حتما شامل آنهاست
+    
+    فقط بخشهای اجباری الگو بررسی میشوند (شاخههای | و تکرارهای اختیاری نادیده گرفته میشوند)؛
+    لیست خالی یعنی الگو باید همیشه اجرا شود
+    """
+    
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+        
+    runs = []
+    _collect_literal_runs(list(parsed), runs, [])
+    
+    literals = []
+    for run in runs:
+        if len(run) >= MIN_LITERAL_LENGTH and run not in literals:
+            literals.append(run)
+            
+    return literals
+
+def context_literals(pattern: str, flags: int = PATTERN_FLAGS) -> List[str]:
+    """رشتههای ثابت لازم الگو بیرون از گروه مقدار (گروه 1)
+    
+    الگویی که جز مقدار هیچ رشته ثابتی ندارد (مثل [\\s:](100)[\\s\\n] حاصل اصلاح کاربر)
+    در هر جای صفحه که آن مقدار باشد match میشود
+    """
+    
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+        
+    runs = []
+    _collect_literal_runs(_without_value_group(list(parsed)), runs, [])
+    
+    return [run for run in runs if len(run) >= MIN_LITERAL_LENGTH]
+
+def _without_value_group(items: list) -> list:
+    """درخت الگو با جایگزینی گروه 1 با یک کاراکتر دلخواه (پایان رشته ثابت)"""
+    
+    result = []
+    
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN:
+            if av[0] == 1:
+                result.append((sre_constants.ANY, None))
+            else:
+                result.append((op, av[:-1] + (_without_value_group(list(av[-1])),)))
+        elif op in _REPEATS:
+            result.append((op, av[:2] + (_without_value_group(list(av[2])),)))
+        else:
+            result.append((op, av))
+            
+    return result
+
+def _collect_literal_runs(items: list, runs: List[str], current: List[str]):
+    """پیمایش درخت الگو و جمعآوری رشتههای ثابت پیوسته"""
+    
+    def close_run():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+            
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            current.append(chr(av))
+            
+        elif op == sre_constants.SUBPATTERN:
+            # گروه اجباری - محتوای آن در ادامه همین رشته است
+            _collect_literal_runs(list(av[-1]), runs, current)
+            
+        elif op in _REPEATS:
+            close_run()
+            
+            # تکرار با حداقل یک بار - محتوا اجباری است ولی پیوسته نیست
+            if av[0] >= 1:
+                inner = []
+                _collect_literal_runs(list(av[2]), runs, inner)
+                if inner:
+                    runs.append(''.join(inner))
+                    
+        else:
+            # شاخه، مجموعه کاراکتر، نگاه به جلو و ... - پایان رشته ثابت
+            close_run()
+            
+    close_run()
+
+def _build_fold_tables() -> Tuple[Dict[int, str], Dict[int, str]]:
+    """جدول تبدیل حروف مطابق همارزی IGNORECASE ماژول re (یک کاراکتر به یک کاراکتر)"""
+    
+    # تنها کاراکتری که lower آن دو کاراکتر میشود
+    pre_table = {0x130: 'i'}
+    
+    classes = []
+    try:
+        from re._casefix import _EXTRA_CASES  # Python >= 3.11
+        classes = [(key,) + tuple(values) for key, values in _EXTRA_CASES.items()]
+    except ImportError:
+        try:
+            from sre_compile import _equivalences
+            classes = list(_equivalences)
+        except ImportError:
+            pass
+            
+    equivalence_table = {}
+    for members in classes:
+        lowered = [ord(chr(member).lower()) for member in members]
+        canonical = chr(min(lowered))
+        for member in lowered:
+            if chr(member) != canonical:
+                equivalence_table[member] = canonical
+                
+    return pre_table, equivalence_table
+
+_FOLD_PRE, _FOLD_EQUIVALENCES = _build_fold_tables()
+
+def fold_case(text: str) -> str:
+    """تبدیل متن به شکل یکسان برای مقایسه بدون حساسیت به حروف (همانند re.IGNORECASE)"""
+    
+    return text.translate(_FOLD_PRE).lower().translate(_FOLD_EQUIVALENCES)
+
+class LiteralPrefilter:
+    def __init__(self, literals: Iterable[str]):
+        """یافتن رشتههای ثابت موجود در متن صفحه (بدون حساسیت به حروف بزرگ و کوچک)"""
+        
+        # طولانیترها اول تا رشتههای داخل آنها بدون جستجو علامت بخورند
+        self.literals = sorted({fold_case(literal) for literal in literals},
+                               key=lambda literal: (-len(literal), literal))
+        
+        # بستار شمول: وجود هر رشته یعنی وجود رشتههای کوتاهتر داخل آن
+        self.closure = {
+            literal: {other for other in self.literals if other in literal}
+            for literal in self.literals
+        }
+        
+    def find(self, text: str) -> Set[str]:
+        """رشتههای ثابت موجود در متن (به شکل fold شده)"""
+        
+        if not self.literals:
+            return set()
+            
+        # جستجوی زیررشته روی متن fold شده (fastsearch پایتون)
+        folded = fold_case(text)
+        found = set()
+        
+        for literal in self.literals:
+            if literal not in found and literal in folded:
+                found |= self.closure[literal]
+                
+        return found
+        
+class FieldScanner:
+    def __init__(self, patterns_by_field: Dict[str, Dict[str, Any]], flags: int = PATTERN_FLAGS,
+                 guard: Optional[RegexGuard] = None):
+        """کامپایل یک باره الگوهای همه فیلدها
+        
+        هر الگوی یکتا یک بار کامپایل و در هر اسکن یک بار اجرا میشود؛
+        نتایج آن بین همه فیلدهایی که از آن استفاده میکنند تقسیم میشود
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        self.flags = flags
+        
+        # نگهبان زمان اجرا (اختیاری)
+        self.guard = guard
+        
+        # الگوهای یکتا: رشته الگو -> (شیء کامپایل شده یا None، خطای کامپایل)
+        self.compiled = {}
+        
+        # الگوهای هر فیلد به ترتیب اولویت: (شماره الگو، رشته الگو)
+        self.field_patterns = {}
+        
+        # رشتههای ثابت لازم هر الگو (برای پیشفیلتر)
+        self.required_literals = {}
+        
+        for field_name, field_config in patterns_by_field.items():
+            entries = []
+            
+            for pattern_idx, pattern in enumerate(field_config.get('patterns', [])):
+                if pattern not in self.compiled:
+                    self.compiled[pattern] = self._compile(pattern)
+                    
+                    # بررسی ایستای خطر عقبگرد برای نخهایی که اجرای الگو در آنها قابل قطع نیست
+                    if self.guard is not None and self.compiled[pattern][0] is not None:
+                        self.guard.screen(pattern, flags)
+                    self.required_literals[pattern] = [
+                        fold_case(literal) for literal in extract_required_literals(pattern, flags)
+                    ]
+                entries.append((pattern_idx, pattern))
+                
+            self.field_patterns[field_name] = entries
+            
+        # پیشفیلتر مشترک همه الگوها
+        self.prefilter = LiteralPrefilter(
+            literal for literals in self.required_literals.values() for literal in literals
+        )
+        
+        # آمار اجرا و حذف الگوها توسط پیشفیلتر
+        self.stats = {'runs': 0, 'skipped': 0}
+        
+    def _compile(self, pattern: str) -> Tuple[Optional[re.Pattern], Optional[Exception]]:
+        """کامپایل الگو - خطا نگهداری میشود تا هنگام اسکن گزارش شود"""
+        
+        try:
+            return re.compile(pattern, self.flags), None
+        except Exception as e:
+            return None, e
+            
+    def scan(self, text: str, field_names: Iterable[str],
+             timer: Optional[Callable[[str, str, float], None]] = None) -> Dict[str, List[Tuple[int, str, Any]]]:
+        """اسکن متن برای همه فیلدهای خواسته شده
+        
+        خروجی برای هر فیلد لیست (شماره الگو، رشته الگو، match یا خطا) است،
+        به ترتیب الگوها و سپس موقعیت match (همانند حلقه finditer قبلی)؛
+        timer (اختیاری) با (فیلد، الگو، زمان اجرا) برای هر اجرای الگو فراخوانی میشود
+        """
+        
+        # نتایج هر الگوی یکتا در این اسکن (فقط یک بار اجرا میشود)
+        pattern_results = {}
+        hits = {}
+        
+        # یک پیمایش متن برای همه رشتههای ثابت
+        found_literals = self.prefilter.find(text)
+        
+        for field_name in field_names:
+            field_hits = []
+            
+            for pattern_idx, pattern in self.field_patterns.get(field_name, []):
+                if pattern not in pattern_results:
+                    # الگویی که رشته ثابت لازمش در متن نیست match نمیکند
+                    if all(literal in found_literals for literal in self.required_literals[pattern]):
+                        if timer is not None:
+                            start_time = time.perf_counter()
+                            pattern_results[pattern] = self._run_pattern(pattern, text)
+                            timer(field_name, pattern, time.perf_counter() - start_time)
+                        else:
+                            pattern_results[pattern] = self._run_pattern(pattern, text)
+                        self.stats['runs'] += 1
+                    else:
+                        pattern_results[pattern] = []
+                        self.stats['skipped'] += 1
+                        
+                matches = pattern_results[pattern]
+                
+                if isinstance(matches, Exception):
+                    field_hits.append((pattern_idx, pattern, matches))
+                    continue
+                    
+                for match in matches:
+                    field_hits.append((pattern_idx, pattern, match))
+                    
+            hits[field_name] = field_hits
+            
+        return hits
+        
+    def _run_pattern(self, pattern: str, text: str):
+        """اجرای یک الگو روی کل متن - لیست matchها یا خطا"""
+        
+        compiled, error = self.compiled[pattern]
+        if error is not None:
+            return error
+            
+        try:
+            if self.guard is not None:
+                return self.guard.finditer(pattern, compiled, text)
+            return list(compiled.finditer(text))
+        except RegexTimeout:
+            # الگوی قطع شده در این صفحه نتیجهای ندارد (نگهبان آن را ثبت کرده است)
+            return []
+        except Exception as e:
+            return e
+            
+    def has_field(self, field_name: str) -> bool:
+        """آیا فیلد در اسکنر تعریف شده است"""
+        
+        return field_name in self.field_patterns
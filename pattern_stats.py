@@ -0,0 +1,115 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 آمار عملکرد الگوها در حین استخراج (شمارندههای محلی هر پردازشگر)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+from typing import Dict, Any, Optional, Union
+
+# شمارندههای هر الگو
+# rejected: صفحاتی که الگو match داشت ولی هیچ مقدار معتبری نداد
+# unique: صفحاتی که فقط همین الگو برای فیلد مقدار معتبر پیدا کرد (سهم واقعی الگو)
+STAT_FIELDS = ('runs', 'hits', 'valid', 'invalid', 'chosen', 'rejected', 'unique', 'time_ms')
+
+def empty_counters() -> Dict[str, Union[int, float]]:
+    """شمارندههای خالی یک الگو"""
+    
+    counters = dict.fromkeys(STAT_FIELDS, 0)
+    counters['time_ms'] = 0.0
+    return counters
+
+def add_counters(target: Dict[str, Any], counters: Dict[str, Any]):
+    """جمع شمارندههای یک الگو در شمارندههای دیگر"""
+    
+    for name in STAT_FIELDS:
+        target[name] = target.get(name, 0) + counters.get(name, 0)
+        
+    target['time_ms'] = round(target['time_ms'], 3)
+
+class PatternStats:
+    def __init__(self):
+        """شمارندههای عملکرد الگوها در یک پردازشگر
+        
+        هر موتور استخراج نمونه خودش را دارد و بدون قفل بهروزرسانی میکند؛
+        نتایج با drain برداشته و در پردازه اصلی با merge ادغام میشوند
+        """
+        
+        # (منبع الگو، نام فیلد، رشته الگو) -> شمارندهها
+        # منبع 'regex' برای الگوهای پایه و 'learned' برای الگوهای یاد گرفته شده
+        self.counters = {}
+        self.pages = 0
+        
+    def _entry(self, source: str, field_name: str, pattern: str) -> Dict[str, Any]:
+        """شمارندههای یک الگو (ساخت در اولین استفاده)"""
+        
+        key = (source, field_name, pattern)
+        entry = self.counters.get(key)
+        if entry is None:
+            entry = self.counters[key] = empty_counters()
+        return entry
+        
+    def record_run(self, source: str, field_name: str, pattern: str, elapsed: float):
+        """ثبت یک اجرای الگو و زمان آن (ثانیه)"""
+        
+        entry = self._entry(source, field_name, pattern)
+        entry['runs'] += 1
+        entry['time_ms'] += elapsed * 1000
+        
+    def record_hits(self, source: str, field_name: str, pattern: str, hits: int, valid: int,
+                    unique: bool = False):
+        """ثبت matchهای الگو در یک صفحه و تعداد مقادیر معتبر آنها
+        
+        صفحهای که الگو match داشت ولی هیچ مقدار معتبری نداد رد شده حساب میشود
+        """
+        
+        entry = self._entry(source, field_name, pattern)
+        entry['hits'] += hits
+        entry['valid'] += valid
+        entry['invalid'] += hits - valid
+        
+        if hits and not valid:
+            entry['rejected'] += 1
+        if unique:
+            entry['unique'] += 1
+        
+    def record_chosen(self, source: str, field_name: str, pattern: str):
+        """ثبت انتخاب شدن نامزد الگو به عنوان مقدار نهایی فیلد"""
+        
+        self._entry(source, field_name, pattern)['chosen'] += 1
+        
+    def record_page(self):
+        """ثبت پردازش یک صفحه (برای زمانبندی ذخیره دستهای)"""
+        
+        self.pages += 1
+        
+    def merge(self, other: Union['PatternStats', Dict[str, Any], None]):
+        """ادغام آمار یک پردازشگر دیگر (نمونه یا خروجی drain)"""
+        
+        if not other:
+            return
+            
+        if isinstance(other, PatternStats):
+            other = {'pages': other.pages, 'counters': other.counters}
+            
+        self.pages += other.get('pages', 0)
+        
+        for key, counters in other.get('counters', {}).items():
+            add_counters(self._entry(*key), counters)
+            
+    def drain(self) -> Optional[Dict[str, Any]]:
+        """برداشتن آمار جمع شده و صفر کردن شمارندهها (None اگر خالی باشد)"""
+        
+        if not self.counters and not self.pages:
+            return None
+            
+        snapshot = {'pages': self.pages, 'counters': self.counters}
+        
+        self.counters = {}
+        self.pages = 0
+        
+        return snapshot
+        
+    def __bool__(self) -> bool:
+        return bool(self.counters or self.pages)
@@ -0,0 +1,190 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ اجرای الگوهای regex با سقف زمانی و قرنطینه الگوهای کند
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+import time
+import signal
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+class RegexTimeout(Exception):
+    """اجرای الگو از سقف زمانی عبور کرد"""
+
+class RegexGuard:
+    def __init__(self, time_budget_ms: float = 250, max_strikes: int = 3, log_strikes: bool = True):
+        """نگهبان اجرای regex - سقف زمانی هر الگو روی هر صفحه
+        
+        در نخ اصلی (یونیکس) اجرای الگو با SIGALRM قطع میشود؛
+        در سایر نخها (رابط گرافیکی، استخراج مجدد، آزمون الگوها) قطع ممکن نیست: الگوهایی که بررسی ایستا
+        هنگام بارگذاری پرخطر تشخیص داده (عقبگرد نمایی) اصلا اجرا نمیشوند و بقیه پس از اجرا جریمه میشوند.
+        محدود نشده: الگوهای با هزینه چندجملهای (مثل .* بدون لنگر) و الگوهایی که بررسی ایستا تشخیص نمیدهد
+        در این نخها تا پایان اجرا میشوند
+        """
+        
+        self.logger = logging.getLogger(__name__)
+        
+        self.time_budget = max(0.0, float(time_budget_ms)) / 1000.0
+        self.max_strikes = max(1, int(max_strikes))
+        self.log_strikes = log_strikes
+        
+        # تعداد تخلف هر الگو و الگوهای قرنطینه شده
+        self.strikes = {}
+        self.quarantined = {}
+        
+        # الگو -> مشکلات پرخطر بررسی ایستا (لیست خالی برای الگوی امن)
+        self.unsafe = {}
+        
+        self._lock = threading.Lock()
+        
+        self.stats = {'runs': 0, 'timeouts': 0, 'slow': 0, 'skipped': 0}
+        
+    def can_interrupt(self) -> bool:
+        """امکان قطع اجرای regex با سیگنال (فقط نخ اصلی روی سیستمهای دارای setitimer)"""
+        
+        return (
+            self.time_budget > 0
+            and hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread()
+        )
+        
+    def screen(self, pattern: str, flags: int) -> bool:
+        """بررسی ایستای الگو هنگام بارگذاری - False برای الگوی با خطر عقبگرد نمایی"""
+        
+        if pattern not in self.unsafe:
+            # وابستگی چرخشی: pattern_analyzer خود از این ماژول استفاده میکند
+            from pattern_analyzer import find_static_issues
+            
+            try:
+                issues = find_static_issues(pattern, flags)
+            except Exception:
+                issues = []
+                
+            self.unsafe[pattern] = [issue['message'] for issue in issues if issue['severity'] == 'high']
+            
+        return not self.unsafe[pattern]
+        
+    def is_quarantined(self, pattern: str) -> bool:
+        """آیا الگو قرنطینه شده است"""
+        
+        return pattern in self.quarantined
+        
+    def finditer(self, pattern: str, compiled: re.Pattern, text: str) -> List[re.Match]:
+        """اجرای finditer با سقف زمانی - لیست matchها یا RegexTimeout"""
+        
+        if pattern in self.quarantined:
+            self.stats['skipped'] += 1
+            return []
+            
+        interruptible = self.can_interrupt()
+        
+        # الگوی پرخطر بدون امکان قطع اجرا نمیشود
+        if not interruptible and self.time_budget and self.unsafe.get(pattern):
+            self.quarantine_unsafe(pattern)
+            self.stats['skipped'] += 1
+            return []
+            
+        self.stats['runs'] += 1
+        start_time = time.perf_counter()
+        
+        if interruptible:
+            try:
+                matches = self._finditer_with_alarm(compiled, text)
+            except RegexTimeout:
+                self.stats['timeouts'] += 1
+                self.record_strike(pattern, time.perf_counter() - start_time, len(text), aborted=True)
+                raise
+        else:
+            matches = list(compiled.finditer(text))
+            
+        elapsed = time.perf_counter() - start_time
+        
+        # اجرای بدون قطع (نخ غیراصلی) - جریمه پس از اتمام
+        if self.time_budget and elapsed > self.time_budget:
+            self.stats['slow'] += 1
+            self.record_strike(pattern, elapsed, len(text), aborted=False)
+            
+        return matches
+        
+    def _finditer_with_alarm(self, compiled: re.Pattern, text: str) -> List[re.Match]:
+        """اجرای الگو با قطع توسط SIGALRM پس از پایان بودجه زمانی"""
+        
+        def on_alarm(signum, frame):
+            raise RegexTimeout()
+            
+        previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, self.time_budget)
+        
+        try:
+            return list(compiled.finditer(text))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+            
+    def record_strike(self, pattern: str, elapsed: float, text_length: int, aborted: bool):
+        """ثبت تخلف الگو و قرنطینه پس از رسیدن به سقف تخلفها"""
+        
+        with self._lock:
+            strikes = self.strikes.get(pattern, 0) + 1
+            self.strikes[pattern] = strikes
+            
+            if self.log_strikes:
+                action = "قطع شد" if aborted else "کند بود"
+                self.logger.warning(
+                    f"⏱️ الگو {action} ({elapsed * 1000:.0f}ms روی {text_length} کاراکتر، "
+                    f"تخلف {strikes}/{self.max_strikes}): {pattern}"
+                )
+            
+            if strikes >= self.max_strikes and pattern not in self.quarantined:
+                self.quarantined[pattern] = {
+                    'strikes': strikes,
+                    'last_elapsed_ms': round(elapsed * 1000, 1),
+                    'text_length': text_length,
+                    'quarantined_at': time.time()
+                }
+                if self.log_strikes:
+                    self.logger.error(f"🚫 الگو قرنطینه شد: {pattern}")
+                
+    def quarantine_unsafe(self, pattern: str):
+        """قرنطینه الگوی پرخطر بررسی ایستا (بدون اجرا)"""
+        
+        with self._lock:
+            if pattern in self.quarantined:
+                return
+                
+            self.quarantined[pattern] = {
+                'strikes': 0,
+                'reason': 'unsafe',
+                'issues': self.unsafe[pattern],
+                'quarantined_at': time.time()
+            }
+            if self.log_strikes:
+                issues = '، '.join(self.unsafe[pattern])
+                self.logger.error(f"🚫 الگوی پرخطر بدون امکان قطع اجرا نمیشود ({issues}): {pattern}")
+                
+    def release(self, pattern: Optional[str] = None):
+        """خارج کردن الگو (یا همه الگوها) از قرنطینه"""
+        
+        with self._lock:
+            if pattern is None:
+                self.quarantined.clear()
+                self.strikes.clear()
+            else:
+                self.quarantined.pop(pattern, None)
+                self.strikes.pop(pattern, None)
+                
+    def get_report(self) -> Dict[str, Any]:
+        """گزارش وضعیت نگهبان"""
+        
+        return {
+            'time_budget_ms': self.time_budget * 1000,
+            'max_strikes': self.max_strikes,
+            'stats': dict(self.stats),
+            'strikes': dict(self.strikes),
+            'quarantined': dict(self.quarantined)
+        }
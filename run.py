@@ -103,7 +103,7 @@ def check_files():
 def create_directories():
     """ایجاد پوشههای مورد نیاز"""
     
-    directories = ['patterns', 'temp', 'results', 'uploads', 'assets']
+    directories = ['patterns', 'temp', 'results', 'uploads', 'assets', 'cache']
     
     for directory in directories:
         Path(directory).mkdir(exist_ok=True)
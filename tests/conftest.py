@@ -0,0 +1,12 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تنظیمات مشترک تستها (ماژولهای برنامه در ریشه مخزن هستند)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
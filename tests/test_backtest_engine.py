@@ -0,0 +1,79 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست آزمون الگوهای پیشنهادی روی متن صفحات ذخیره شده
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import json
+
+import pytest
+
+from backtest_engine import BacktestEngine, load_corpus
+from ocr_cache import OCRCache, PAGE_TEXT
+from benchmark_patterns import SAMPLE_TEXT
+
+WITHOUT_WEIGHT = SAMPLE_TEXT.replace('38 وزن خالص 1500.5 کیلوگرم ', '')
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """پوشه کاری موقت (موتور آزمون سیستم یادگیری خودش را میسازد)"""
+    
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def test_corpus_merges_results_and_cache_without_duplicates(workdir):
+    """متن صفحات از نتایج JSON Lines و کش خوانده و متنهای تکراری یک بار شمرده میشوند"""
+    
+    results_path = workdir / 'results.jsonl'
+    with open(results_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'pages': [{'full_text': 'first'}, {'full_text': 'second'}]}, ensure_ascii=False) + '\n')
+        f.write(json.dumps({'full_text': 'first'}) + '\n')
+        
+    cache = OCRCache(str(workdir / 'cache.db'))
+    cache.put('page-a', 'second', kind=PAGE_TEXT)
+    cache.put('page-b', 'third', kind=PAGE_TEXT)
+    cache.put('pass', [[[0, 0], 'ocr pass', 0.9]])
+    cache.close()
+    
+    assert load_corpus(str(workdir / 'cache.db'), str(results_path)) == ['first', 'second', 'third']
+    assert load_corpus(str(workdir / 'cache.db'), str(results_path), max_pages=2) == ['first', 'second']
+    assert load_corpus(str(workdir / 'missing.db')) == []
+
+def test_candidate_is_compared_with_current_values(workdir):
+    """هر صفحه موافق، مخالف، جدید یا پیدا نشده شمرده میشود و تصحیحات کاربر سنجیده میشوند"""
+    
+    texts = [
+        SAMPLE_TEXT,
+        WITHOUT_WEIGHT + ' وزن نت 2000',
+        WITHOUT_WEIGHT
+    ]
+    candidate = {'وزن خالص': [r'نت\s*(\d+)', r'خالص\s*(\d+)']}
+    corrections = [('وزن_خالص', '1500.5', '1500')]
+    
+    engine = BacktestEngine({'ocr_cache_enabled': False, 'learned_patterns_enabled': False}, workers=1)
+    report = engine.run(candidate, texts, {}, corrections)
+    
+    field = report['fields']['وزن_خالص']
+    assert report['pages'] == 3 and field['pages'] == 3
+    assert (field['hits'], field['agree'], field['disagree'], field['new'], field['missed']) == (2, 0, 1, 1, 0)
+    assert field['examples'] == [{'current': '1500.5', 'candidate': '1500'}]
+    assert (field['correction_pages'], field['correction_fixed'], field['correction_agreement']) == (1, 1, 100.0)
+    
+    summary = BacktestEngine.format_report(report)
+    assert 'وزن_خالص' in summary and '1500.5 ← 1500' in summary
+
+def test_chunks_are_merged(workdir):
+    """نتیجه دستههای جدا با اجرای یکجا یکسان است"""
+    
+    texts = [SAMPLE_TEXT, WITHOUT_WEIGHT + ' وزن نت 2000', WITHOUT_WEIGHT]
+    candidate = {'وزن_خالص': [r'نت\s*(\d+)']}
+    config = {'ocr_cache_enabled': False, 'learned_patterns_enabled': False}
+    
+    whole = BacktestEngine(config, workers=1).run(candidate, texts, {}, [])
+    chunked = BacktestEngine(config, workers=1, chunk_size=1).run(candidate, texts, {}, [])
+    
+    for name in ('pages', 'hits', 'new', 'missed'):
+        assert chunked['fields']['وزن_خالص'][name] == whole['fields']['وزن_خالص'][name]
+    assert whole['fields']['وزن_خالص']['missed'] == 1
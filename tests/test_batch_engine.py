@@ -0,0 +1,81 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست ساخت وظایف و بازسازی نتیجه فایل در پردازش دستهای
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import fitz
+import pytest
+
+from batch_engine import BatchEngine, _failed_page_result
+
+@pytest.fixture
+def engine():
+    return BatchEngine({'workers': 2})
+
+def make_pdf(path, pages):
+    """PDF ساختگی با تعداد صفحات مشخص"""
+    
+    with fitz.open() as document:
+        for _ in range(pages):
+            document.new_page()
+        document.save(str(path))
+    return str(path)
+
+def page_result(page):
+    return {'file': 'a.pdf', 'page': page, 'extracted': {}, 'status': 'success'}
+
+def test_pdf_pages_become_separate_tasks(engine, tmp_path):
+    """هر صفحه PDF یک وظیفه است؛ تصویر و PDF خراب یک وظیفه فایل کامل"""
+    
+    pdf = make_pdf(tmp_path / 'a.pdf', 3)
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'not a pdf')
+    
+    tasks, file_tasks = engine.build_tasks([pdf, str(tmp_path / 'b.png'), str(broken)])
+    
+    assert tasks == [
+        (0, pdf, 0), (1, pdf, 1), (2, pdf, 2),
+        (3, str(tmp_path / 'b.png'), None),
+        (4, str(broken), None)
+    ]
+    assert file_tasks == [[0, 1, 2], [3], [4]]
+
+def test_page_tasks_can_be_disabled(tmp_path):
+    """با page_tasks خاموش هر PDF یک وظیفه است"""
+    
+    pdf = make_pdf(tmp_path / 'a.pdf', 3)
+    
+    tasks, file_tasks = BatchEngine({'workers': 1, 'page_tasks': False}).build_tasks([pdf])
+    
+    assert tasks == [(0, pdf, None)] and file_tasks == [[0]]
+
+def test_failed_page_keeps_its_place(engine):
+    """صفحه با خطا به صورت نتیجه خالی در جای خود میماند و فایل partial است"""
+    
+    failed = _failed_page_result('/data/a.pdf', 1, 'render error')
+    assert failed['file'] == 'a.pdf' and failed['page'] == 1
+    assert failed['status'] == 'failed' and failed['error'] == 'render error'
+    
+    result = engine.assemble_file_result('/data/a.pdf', [page_result(0), failed, page_result(2)])
+    
+    assert result['status'] == 'partial'
+    assert result['total_pages'] == 3
+    assert [page['page'] for page in result['pages']] == [0, 1, 2]
+
+@pytest.mark.parametrize('errors, status', [(0, 'success'), (2, 'failed')])
+def test_file_status_from_page_errors(engine, errors, status):
+    """فایل بدون صفحه ناموفق success و با همه صفحات ناموفق failed است"""
+    
+    pages = [_failed_page_result('a.pdf', page, 'error') if page < errors else page_result(page) for page in range(2)]
+    
+    assert engine.assemble_file_result('a.pdf', pages)['status'] == status
+
+def test_whole_file_task_result_is_returned_as_is(engine):
+    """وظیفه فایل کامل خروجی process_single_file را برمیگرداند"""
+    
+    whole = {'type': 'image', 'pages': [page_result(0)], 'status': 'success'}
+    
+    assert engine.assemble_file_result('a.png', [whole]) is whole
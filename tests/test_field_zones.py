@@ -0,0 +1,101 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست نقشه ناحیه فیلدها و تبدیل مختصات برش
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import numpy as np
+import pytest
+
+from field_zones import DEFAULT_FIELD_ZONES, crop_box_to_page, crop_zone, merge_field_zones, zone_pixels
+from benchmark_patterns import BenchmarkExtractor
+
+class TitleReader:
+    """OCR ساختگی: هر ناحیه فقط یک متن ثابت دارد"""
+    
+    def __init__(self, title):
+        self.title = title
+        
+    def readtext(self, image, **kwargs):
+        height, width = image.shape[:2]
+        return [([[0, 0], [width, 0], [width, height], [0, height]], self.title, 0.9)]
+
+def test_merge_without_overrides_copies_defaults():
+    """بدون تنظیمات کاربر نقشه پیشفرض کپی میشود (نه خود آن)"""
+    
+    zones, invalid = merge_field_zones(None)
+    
+    assert zones == DEFAULT_FIELD_ZONES and invalid == []
+    
+    doc_type = next(iter(zones))
+    zones[doc_type]['new_field'] = [0, 0, 1, 1]
+    assert 'new_field' not in DEFAULT_FIELD_ZONES[doc_type]
+
+def test_merge_overrides_disables_and_rejects():
+    """null نوع سند یا فیلد را غیرفعال میکند و ناحیه نامعتبر گزارش میشود"""
+    
+    doc_type = next(iter(DEFAULT_FIELD_ZONES))
+    field_name = next(iter(DEFAULT_FIELD_ZONES[doc_type]))
+    other_types = [other for other in DEFAULT_FIELD_ZONES if other != doc_type]
+    
+    overrides = {
+        doc_type: {field_name: None, 'custom': [0.1, 0.2, 0.3, 0.4], 'reversed': [0.5, 0.1, 0.2, 0.3],
+                   'outside': [0.1, 0.1, 1.2, 0.3], 'short': [0.1, 0.2]},
+        'new_type': {'custom': [0, 0, 0.5, 0.5]}
+    }
+    overrides.update({other: None for other in other_types})
+    
+    zones, invalid = merge_field_zones(overrides)
+    
+    assert set(zones) == {doc_type, 'new_type'}
+    assert field_name not in zones[doc_type]
+    assert zones[doc_type]['custom'] == [0.1, 0.2, 0.3, 0.4]
+    assert sorted(invalid) == [f"{doc_type}/outside", f"{doc_type}/reversed", f"{doc_type}/short"]
+
+def test_zone_pixels_pads_and_clamps():
+    """حاشیه ناحیه در لبههای صفحه بریده میشود"""
+    
+    assert zone_pixels([0.0, 0.0, 1.0, 1.0], (1000, 800)) == (0, 0, 800, 1000)
+    assert zone_pixels([0.25, 0.5, 0.5, 0.75], (1000, 800), pad=0) == (200, 500, 400, 750)
+
+@pytest.mark.parametrize('rect', [[0.1, 0.2, 0.4, 0.3], [0.0, 0.0, 1.0, 0.16], [0.6, 0.7, 0.99, 0.98]])
+def test_crop_box_round_trip(rect):
+    """کادر کل برش به همان ناحیه پیکسلی در صفحه برمیگردد"""
+    
+    shape = (1754, 1240)
+    pixels = zone_pixels(rect, shape)
+    crop = crop_zone(np.zeros(shape, np.uint8), pixels)
+    
+    assert crop.shape == (pixels[3] - pixels[1], pixels[2] - pixels[0])
+    
+    page_box = crop_box_to_page([0.0, 0.0, 1.0, 1.0], pixels, shape)
+    expected = [pixels[0] / shape[1], pixels[1] / shape[0], pixels[2] / shape[1], pixels[3] / shape[0]]
+    assert page_box == pytest.approx(expected, abs=1e-4)
+
+def test_crop_box_inner_box():
+    """کادر درون برش به نسبت ابعاد برش جابجا و کوچک میشود"""
+    
+    pixels = (100, 200, 300, 400)
+    
+    assert crop_box_to_page([0.5, 0.5, 1.0, 1.0], pixels, (1000, 1000)) == [0.2, 0.3, 0.3, 0.4]
+
+@pytest.mark.parametrize('title, page_num, expected', [
+    ('اظهارنامه صادرات قطعی تک کالایی', 0, 'export_single'),
+    ('اظهارنامه واردات تککالایی', 0, 'import_single'),
+    ('اظهارنامه واردات چند\u200cکالایی', 0, 'import_multi'),
+    ('EXPORT DECLARATION - MULTI ITEM', 0, 'export_multi'),
+    ('اظهارنامه واردات', 0, None),
+    ('کوتا 123456789', 0, None),
+    ('Import / Export', 0, None),
+])
+def test_zone_document_type_comes_from_title(title, page_num, expected):
+    """نوع سند ناحیهها از عنوان فرم - نه از ترتیب نقشه ناحیهها"""
+    
+    extractor = BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+    extractor.ocr_reader = TitleReader(title)
+    
+    doc_type, passes = extractor.detect_zone_document_type(np.full((1754, 1240), 255, np.uint8), {}, page_num)
+    
+    assert doc_type == expected and passes == 1
@@ -0,0 +1,88 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست چیدمان کادرهای OCR و جستجوی مقدار کنار برچسب
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import pytest
+
+from layout_index import PageLayout, compact_ocr_results
+from benchmark_patterns import BenchmarkExtractor
+
+def item(x0, y0, x1, y1, text, confidence=0.9):
+    """خروجی detail=1 یک کادر"""
+    
+    return ([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, confidence)
+
+# فرم راست به چپ: برچسب در راست، مقدار در چپ همان خط یا زیر برچسب
+RESULTS = [
+    item(800, 100, 1000, 130, 'وزن خالص'),
+    item(600, 100, 700, 130, '1500.5'),
+    item(450, 100, 550, 130, 'کیلوگرم'),
+    item(1050, 100, 1100, 130, '38'),
+    item(800, 200, 1000, 230, 'نرخ ارز'),
+    item(820, 240, 950, 270, '42000'),
+    item(600, 400, 700, 430, '999'),
+    item(800, 300, 1000, 330, 'کد کالا:12345678'),
+    item(100, 500, 200, 530, '   '),
+]
+
+@pytest.fixture
+def layout():
+    return PageLayout.from_ocr_results(RESULTS, 1240, 1754)
+
+def test_layout_skips_empty_boxes(layout):
+    """کادرهای بدون متن در چیدمان نمیآیند"""
+    
+    assert len(layout) == len(RESULTS) - 1
+    assert layout.line_height == pytest.approx(30)
+
+def test_query_returns_overlapping_boxes(layout):
+    """شاخص شبکهای فقط کادرهای همپوشان با مستطیل را برمیگرداند"""
+    
+    assert sorted(layout.query(590, 90, 710, 140)) == [1]
+    assert layout.query(0, 1000, 100, 1100) == []
+
+def test_neighbors_by_direction(layout):
+    """همسایههای همان خط و زیر برچسب به ترتیب فاصله (تا حداکثر فاصله هر جهت)"""
+    
+    label = layout.find_labels('وزن خالص')[0]
+    
+    assert [layout.texts[i] for i in layout.neighbors(label, 'left')] == ['1500.5', 'کیلوگرم']
+    assert [layout.texts[i] for i in layout.neighbors(label, 'right')] == ['38']
+    
+    rate = layout.find_labels('نرخارز')[0]
+    assert [layout.texts[i] for i in layout.neighbors(rate, 'below')] == ['42000', 'کد کالا:12345678']
+    
+    with pytest.raises(ValueError):
+        layout.neighbors(label, 'above')
+
+def test_value_candidates_in_priority_order(layout):
+    """متن چسبیده به برچسب، سپس کادرهای چپ، زیر و راست"""
+    
+    assert [text for text, _ in layout.value_candidates('وزن خالص')] == ['1500.5', 'کیلوگرم', 'نرخ ارز', '38']
+    assert layout.value_candidates('کد کالا')[0][0] == ':12345678'
+
+def test_normalized_box_and_compact_results(layout):
+    """کادر نسبی صفحه و خروجی فشرده قابل ذخیره در JSON"""
+    
+    assert layout.normalized_box(1) == [round(600 / 1240, 4), round(100 / 1754, 4), round(700 / 1240, 4), round(130 / 1754, 4)]
+    assert compact_ocr_results([item(1.6, 2.2, 10, 20, 'x', 0.912345), 'text']) == [
+        [[[2, 2], [10, 2], [10, 20], [2, 20]], 'x', 0.9123], 'text'
+    ]
+
+def test_extractor_reads_values_next_to_labels(layout):
+    """موتور استخراج مقدار معتبر کنار برچسب را برمیگرداند و شماره کادر فرم را کنار میگذارد"""
+    
+    extractor = BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+    
+    fields = extractor.extract_fields_from_layout(
+        layout, ['وزن_خالص', 'نرخ_ارز', 'کد_کالا'], extractor.import_patterns
+    )
+    
+    assert {field: result['value'] for field, result in fields.items()} == {
+        'وزن_خالص': '1500.5', 'نرخ_ارز': '42000', 'کد_کالا': '12345678'
+    }
+    assert fields['وزن_خالص']['box'] == layout.normalized_box(1)
@@ -0,0 +1,125 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست کش قالبهای چیدمان
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import json
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from layout_templates import LayoutTemplateCache
+
+BOXES = {'شماره_کوتا': [0.05, 0.05, 0.4, 0.1]}
+
+def form_page(rows=20, columns=(40, 400, 800, 1200), seed=0):
+    """صفحه فرم ساختگی: خطوط جدول با نویز اسکن"""
+    
+    page = np.full((1754, 1240), 255, np.uint8)
+    for y in np.linspace(100, 1650, rows).astype(int):
+        cv2.line(page, (40, int(y)), (1200, int(y)), 0, 3)
+    for x in columns:
+        cv2.line(page, (x, 100), (x, 1650), 0, 3)
+        
+    noise = np.random.default_rng(seed).integers(0, 30, page.shape, dtype=np.uint8)
+    return cv2.subtract(page, noise)
+
+@pytest.fixture
+def cache(tmp_path):
+    return LayoutTemplateCache(str(tmp_path / 'layout_templates.json'))
+
+def test_similar_page_matches_and_other_layout_does_not(cache):
+    """اسکن دیگری از همان فرم منطبق است، چیدمان دیگر نه"""
+    
+    template_id = cache.learn(LayoutTemplateCache.fingerprint(form_page()), 'import_single', 0, BOXES)
+    
+    matched = cache.match(LayoutTemplateCache.fingerprint(form_page(seed=1)), 0)
+    assert matched is not None and matched[0] == template_id
+    assert matched[1]['fields'] == BOXES
+    
+    other = LayoutTemplateCache.fingerprint(form_page(rows=6, columns=(40, 1200)))
+    assert cache.match(other, 0) is None
+
+def test_match_respects_page_role(cache):
+    """قالب صفحه اول روی صفحات بعدی اعمال نمیشود و برعکس"""
+    
+    fingerprint = LayoutTemplateCache.fingerprint(form_page())
+    first = cache.learn(fingerprint, 'import_multi', 0, BOXES)
+    
+    assert cache.find(fingerprint, 0) == first
+    assert cache.find(fingerprint, 1) is None
+    
+    continuation = cache.learn(fingerprint, 'import_multi', 1, BOXES)
+    
+    assert continuation != first
+    assert cache.find(fingerprint, 3) == continuation
+    assert cache.find(fingerprint, 0) == first
+
+def test_repeated_misses_remove_template(cache):
+    """قالبی که پشت سر هم معتبر نشود حذف میشود"""
+    
+    template_id = cache.learn(LayoutTemplateCache.fingerprint(form_page()), 'import_single', 0, BOXES)
+    
+    for _ in range(cache.max_misses):
+        cache.record_result(template_id, False)
+        
+    assert template_id not in cache.templates
+    assert cache.get_stats()['misses'] == cache.max_misses
+
+def test_save_keeps_templates_of_other_processes(tmp_path):
+    """ذخیره، قالبهای پردازشگر دیگر را پاک نمیکند ولی قالب حذف شده برنمیگردد"""
+    
+    path = str(tmp_path / 'layout_templates.json')
+    first, second = LayoutTemplateCache(path), LayoutTemplateCache(path)
+    
+    kept = first.learn(LayoutTemplateCache.fingerprint(form_page()), 'import_single', 0, BOXES)
+    removed = second.learn(LayoutTemplateCache.fingerprint(form_page(rows=6)), 'export_single', 0, BOXES)
+    
+    # قالب پردازشگر دیگر با ذخیره بعدی اضافه میشود
+    first.save()
+    assert removed in first.templates
+    
+    first.remove(removed)
+    first.save()
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        on_disk = json.load(f)['templates']
+        
+    assert kept in on_disk and removed not in on_disk
+    assert set(LayoutTemplateCache(path).templates) == {kept}
+
+def test_concurrent_find_and_learn(cache):
+    """جستجو از رشته رندر همزمان با یادگیری و حذف در رشته OCR"""
+    
+    fingerprints = [LayoutTemplateCache.fingerprint(form_page(rows=rows)) for rows in range(6, 16)]
+    cache.max_templates = 4
+    errors = []
+    
+    def reader():
+        for index in range(500):
+            try:
+                cache.find(fingerprints[index % len(fingerprints)], index % 2)
+            except Exception as e:
+                errors.append(e)
+                
+    def writer():
+        for index in range(60):
+            try:
+                template_id = cache.learn(fingerprints[index % len(fingerprints)], 'import_single', index % 2, BOXES)
+                cache.record_result(template_id, index % 3 == 0)
+            except Exception as e:
+                errors.append(e)
+                
+    threads = [threading.Thread(target=reader) for _ in range(3)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert errors == []
+    assert len(cache.templates) <= cache.max_templates
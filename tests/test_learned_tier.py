@@ -0,0 +1,120 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست لایه الگوهای یاد گرفته شده (سطح معتبر و آزمایشی)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import pytest
+
+from learned_tier import LearnedPatternTier
+from learning_system import LearningSystem
+from benchmark_patterns import BenchmarkExtractor, SAMPLE_TEXT
+
+FIELDS = ['وزن_خالص', 'شماره_کوتا', 'جمع_حقوق_عوارض']
+
+# برچسب بیرون از گروه مقدار دارد
+ANCHORED = r'خالص\s*(\d+(?:\.\d+)?)\s*کیلوگرم'
+
+# مقدار ثابت اصلاح شده کاربر - در متن نمونه مقدار «تعداد واحد کالا» است
+LITERAL = r'[\s:](3000)[\s\n]'
+
+def learned(pattern, accuracy=90.0, attempts=5, **extra):
+    data = {
+        'pattern': pattern,
+        'accuracy': accuracy,
+        'total_attempts': attempts,
+        'success_count': round(attempts * accuracy / 100),
+        'quality_score': 0.8
+    }
+    data.update(extra)
+    return data
+
+@pytest.fixture
+def learning_system(tmp_path, monkeypatch):
+    """سیستم یادگیری با پوشه الگوهای موقت"""
+    
+    monkeypatch.chdir(tmp_path)
+    return LearningSystem()
+
+def build_tier(learning_system, patterns):
+    learning_system.learned_patterns = patterns
+    tier = LearnedPatternTier(learning_system, FIELDS, reload_interval=0)
+    tier.refresh(force=True)
+    return tier
+
+def tier_patterns(tier, field_name):
+    return (
+        [p['pattern'] for p in tier.trusted.get(field_name, [])],
+        [p['pattern'] for p in tier.probation.get(field_name, [])]
+    )
+
+def test_split_between_trusted_and_probation(learning_system):
+    """الگوی ارزیابی شده با برچسب معتبر است؛ الگوی جدید و الگوی بدون برچسب آزمایشی و الگوی ضعیف هیچکدام"""
+    
+    tier = build_tier(learning_system, {
+        'وزن خالص': [
+            learned(ANCHORED),
+            learned(LITERAL),
+            learned(r'وزن\s*(\d+)', attempts=0, accuracy=0.0),
+            learned(r'خالص\s*:\s*(\d+)', accuracy=20.0)
+        ]
+    })
+    
+    assert tier_patterns(tier, 'وزن_خالص') == ([ANCHORED], [LITERAL, r'وزن\s*(\d+)'])
+    assert tier.stored_names[('وزن_خالص', ANCHORED)] == 'وزن خالص'
+
+def test_stored_label_names_are_mapped_to_field_keys(learning_system):
+    """برچسبهای ذخیره شده (با فاصله و «و») به کلید فیلد تبدیل میشوند و فیلد ناشناخته کنار میرود"""
+    
+    tier = build_tier(learning_system, {
+        'جمع حقوق و عوارض': [learned(r'جمع\s*حقوق\s*(\d+)')],
+        'فیلد ناشناخته': [learned(r'ناشناخته\s*(\d+)')]
+    })
+    
+    assert list(tier.trusted) == ['جمع_حقوق_عوارض']
+
+def test_trusted_order_follows_optimizer_rank(learning_system):
+    """رتبه اعمال شده بهینهساز بر دقت مقدم است؛ الگوهای بدون رتبه در انتها"""
+    
+    tier = build_tier(learning_system, {
+        'شماره_کوتا': [
+            learned(r'کوتا\s*(\d{9})', accuracy=100.0),
+            learned(r'شماره\s*کوتا\s*(\d{9})', accuracy=80.0, optimizer_rank=1),
+            learned(r'کوتا\s*:\s*(\d{9})', accuracy=90.0, optimizer_rank=0)
+        ]
+    })
+    
+    assert tier_patterns(tier, 'شماره_کوتا')[0] == [r'کوتا\s*:\s*(\d{9})', r'شماره\s*کوتا\s*(\d{9})', r'کوتا\s*(\d{9})']
+
+def test_refresh_rebuilds_only_on_change(learning_system):
+    """اسکنرها فقط پس از تغییر الگوها دوباره ساخته میشوند"""
+    
+    tier = build_tier(learning_system, {'شماره_کوتا': [learned(r'کوتا\s*(\d{9})')]})
+    version = tier.version
+    
+    assert not tier.refresh()
+    learning_system.learned_patterns['شماره_کوتا'][0]['accuracy'] = 10.0
+    assert tier.refresh()
+    
+    assert tier.version == version + 1 and tier.is_empty()
+
+def test_literal_pattern_does_not_override_builtin_patterns(learning_system):
+    """الگوی مقدار ثابت فقط وقتی الگوهای پایه چیزی نیابند استفاده میشود؛ الگوی با برچسب پیش از آنها"""
+    
+    learning_system.learned_patterns = {'وزن_خالص': [learned(LITERAL)]}
+    extractor = BenchmarkExtractor({'ocr_cache_enabled': False}, learning_system=learning_system)
+    
+    result = extractor.extract_field_with_patterns_advanced(SAMPLE_TEXT, 'وزن_خالص')
+    assert result['value'] == '1500.5' and result['method'] != 'learned'
+    
+    without_weight = SAMPLE_TEXT.replace('38 وزن خالص 1500.5 کیلوگرم ', '')
+    result = extractor.extract_field_with_patterns_advanced(without_weight, 'وزن_خالص')
+    assert result['value'] == '3000' and result['method'] == 'learned'
+    
+    learning_system.learned_patterns['وزن_خالص'].append(learned(ANCHORED))
+    extractor.learned_tier.refresh(force=True)
+    
+    result = extractor.extract_field_with_patterns_advanced(SAMPLE_TEXT, 'وزن_خالص')
+    assert result['value'] == '1500.5' and result['pattern'] == ANCHORED
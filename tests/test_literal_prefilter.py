@@ -0,0 +1,63 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست پیشفیلتر رشتههای ثابت: الگویی که match دارد هرگز حذف نمیشود
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+
+import pytest
+
+from pattern_scanner import PATTERN_FLAGS, LiteralPrefilter, extract_required_literals, fold_case
+from benchmark_patterns import BenchmarkExtractor, SAMPLE_TEXT
+
+@pytest.mark.parametrize('pattern, expected', [
+    (r'وزن\s*خالص\s*(\d+)', ['وزن', 'خالص']),
+    (r'(?:کد|شماره)\s*(\d+)', []),
+    (r'ab?cd', ['cd']),
+    (r'(?:xy)+z', ['xy']),
+    (r'(?:xy)*z', []),
+    (r'(\d+', []),
+])
+def test_required_literals(pattern, expected):
+    """فقط بخشهای اجباری الگو رشته ثابت لازم حساب میشوند"""
+    
+    assert extract_required_literals(pattern) == expected
+
+@pytest.mark.parametrize('text', ['İSTANBUL', 'ſtraße', 'KELVIN \u212a', 'Σίσυφος'])
+def test_fold_case_agrees_with_ignorecase(text):
+    """هر متنی که با IGNORECASE match میشود بعد از fold هم شامل رشته ثابت است"""
+    
+    for literal in {text.lower(), text.upper(), text.casefold()}:
+        if re.search(re.escape(literal), text, PATTERN_FLAGS):
+            assert fold_case(literal) in fold_case(text)
+
+def test_prefilter_closure_marks_contained_literals():
+    """وجود رشته طولانیتر یعنی وجود رشتههای داخل آن"""
+    
+    prefilter = LiteralPrefilter(['ارزش', 'ارزش گمرکی', 'بیمه'])
+    
+    assert prefilter.find('ارزش گمرکی 1000') == {'ارزش', 'ارزش گمرکی'}
+    assert prefilter.find('BIME') == set()
+    assert LiteralPrefilter([]).find('anything') == set()
+
+def test_prefilter_never_skips_a_matching_pattern():
+    """هر الگوی همه فیلدهایی که روی متن نمونه match دارد از پیشفیلتر عبور میکند"""
+    
+    extractor = BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+    texts = [SAMPLE_TEXT, SAMPLE_TEXT.upper(), SAMPLE_TEXT.replace('واردات', 'صادرات')]
+    
+    for patterns_dict in (extractor.import_patterns, extractor.export_patterns):
+        patterns = {pattern for config in patterns_dict.values() for pattern in config['patterns']}
+        required = {pattern: [fold_case(literal) for literal in extract_required_literals(pattern)]
+                    for pattern in patterns}
+        prefilter = LiteralPrefilter(literal for literals in required.values() for literal in literals)
+        
+        for text in texts:
+            found = prefilter.find(text)
+            
+            for pattern in patterns:
+                if re.search(pattern, text, PATTERN_FLAGS):
+                    assert all(literal in found for literal in required[pattern]), pattern
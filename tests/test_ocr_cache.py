@@ -0,0 +1,118 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست کش پایدار OCR و کش صفحات در حافظه
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import numpy as np
+import pytest
+
+import ocr_cache
+from ocr_cache import OCRCache, PAGE_TEXT
+from benchmark_patterns import BenchmarkExtractor
+
+class FakeClock:
+    """ساعت ساختگی - هر فراخوانی یک ثانیه جلو میرود"""
+    
+    def __init__(self):
+        self.now = 0.0
+        
+    def time(self):
+        self.now += 1
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ocr_cache, 'time', fake)
+    return fake
+
+def last_access(cache, key):
+    return cache._connect().execute("SELECT last_access FROM ocr_cache WHERE key = ?", (key,)).fetchone()[0]
+
+def test_round_trip_and_kinds(tmp_path):
+    """پاسهای OCR و دادههای صفحه با کلید یکسان جدا ذخیره میشوند"""
+    
+    cache = OCRCache(str(tmp_path / 'cache.db'))
+    
+    cache.put('key', [[[0, 0], 'text', 0.9]])
+    cache.put('key', 'page text', kind=PAGE_TEXT)
+    
+    assert cache.get('key') == [[[0, 0], 'text', 0.9]]
+    assert cache.get('key', kind=PAGE_TEXT) == 'page text'
+    assert cache.get('missing') is None
+    assert list(cache.iter_values(PAGE_TEXT)) == ['page text']
+    assert cache.stats['hits'] == 2 and cache.stats['misses'] == 1
+    
+    cache.close()
+
+def test_eviction_keeps_recently_read_entries(tmp_path, clock):
+    """سقف حجم با حذف رکوردی که مدت بیشتری خوانده نشده رعایت میشود"""
+    
+    cache = OCRCache(str(tmp_path / 'cache.db'), max_size_mb=0.001)
+    cache._check_interval = 1
+    value = 'x' * 400
+    
+    cache.put('a', value)
+    cache.put('b', value)
+    assert cache.get('a') == value
+    cache.put('c', value)
+    
+    assert cache.stats['evictions'] == 1
+    assert cache.get('b') is None
+    assert cache.get('a') == value and cache.get('c') == value
+    
+    cache.close()
+
+def test_access_times_are_written_in_batches(tmp_path, clock):
+    """خواندن از کش تا نوشتن بعدی یا بستن کش چیزی در پایگاه داده نمینویسد"""
+    
+    path = str(tmp_path / 'cache.db')
+    cache = OCRCache(path)
+    cache.put('a', 'value')
+    written = last_access(cache, 'a')
+    
+    cache.get('a')
+    assert last_access(cache, 'a') == written
+    
+    cache.put('b', 'value')
+    assert last_access(cache, 'a') > written
+    
+    read = clock.now
+    cache.get('a')
+    cache.close()
+    
+    reopened = OCRCache(path)
+    assert last_access(reopened, 'a') > read
+    reopened.close()
+
+class CountingExtractor(BenchmarkExtractor):
+    """OCR ساختگی که تعداد اجراها را میشمارد"""
+    
+    calls = 0
+    
+    def run_ocr_config(self, img, config, detection_cache):
+        self.calls += 1
+        return [([[0, 0], [10, 0], [10, 10], [0, 10]], 'text', 0.9)]
+
+def test_memory_cache_keeps_only_recent_pages():
+    """کش صفحات در حافظه حداکثر memory_cache_pages صفحه اخیر را نگه میدارد"""
+    
+    extractor = CountingExtractor({
+        'ocr_cache_enabled': False, 'learned_patterns_enabled': False,
+        'ocr_cascade': False, 'memory_cache_pages': 2
+    })
+    pages = [np.full((60, 80), 200 + index, np.uint8) for index in range(3)]
+    
+    for page in pages:
+        extractor.extract_text_from_image_advanced(page)
+    assert len(extractor.ocr_cache) == 2
+    
+    calls = extractor.calls
+    extractor.extract_text_from_image_advanced(pages[2])
+    assert extractor.calls == calls
+    
+    extractor.extract_text_from_image_advanced(pages[0])
+    assert extractor.calls > calls
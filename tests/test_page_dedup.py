@@ -0,0 +1,152 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست حذف صفحات خالی و تکراری
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from page_dedup import PageDeduplicator
+
+VALUES = ['123456789', '84713000', '1500.5', '250000']
+
+def form_page(values, noise=0, seed=0, size=(1754, 1240), scale=1, thickness=2, shift=(0, 0)):
+    """صفحه فرم ساختگی با مقادیر پر شده در ستون اول (اندازهها نسبت به صفحه A4 با 150 DPI)"""
+    
+    height, width = size
+    ratio = width / 1240
+    dx, dy = shift
+    
+    page = np.full(size, 255, np.uint8)
+    for y in range(150, 1650, 70):
+        cv2.line(page, (int(60 * ratio) + dx, int(y * ratio) + dy), (int(1180 * ratio) + dx, int(y * ratio) + dy), 0, 3)
+    for x in (60, 400, 800, 1180):
+        cv2.line(page, (int(x * ratio) + dx, int(150 * ratio) + dy), (int(x * ratio) + dx, int(1610 * ratio) + dy), 0, 3)
+    for index, value in enumerate(values * 5):
+        origin = (int(80 * ratio) + dx, int((195 + index * 70) * ratio) + dy)
+        cv2.putText(page, value, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, 0, thickness)
+        
+    if noise:
+        page = cv2.subtract(page, np.random.default_rng(seed).integers(0, noise, page.shape, dtype=np.uint8))
+        
+    return page
+
+# کادر مقدار ردیف اول (نسبی)
+VALUE_BOX = [65 / 1240, 155 / 1754, 395 / 1240, 215 / 1754]
+
+def page_result(page, value, box=VALUE_BOX):
+    return {'file': 'a.pdf', 'page': page, 'extracted': {'شماره_کوتا': {'value': value, 'box': box}}}
+
+@pytest.fixture
+def dedup():
+    return PageDeduplicator()
+
+def test_blank_page(dedup):
+    """صفحه بدون جوهر خالی است، صفحه فرم نه"""
+    
+    assert dedup.is_blank(dedup.signature(np.full((1754, 1240), 250, np.uint8)))
+    assert not dedup.is_blank(dedup.signature(form_page(VALUES)))
+
+def test_rescan_is_duplicate_and_other_values_are_not(dedup):
+    """اسکن دوباره همان صفحه تکراری است؛ همان فرم با مقادیر دیگر نه"""
+    
+    page = form_page(VALUES)
+    dedup.add(dedup.signature(page), page_result(0, '123456789'), page)
+    
+    rescan = form_page(VALUES, noise=20, seed=3)
+    found = dedup.find(dedup.signature(rescan), rescan)
+    assert found is not None and found['page'] == 0
+    
+    other = form_page(['987654321', '39269090', '75.25', '1200'])
+    assert dedup.find(dedup.signature(other), other) is None
+
+def test_single_thin_digit_change_is_not_duplicate(dedup):
+    """تغییر یک رقم با خط نازک در صفحه با وضوح کامل - تصویر کوچک شده آن را نمیبیند"""
+    
+    size = (3508, 2480)
+    page = form_page(['123456789'] * 4, size=size, scale=0.9, thickness=1)
+    changed = form_page(['123456780'] + ['123456789'] * 3, size=size, scale=0.9, thickness=1)
+    
+    dedup.add(dedup.signature(page), page_result(0, '123456789'), page)
+    
+    # تصویر کوچک شده دو صفحه یکسان است و فقط مقایسه کادر مقدار آنها را جدا میکند
+    assert dedup.same_thumbnail(dedup.signature(page)['thumbnail'], dedup.signature(changed)['thumbnail'])
+    assert dedup.find(dedup.signature(changed), changed) is None
+    
+    rescan = form_page(['123456789'] * 4, noise=20, seed=5, size=size, scale=0.9, thickness=1)
+    assert dedup.find(dedup.signature(rescan), rescan)['page'] == 0
+    
+    # کادر مقدار با جابجایی کوچک اسکن دوباره هم مقایسه میشود
+    zones = dedup.value_zones(page, page_result(0, '123456789'))
+    shifted = form_page(['123456789'] * 4, size=size, scale=0.9, thickness=1, shift=(6, 5))
+    assert dedup.same_value_zones(zones, shifted)
+    
+    shifted_changed = form_page(['123456780'] + ['123456789'] * 3, size=size, scale=0.9, thickness=1, shift=(6, 5))
+    assert not dedup.same_value_zones(zones, shifted_changed)
+
+def test_result_without_value_boxes_is_not_stored(dedup):
+    """نتیجهای که کادر مقادیرش معلوم نیست یا صفحهاش چرخانده شده قابل تایید نیست"""
+    
+    page = form_page(VALUES)
+    
+    assert not dedup.add(dedup.signature(page), page_result(0, '123456789', box=None), page)
+    
+    rotated = dict(page_result(0, '123456789'), rotation=180)
+    assert not dedup.add(dedup.signature(page), rotated, page)
+    
+    assert not dedup.pages and dedup.find(dedup.signature(page), page) is None
+
+def test_hash_collision_keeps_both_pages(dedup):
+    """دو صفحه متفاوت با هش یکسان هر دو نگه داشته میشوند"""
+    
+    first_page, second_page = form_page(VALUES), form_page(['987654321'] * 4)
+    first, second = dedup.signature(first_page), dedup.signature(second_page)
+    second['hash'] = first['hash']
+    
+    dedup.add(first, page_result(0, 'first'), first_page)
+    dedup.add(second, page_result(1, 'second'), second_page)
+    
+    assert len(dedup.pages) == 2
+    assert dedup.find(first, first_page)['extracted']['شماره_کوتا']['value'] == 'first'
+    assert dedup.find(second, second_page)['extracted']['شماره_کوتا']['value'] == 'second'
+
+def test_stored_result_is_isolated_from_edits(dedup):
+    """ویرایش نتیجه اصلی یا نتیجه تکراری به صفحات تکراری بعدی نمیرسد"""
+    
+    page = form_page(VALUES)
+    signature = dedup.signature(page)
+    original = page_result(0, '123456789')
+    dedup.add(signature, original, page)
+    
+    original['extracted']['شماره_کوتا']['value'] = 'manual edit'
+    
+    duplicate = dedup.reuse(dedup.find(signature, page), 'b.pdf', 4)
+    duplicate['extracted']['شماره_کوتا']['value'] = 'changed'
+    
+    again = dedup.reuse(dedup.find(signature, page), 'c.pdf', 2)
+    
+    assert again['extracted']['شماره_کوتا']['value'] == '123456789'
+    assert again['deduplicated_from'] == {'file': 'a.pdf', 'page': 0}
+    assert (again['file'], again['page']) == ('c.pdf', 2)
+    assert dedup.duplicate_pages == 2
+
+def test_oldest_pages_are_evicted():
+    """حداکثر max_pages صفحه نگه داشته میشود (کمترین استفاده اخیر حذف میشود)"""
+    
+    dedup = PageDeduplicator(max_pages=2)
+    pages = [form_page([value] * 4) for value in ('111', '222222222', '3.5')]
+    signatures = [dedup.signature(page) for page in pages]
+    
+    for index, signature in enumerate(signatures):
+        dedup.add(signature, page_result(index, str(index)), pages[index])
+        
+    assert len(dedup.pages) == 2
+    assert dedup.find(signatures[0], pages[0]) is None
+    assert dedup.find(signatures[2], pages[2])['page'] == 2
+    
+    dedup.reset()
+    assert not dedup.pages and dedup.duplicate_pages == 0
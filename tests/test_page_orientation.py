@@ -0,0 +1,113 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست تشخیص جهت و کجی صفحه
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from page_orientation import (
+    densest_text_band, estimate_skew, orientation_candidates, rotate_page, upright_score, vertical_text
+)
+from benchmark_patterns import BenchmarkExtractor
+
+def text_page():
+    """صفحه ساختگی با خطوط متن افقی"""
+    
+    page = np.full((1754, 1240), 255, np.uint8)
+    for index, y in enumerate(range(150, 1650, 60)):
+        cv2.putText(page, f'Customs declaration 12345 {index}', (80, y), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    return page
+
+def tilt(page, angle):
+    """چرخش پادساعتگرد صفحه با پسزمینه سفید (اسکن کج)"""
+    
+    height, width = page.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (width, height), borderValue=255)
+
+class FlipReader:
+    """OCR ساختگی: متن نوار وارونه شده خواناتر است"""
+    
+    def __init__(self):
+        self.calls = 0
+        
+    def readtext(self, image, **kwargs):
+        self.calls += 1
+        text = 'abc' if self.calls % 2 else 'abcdefgh'
+        return [([[0, 0], [10, 0], [10, 10], [0, 10]], text, 0.9)]
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    # بدون قالبهای چیدمان ذخیره شده
+    monkeypatch.chdir(tmp_path)
+    return BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+
+@pytest.mark.parametrize('angle', [-3.0, 0.0, 1.5, 2.5])
+def test_skew_is_measured_and_removed(angle):
+    """کجی اسکن اندازهگیری و با یک چرخش حذف میشود"""
+    
+    tilted = tilt(text_page(), angle)
+    skew = estimate_skew(tilted)
+    
+    assert skew == pytest.approx(angle, abs=0.2)
+    assert estimate_skew(rotate_page(tilted, 0, skew)) == pytest.approx(0.0, abs=0.2)
+
+def test_quarter_turn_is_detected():
+    """متن عمودی (صفحه 90 درجه چرخیده) تشخیص داده و ابعاد صفحه جابجا میشود"""
+    
+    page = text_page()
+    turned = rotate_page(page, 90)
+    
+    assert turned.shape == (1240, 1754)
+    assert vertical_text(turned) and not vertical_text(page)
+    assert orientation_candidates(turned) == (90, 270)
+    assert orientation_candidates(page) == (0, 180)
+    
+    # بدون چرخش و کجی همان آرایه برگردانده میشود
+    assert rotate_page(page, 0) is page
+    assert rotate_page(turned, 270, 0.5).shape == page.shape
+
+def test_orient_page_straightens_turned_and_tilted_scan(extractor):
+    """جهت و کجی صفحه یکجا اصلاح میشود"""
+    
+    scan = rotate_page(tilt(text_page(), 2.0), 90)
+    
+    upright, orientation = extractor.orient_page(scan)
+    
+    assert orientation['rotation'] in (90, 270)
+    assert abs(orientation['skew']) == pytest.approx(2.0, abs=0.3)
+    assert upright.shape == (1754, 1240) and not vertical_text(upright)
+    assert estimate_skew(upright) == pytest.approx(0.0, abs=0.3)
+
+def test_flip_check_runs_once_and_is_remembered(extractor):
+    """بررسی وارونگی با OCR فقط یک بار برای هر تصویر اجرا و نتیجهاش در تخمین جهت ذخیره میشود"""
+    
+    reader = FlipReader()
+    extractor.ocr_reader = reader
+    
+    page = text_page()
+    upright, orientation = extractor.orient_page(page)
+    assert orientation['rotation'] == 0
+    
+    assert extractor.recheck_page_flip(upright)
+    assert reader.calls == 2
+    assert extractor.last_orientation['estimate']['rotation'] == 180
+    assert extractor.last_orientation['estimate']['ocr_checked']
+    
+    assert not extractor.recheck_page_flip(upright)
+    assert reader.calls == 2
+
+def test_text_band_and_upright_score():
+    """نوار پرجوهر صفحه و امتیاز خوانایی خروجی OCR"""
+    
+    page = text_page()
+    band = densest_text_band(page)
+    
+    assert band.shape == (int(1754 * 0.12), 1240)
+    assert (band < 128).mean() > (page < 128).mean()
+    assert upright_score([([], 'abcd', 0.5), ([], ' ab ', 1.0), ([], 'x')]) == pytest.approx(4.0)
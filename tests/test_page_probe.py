@@ -0,0 +1,68 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست بررسی اولیه صفحه (خالی، فرم اظهارنامه یا پیوست)
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import fitz
+import numpy as np
+import pytest
+
+from page_probe import describe_probe, is_declaration_text, probe_summary
+from excel_export import page_note
+from benchmark_patterns import BenchmarkExtractor
+
+def form_gray(rows=6, columns=4):
+    """تصویر خاکستری با وضوح پایین از جدول فرم"""
+    
+    gray = np.full((842, 595), 255, np.uint8)
+    for y in np.linspace(100, 700, rows).astype(int):
+        gray[y:y + 2, 60:540] = 0
+    for x in np.linspace(60, 540, columns).astype(int):
+        gray[100:702, x:x + 2] = 0
+    return gray
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+
+def test_probe_summary_of_blank_and_form_pages():
+    """صفحه خالی بدون جوهر و خط است؛ خطوط جدول فرم شمرده میشوند"""
+    
+    blank = probe_summary(np.full((842, 595), 255, np.uint8))
+    assert blank == {'ink': 0.0, 'orientation': 0, 'form_lines': 0, 'size': [595, 842]}
+    
+    form = probe_summary(form_gray())
+    assert form['form_lines'] == 6 + 4
+    assert form['ink'] > 0
+
+def test_declaration_keywords_and_skip_description():
+    """حداقل دو کلمه فرم (بدون توجه به فاصله) و دلیل خوانای رد شدن صفحه"""
+    
+    assert is_declaration_text('اظهارنامه واردات - کدکالا 12345678')
+    assert not is_declaration_text('فاکتور فروش - کد کالا 12345678')
+    
+    assert describe_probe({'kind': 'blank', 'ink': 0.0012}) == 'صفحه خالی (جوهر 0.12%)'
+    assert describe_probe({'kind': 'attachment', 'form_lines': 3}) == 'پیوست - 3 خط فرم در بررسی اولیه'
+    
+    assert page_note({'skip_detail': 'صفحه خالی', 'error': 'x'}) == 'صفحه خالی'
+    assert page_note({'error': 'x'}) == 'x' and page_note({}) == ''
+
+def test_blank_pdf_page_is_skipped_before_rendering(extractor):
+    """صفحه خالی PDF (حتی صفحه اول) با وضوح کامل رندر نمیشود"""
+    
+    document = fitz.open()
+    document.new_page()
+    document.new_page()
+    
+    assert extractor.prepare_pdf_page(document, 0, 'a.pdf')[0] == 'skipped'
+    
+    kind, page_num, probe = extractor.prepare_pdf_page(document, 1, 'a.pdf')
+    assert (kind, page_num, probe['kind']) == ('skipped', 1, 'blank')
+    
+    result = extractor._skipped_page_result('a.pdf', page_num, probe)
+    assert result['status'] == 'skipped' and result['skip_reason'] == 'blank'
+    assert page_note(result).startswith('صفحه خالی')
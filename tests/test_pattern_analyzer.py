@@ -0,0 +1,91 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست بررسی ایستای ReDoS و کلاس هزینه الگوها
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+import threading
+
+import pytest
+
+from pattern_analyzer import PatternAnalyzer, find_static_issues
+from regex_guard import RegexGuard
+from benchmark_patterns import BenchmarkExtractor
+
+CATASTROPHIC = r'(a+)+$'
+
+def issue_types(pattern):
+    return {issue['type']: issue['severity'] for issue in find_static_issues(pattern)}
+
+def run_in_thread(function):
+    """اجرای تابع در نخ غیراصلی (بدون امکان قطع با سیگنال) و برگرداندن خروجی آن"""
+    
+    output = {}
+    thread = threading.Thread(target=lambda: output.update(value=function()))
+    thread.start()
+    thread.join()
+    return output['value']
+
+@pytest.fixture
+def analyzer(tmp_path):
+    # بدون کش OCR - فقط بنچمارک بدترین حالت
+    return PatternAnalyzer(cache_path=str(tmp_path / 'missing.db'), time_budget_ms=100)
+
+@pytest.mark.parametrize('pattern, expected', [
+    (r'(\s*\d+)*', {'nested_quantifier': 'high'}),
+    (CATASTROPHIC, {'nested_quantifier': 'high'}),
+    (r'(?:\w|\d\.)*x', {'overlapping_alternation': 'high'}),
+    (r'کد\s*:?\s*(.*)', {'unanchored_dotstar': 'medium'}),
+    (r'(?:ab|cd)*', {}),
+    (r'شماره\s*کوتا\s*:?\s*(\d{8,12})', {}),
+])
+def test_static_issues(pattern, expected):
+    """کمیتسنج تودرتو و شاخه همپوشان درون تکرار پرخطر و .* بدون لنگر متوسط است"""
+    
+    assert issue_types(pattern) == expected
+
+def test_builtin_patterns_have_no_high_issues():
+    """هیچ الگوی پایهای خطر عقبگرد نمایی ندارد"""
+    
+    extractor = BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+    
+    for patterns_dict in (extractor.import_patterns, extractor.export_patterns):
+        for field_name, field_config in patterns_dict.items():
+            for pattern in field_config['patterns']:
+                assert 'high' not in issue_types(pattern).values(), (field_name, pattern)
+
+def test_analyze_classifies_cost(analyzer):
+    """الگوی ساده پذیرفته میشود؛ الگوی نامعتبر و الگوی با رشد نمایی نه"""
+    
+    simple = analyzer.analyze(r'وزن\s*خالص\s*:?\s*(\d+(?:\.\d+)?)')
+    assert simple['cost_class'] == 'low' and simple['accepted']
+    
+    invalid = analyzer.analyze(r'(\d+')
+    assert not invalid['valid'] and not invalid['accepted'] and invalid['error']
+    
+    catastrophic = analyzer.analyze(CATASTROPHIC)
+    assert catastrophic['cost_class'] == 'catastrophic' and not catastrophic['accepted']
+    assert None in catastrophic['benchmark']['worst_case_ms'].values()
+
+def test_high_risk_pattern_is_not_benchmarked_off_main_thread(analyzer):
+    """بدون امکان قطع، الگوی پرخطر بنچمارک نمیشود و با همان بررسی ایستا رد میشود"""
+    
+    report = run_in_thread(lambda: analyzer.analyze(CATASTROPHIC))
+    
+    assert report['benchmark']['worst_case_ms'] == 'skipped'
+    assert report['cost_class'] == 'high' and not report['accepted']
+
+def test_guard_skips_unsafe_pattern_where_it_cannot_be_interrupted():
+    """الگوی پرخطر بررسی ایستا در نخ غیراصلی اجرا نمیشود و با دلیل قرنطینه میشود"""
+    
+    guard = RegexGuard(time_budget_ms=50, log_strikes=False)
+    
+    assert not guard.screen(CATASTROPHIC, 0)
+    assert guard.screen(r'(\d+)', 0)
+    
+    assert run_in_thread(lambda: guard.finditer(CATASTROPHIC, re.compile(CATASTROPHIC), 'a' * 40 + 'b')) == []
+    assert guard.quarantined[CATASTROPHIC]['reason'] == 'unsafe'
+    assert guard.stats['runs'] == 0
@@ -0,0 +1,76 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست حذف و ترتیب الگوها بر اساس هزینه و سهم واقعی
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import pytest
+
+from pattern_optimizer import PatternOptimizer
+from learning_system import LearningSystem
+
+def counters(runs, chosen=0, unique=0, time_ms=10.0):
+    return {'runs': runs, 'chosen': chosen, 'unique': unique, 'time_ms': time_ms}
+
+def learned(pattern, stats, **extra):
+    data = {'pattern': pattern, 'accuracy': 90.0, 'total_attempts': 5, 'success_count': 4, 'runtime_stats': stats}
+    data.update(extra)
+    return data
+
+def rows(optimizer, patterns, pages=100):
+    return [optimizer._pattern_row(pattern, stats, pages) for pattern, stats in patterns.items()]
+
+def test_patterns_that_never_win_are_retired():
+    """الگوی بدون برد پس از min_runs اجرا حذف میشود؛ الگوی کماجرا و الگوی برنده میمانند"""
+    
+    optimizer = PatternOptimizer(min_runs=50)
+    report = optimizer.optimize_field('regex', 'وزن_خالص', rows(optimizer, {
+        'unique': counters(100, chosen=30, unique=10, time_ms=5.0),
+        'redundant': counters(100, chosen=60, time_ms=1.0),
+        'loser': counters(100, time_ms=40.0),
+        'young': counters(10)
+    }))
+    
+    assert report['retire'] == ['loser']
+    assert {row['pattern']: row['action'] for row in report['patterns']} == {
+        'unique': 'keep', 'redundant': 'redundant', 'loser': 'retire', 'young': 'keep'
+    }
+    assert report['proposed_order'] == ['unique', 'redundant', 'young']
+    assert report['saved_ms_per_page'] == pytest.approx(0.4)
+
+def test_keep_min_and_most_expensive_first():
+    """حداقل keep_min الگو میماند و پرهزینهترین الگوهای بدون برد اول حذف میشوند"""
+    
+    optimizer = PatternOptimizer(min_runs=50, keep_min=1)
+    report = optimizer.optimize_field('regex', 'وزن_خالص', rows(optimizer, {
+        'cheap': counters(100, time_ms=1.0),
+        'expensive': counters(100, time_ms=90.0)
+    }))
+    
+    assert report['retire'] == ['expensive'] and report['proposed_order'] == ['cheap']
+
+def test_apply_retires_learned_patterns_and_stores_rank(tmp_path, monkeypatch):
+    """اعمال: الگوی یاد گرفته شده بدون برد حذف، الگوی دستی حفظ و ترتیب در optimizer_rank ذخیره میشود"""
+    
+    monkeypatch.chdir(tmp_path)
+    learning_system = LearningSystem()
+    learning_system.pattern_stats = {'pages': 100, 'fields': {'builtin_field': {'p': counters(100, chosen=5, unique=5), 'q': counters(100)}}}
+    learning_system.learned_patterns = {'وزن_خالص': [
+        learned('loser', counters(100)),
+        learned('manual', counters(100), pattern_type='manual'),
+        learned('winner', counters(100, chosen=80, unique=20))
+    ]}
+    
+    report = learning_system.optimize_patterns(apply=True, min_runs=50)
+    
+    assert report['applied'] and report['retire_count'] == 2
+    assert [(p['pattern'], p['optimizer_rank']) for p in learning_system.learned_patterns['وزن_خالص']] == [
+        ('winner', 0), ('manual', 1)
+    ]
+    
+    # الگوی پایه فقط پیشنهاد میشود
+    builtin = next(field for field in report['fields'] if field['source'] == 'regex')
+    assert builtin['retire'] == ['q'] and 'q' in learning_system.pattern_stats['fields']['builtin_field']
+    assert (tmp_path / 'patterns' / 'pattern_optimization.json').exists()
@@ -0,0 +1,74 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست اسکنر کامپایل شده الگوها
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+
+import pytest
+
+from pattern_scanner import FieldScanner, PATTERN_FLAGS
+from benchmark_patterns import BenchmarkExtractor, SAMPLE_TEXT, legacy_extract_field
+
+@pytest.fixture(scope='module')
+def extractor():
+    """استخراجگر بدون مدل OCR و بدون الگوهای یاد گرفته شده"""
+    
+    return BenchmarkExtractor({'ocr_cache_enabled': False, 'learned_patterns_enabled': False})
+
+@pytest.mark.parametrize('text', [SAMPLE_TEXT, SAMPLE_TEXT * 4, SAMPLE_TEXT.replace('واردات', 'صادرات')])
+def test_scanner_matches_legacy_finditer_loop(extractor, text):
+    """خروجی اسکنر با حلقه finditer قبلی یکسان است (همان بررسی بنچمارک)"""
+    
+    doc_type = extractor.detect_document_type(text)
+    patterns_dict = extractor.import_patterns if doc_type.startswith('import') else extractor.export_patterns
+    fields = list(patterns_dict)
+    
+    legacy = {field: legacy_extract_field(extractor, text, field, doc_type) for field in fields}
+    scanned = extractor.extract_fields_advanced(text, fields, doc_type)
+    
+    assert scanned == legacy
+    assert any(result['value'] for result in scanned.values())
+
+def test_shared_pattern_runs_once_per_scan():
+    """الگوی مشترک بین فیلدها یک بار اجرا و نتیجهاش تقسیم میشود"""
+    
+    scanner = FieldScanner({
+        'first': {'patterns': [r'کد\s*(\d+)']},
+        'second': {'patterns': [r'کد\s*(\d+)', r'شماره\s*(\d+)']}
+    })
+    
+    hits = scanner.scan('کد 123 شماره 456', ['first', 'second'])
+    
+    assert [match.group(1) for _, _, match in hits['first']] == ['123']
+    assert [(index, match.group(1)) for index, _, match in hits['second']] == [(0, '123'), (1, '456')]
+    assert scanner.stats == {'runs': 2, 'skipped': 0}
+
+def test_prefilter_skips_patterns_without_their_literal():
+    """الگویی که رشته ثابت لازمش در متن نیست اجرا نمیشود"""
+    
+    scanner = FieldScanner({'weight': {'patterns': [r'وزن\s*خالص\s*(\d+)']}})
+    
+    assert scanner.scan('کد کالا 1234', ['weight']) == {'weight': []}
+    assert scanner.stats == {'runs': 0, 'skipped': 1}
+
+def test_invalid_pattern_is_reported_not_raised():
+    """خطای کامپایل الگو در نتیجه اسکن برگردانده میشود"""
+    
+    scanner = FieldScanner({'broken': {'patterns': [r'(\d+', r'(\d+)']}})
+    
+    hits = scanner.scan('42', ['broken'])['broken']
+    
+    assert isinstance(hits[0][2], re.error)
+    assert hits[1][2].group(1) == '42'
+
+def test_unknown_field_has_no_hits():
+    """فیلد تعریف نشده خروجی خالی دارد"""
+    
+    scanner = FieldScanner({'code': {'patterns': [r'(\d+)']}}, flags=PATTERN_FLAGS)
+    
+    assert not scanner.has_field('missing')
+    assert scanner.scan('12', ['missing']) == {'missing': []}
@@ -0,0 +1,107 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست آمار اجرای الگوها و ادغام سه طرفه فایل الگوهای یاد گرفته شده
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import json
+
+import pytest
+
+from pattern_stats import PatternStats
+from learning_system import LearningSystem, merge_learned_patterns
+
+def pattern(text, accuracy=50.0):
+    return {'pattern': text, 'accuracy': accuracy, 'total_attempts': 2, 'success_count': 1}
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """پوشه کاری موقت (سیستم یادگیری الگوها را در patterns/ ذخیره میکند)"""
+    
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def test_counters_merge_and_drain():
+    """آمار پردازشگرها جمع میشود و drain شمارندهها را صفر میکند"""
+    
+    worker = PatternStats()
+    worker.record_run('regex', 'وزن_خالص', 'p', 0.002)
+    worker.record_hits('regex', 'وزن_خالص', 'p', hits=3, valid=0)
+    worker.record_hits('regex', 'وزن_خالص', 'p', hits=1, valid=1, unique=True)
+    worker.record_chosen('regex', 'وزن_خالص', 'p')
+    worker.record_page()
+    
+    total = PatternStats()
+    total.merge(worker.drain())
+    total.merge(None)
+    
+    assert not worker and worker.drain() is None
+    
+    counters = total.counters[('regex', 'وزن_خالص', 'p')]
+    assert total.pages == 1
+    assert (counters['runs'], counters['hits'], counters['valid'], counters['invalid']) == (1, 4, 1, 3)
+    assert (counters['rejected'], counters['unique'], counters['chosen']) == (1, 1, 1)
+    assert counters['time_ms'] == pytest.approx(2.0)
+
+def test_recorded_stats_do_not_change_accuracy(workdir):
+    """آمار اجرا دقت الگوی یاد گرفته شده را تغییر نمیدهد؛ آمار الگوهای پایه در فایل جدا ذخیره میشود"""
+    
+    learning_system = LearningSystem()
+    learning_system.learned_patterns = {'وزن_خالص': [pattern('learned')]}
+    
+    stats = PatternStats()
+    stats.record_chosen('learned', 'وزن_خالص', 'learned')
+    stats.record_chosen('regex', 'وزن_خالص', 'builtin')
+    stats.record_page()
+    learning_system.record_pattern_stats(stats.drain())
+    
+    saved = json.loads((workdir / 'patterns' / 'learned_patterns.json').read_text(encoding='utf-8'))
+    learned = saved['وزن_خالص'][0]
+    assert learned['accuracy'] == 50.0 and learned['success_count'] == 1
+    assert learned['runtime_stats']['chosen'] == 1
+    
+    builtin = json.loads((workdir / 'patterns' / 'pattern_stats.json').read_text(encoding='utf-8'))
+    assert builtin['pages'] == 1
+    assert builtin['fields']['وزن_خالص']['builtin']['chosen'] == 1
+
+def test_three_way_merge():
+    """هر طرف تغییر (یا حذف) خودش را نگه میدارد؛ در تغییر دو طرفه نسخه این پردازه میماند"""
+    
+    base = {'a': [pattern('kept'), pattern('theirs'), pattern('mine'), pattern('both'),
+                  pattern('deleted by them'), pattern('deleted by me')]}
+    mine = {'a': [pattern('kept'), pattern('theirs'), pattern('mine', 60.0), pattern('both', 70.0),
+                  pattern('deleted by them'), pattern('added by me')]}
+    theirs = {'a': [pattern('kept'), pattern('theirs', 80.0), pattern('mine'), pattern('both', 90.0),
+                    pattern('deleted by me'), pattern('added by them')],
+              'b': [pattern('new field')]}
+    
+    merged = merge_learned_patterns(base, mine, theirs)
+    
+    assert [(p['pattern'], p['accuracy']) for p in merged['a']] == [
+        ('kept', 50.0), ('theirs', 80.0), ('mine', 60.0), ('both', 70.0),
+        ('added by them', 50.0), ('added by me', 50.0)
+    ]
+    assert [p['pattern'] for p in merged['b']] == ['new field']
+
+def test_save_keeps_changes_of_another_process(workdir):
+    """ذخیره پردازه دستهای الگوی اضافه شده در برنامه را پاک نمیکند"""
+    
+    gui = LearningSystem()
+    gui.learned_patterns = {'وزن_خالص': [pattern('shared')]}
+    gui.save_patterns()
+    
+    batch = LearningSystem()
+    
+    gui.learned_patterns['وزن_خالص'].append(pattern('added in gui'))
+    gui.save_patterns()
+    
+    batch.learned_patterns['وزن_خالص'][0]['runtime_stats'] = {'chosen': 3}
+    batch.save_patterns()
+    
+    saved = json.loads((workdir / 'patterns' / 'learned_patterns.json').read_text(encoding='utf-8'))
+    assert [p['pattern'] for p in saved['وزن_خالص']] == ['shared', 'added in gui']
+    assert saved['وزن_خالص'][0]['runtime_stats'] == {'chosen': 3}
+    
+    assert gui.reload_if_changed() and gui.learned_patterns == saved
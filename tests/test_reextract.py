@@ -0,0 +1,90 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست استخراج مجدد فیلدهایی که الگوهایشان تغییر کرده
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import copy
+from types import SimpleNamespace
+
+import pytest
+
+from learning_system import LearningSystem
+from benchmark_patterns import BenchmarkExtractor, SAMPLE_TEXT
+
+# متن بدون وزن خالص؛ «وزن نت» را فقط الگوی یاد گرفته شده پیدا میکند
+TEXT = SAMPLE_TEXT.replace('38 وزن خالص 1500.5 کیلوگرم ', '') + ' وزن نت 2000'
+
+def learned(pattern):
+    return {'pattern': pattern, 'accuracy': 0.0, 'total_attempts': 0, 'success_count': 0}
+
+@pytest.fixture
+def extractor(tmp_path, monkeypatch):
+    """استخراجگر بدون OCR با پوشه الگوهای موقت"""
+    
+    monkeypatch.chdir(tmp_path)
+    learning_system = LearningSystem()
+    return BenchmarkExtractor({'ocr_cache_enabled': False}, learning_system=learning_system)
+
+def learn(extractor, field_name, pattern):
+    extractor.learning_system.learned_patterns.setdefault(field_name, []).append(learned(pattern))
+    extractor.learned_tier.refresh(force=True)
+
+def test_only_fields_with_changed_patterns_are_reextracted(extractor):
+    """فقط فیلد با الگوی جدید دوباره استخراج میشود؛ دیکشنری بقیه فیلدها دست نمیخورد"""
+    
+    page = extractor.extract_from_text(TEXT, 'a.pdf')
+    results = {'a.pdf': {'type': 'pdf', 'pages': [page]}}
+    assert page['extracted']['وزن_خالص']['value'] is None
+    
+    assert extractor.reextract_results(results)['fields'] == 0
+    
+    untouched = page['extracted']['کد_کالا']
+    learn(extractor, 'وزن_خالص', r'نت\s*(\d+)')
+    
+    summary = extractor.reextract_results(results)
+    
+    assert summary == {'pages': 1, 'stale_pages': 1, 'fields': 1, 'changed': 1}
+    assert page['extracted']['وزن_خالص']['value'] == '2000'
+    assert page['extracted']['کد_کالا'] is untouched
+    assert page['pattern_versions']['وزن_خالص'] == extractor.field_pattern_versions(page['document_type'])['وزن_خالص']
+    
+    # نسخه ذخیره شده بهروز است - استخراج دوباره لازم نیست
+    assert extractor.reextract_results(results)['fields'] == 0
+
+def test_manual_edits_are_kept(extractor):
+    """مقدار ویرایش شده دستی با تغییر الگوی فیلد جایگزین نمیشود"""
+    
+    page = extractor.extract_from_text(TEXT, 'a.pdf')
+    page['extracted']['وزن_خالص'].update({'value': '1999', 'method': 'manual'})
+    
+    learn(extractor, 'وزن_خالص', r'نت\s*(\d+)')
+    
+    assert extractor.reextract_results({'a.pdf': page})['fields'] == 0
+    assert page['extracted']['وزن_خالص']['value'] == '1999'
+
+def test_reextracted_copy_is_applied_without_overwriting_edits(extractor):
+    """نتیجه استخراج مجدد روی کپی انجام و سپس در نتایج فعلی جایگزین میشود؛ ویرایش دستی این فاصله حفظ میشود"""
+    
+    from main import CustomsExtractorGUI
+    
+    live = {'a.pdf': {'type': 'pdf', 'pages': [extractor.extract_from_text(TEXT, 'a.pdf')]}}
+    learn(extractor, 'وزن_خالص', r'نت\s*(\d+)')
+    learn(extractor, 'کرایه', r'کرایه\s*(\d+)\s*41')
+    
+    snapshot = copy.deepcopy(live)
+    assert extractor.reextract_results(snapshot)['fields'] == 2
+    
+    live_page = live['a.pdf']['pages'][0]
+    weight = live_page['extracted']['وزن_خالص']
+    live_page['extracted']['کرایه'].update({'value': '100', 'method': 'manual'})
+    assert weight['value'] is None
+    
+    CustomsExtractorGUI.apply_reextracted_results(SimpleNamespace(results_data=live), snapshot)
+    
+    # ویجت ویرایش به همان دیکشنری فیلد ارجاع دارد
+    assert live_page['extracted']['وزن_خالص'] is weight and weight['value'] == '2000'
+    assert live_page['extracted']['کرایه']['value'] == '100'
+    assert live_page['pattern_versions']['وزن_خالص'] == snapshot['a.pdf']['pages'][0]['pattern_versions']['وزن_خالص']
@@ -0,0 +1,71 @@
+﻿#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تست سقف زمانی اجرای الگوها و قرنطینه الگوهای کند
+توسعهدهنده: Mohsen-data-wizard
+تاریخ: 2025-06-05
+"""
+
+import re
+import threading
+
+import pytest
+
+from regex_guard import RegexGuard, RegexTimeout
+
+# عقبگرد نمایی روی رشته بدون match
+CATASTROPHIC = r'(a+)+$'
+SLOW_TEXT = 'a' * 40 + 'b'
+
+def run_in_thread(function):
+    """اجرای تابع در نخ غیراصلی (بدون امکان قطع با سیگنال) و برگرداندن خروجی آن"""
+    
+    output = {}
+    thread = threading.Thread(target=lambda: output.update(value=function()))
+    thread.start()
+    thread.join()
+    return output['value']
+
+def test_safe_pattern_runs_normally():
+    """الگوی سریع همه matchها را برمیگرداند و جریمه نمیشود"""
+    
+    guard = RegexGuard(time_budget_ms=250)
+    pattern = r'(\d+)'
+    
+    matches = guard.finditer(pattern, re.compile(pattern), 'a 12 b 345')
+    
+    assert [match.group(1) for match in matches] == ['12', '345']
+    assert guard.stats['runs'] == 1 and not guard.strikes
+
+def test_timeout_strikes_then_quarantine():
+    """اجرای بیش از بودجه در نخ اصلی قطع میشود و پس از max_strikes تخلف الگو قرنطینه است"""
+    
+    guard = RegexGuard(time_budget_ms=50, max_strikes=2, log_strikes=False)
+    assert guard.can_interrupt()
+    
+    compiled = re.compile(CATASTROPHIC)
+    
+    for strike in (1, 2):
+        with pytest.raises(RegexTimeout):
+            guard.finditer(CATASTROPHIC, compiled, SLOW_TEXT)
+        assert guard.strikes[CATASTROPHIC] == strike
+        
+    assert guard.is_quarantined(CATASTROPHIC)
+    assert guard.finditer(CATASTROPHIC, compiled, SLOW_TEXT) == []
+    assert guard.stats['timeouts'] == 2 and guard.stats['skipped'] == 1
+    
+    guard.release(CATASTROPHIC)
+    assert not guard.is_quarantined(CATASTROPHIC) and CATASTROPHIC not in guard.strikes
+
+def test_slow_pattern_outside_main_thread_is_penalised_after_running():
+    """در نخ غیراصلی الگوی کند تا پایان اجرا میشود و سپس جریمه میشود"""
+    
+    guard = RegexGuard(time_budget_ms=0.001, max_strikes=1, log_strikes=False)
+    pattern = r'(\w+)\s'
+    text = 'word ' * 20000
+    
+    matches = run_in_thread(lambda: guard.finditer(pattern, re.compile(pattern), text))
+    
+    assert len(matches) == 20000
+    assert guard.stats['slow'] == 1
+    assert guard.is_quarantined(pattern)